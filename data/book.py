@@ -0,0 +1,57 @@
+'''
+Opening book command line: builds a book from PGN game collections and looks up positions in it.
+
+    python data/book.py build games.pgn more.pgn -o data/book.bin --plies 16 --min-count 2
+    python data/book.py probe data/book.bin
+    python data/book.py probe data/book.bin --fen "<fen>"
+
+The window plays from data/book.bin when it exists, UCI takes a book with the BookFile option.
+'''
+import argparse
+import sys
+
+from classes.Const import BOOK_FILE
+from classes.Game import Game
+from classes.OpeningBook import OpeningBook, build_book, BOOK_PLIES
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build an opening book from PGN files or look up a position in one.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help='build a book from PGN files')
+    build.add_argument('pgn', nargs='+', help='PGN files to read the games from')
+    build.add_argument('-o', '--output', default=BOOK_FILE, help=f'book file to write (default: {BOOK_FILE})')
+    build.add_argument('--plies', type=int, default=BOOK_PLIES,
+                       help=f'plies of every game to put in the book (default: {BOOK_PLIES})')
+    build.add_argument('--min-count', type=int, default=1,
+                       help='leave out moves played fewer times than this (default: 1)')
+    probe = commands.add_parser('probe', help='print the book moves of a position')
+    probe.add_argument('book', nargs='?', default=BOOK_FILE, help=f'book file to read (default: {BOOK_FILE})')
+    probe.add_argument('--fen', help='position to look up (default: the initial position)')
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        try:
+            games, positions, records = build_book(args.pgn, args.output, args.plies, args.min_count)
+        except OSError as error:
+            parser.error(str(error))
+        print(f'{games} games, {positions} positions, {records} moves written to {args.output}')
+        return 0
+
+    try:
+        game = Game(args.fen)
+        book = OpeningBook(args.book)
+    except (ValueError, OSError) as error:
+        parser.error(str(error))
+    entries = book.probe(game.hash)
+    book.close()
+    total = sum(weight for _, weight in entries)
+    for move, weight in entries:
+        print(f'{game.san(move):<8} {weight:>8}  {weight / total:6.1%}')
+    if not entries:
+        print('position not in the book')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,6 +1,73 @@
 import random
-from classes.Const import ROWS, COLS
+import time
+
 from classes.Game import Game
+from classes.Mailbox import Mailbox
+from classes.Bitboard import Bitboard
+from classes.TranspositionTable import TranspositionTable, EXACT, LOWER, UPPER
+from classes.MoveOrdering import MoveOrdering, MAX_PLY
+from classes.Evaluation import MG_VALUES
+from classes.Move import EN_PASSANT, PROMOTION_NAMES
+from classes.ParallelSearch import ParallelSearch
+from classes.SearchStats import SearchStats
+from classes.Profiler import profiled
+
+# Move generators that can stand in for Game.generate_moves
+BACKENDS = {'mailbox': Mailbox, 'bitboard': Bitboard}
+
+# Score of a checkmate, mates closer to the root score higher
+MATE_SCORE = 100000
+# Captures that cannot bring the score within this margin of alpha are skipped in quiescence search, in centipawns
+DELTA_MARGIN = 200
+# Null move pruning searches the null move this many plies less deep, from this depth on
+NULL_MOVE_REDUCTION = 2
+NULL_MOVE_MIN_DEPTH = 3
+# Late move reductions start at this depth, after this many moves, and reduce twice as much after LMR_LATE_MOVES moves
+LMR_MIN_DEPTH = 3
+LMR_MOVES = 3
+LMR_LATE_MOVES = 8
+# Half the width of the first aspiration window around the score of the previous depth, in centipawns,
+# and the width from which a window that fails is opened all the way
+ASPIRATION_WINDOW = 50
+ASPIRATION_LIMIT = 800
+
+
+def score_to_tt(score, ply):
+    '''
+    score_to_tt
+    Mate scores count the plies from the root, the table keeps them counted from the position,
+    so a mate found at one ply is still as far away when the position is reached at another.
+
+    Args:
+        score (_type_): a score of the search.
+        ply (int): the distance of the position from the root.
+
+    Returns:
+        _type_: the score to store in the transposition table.
+    '''
+    if score >= MATE_SCORE - MAX_PLY:
+        return score + ply
+    if score <= -(MATE_SCORE - MAX_PLY):
+        return score - ply
+    return score
+
+
+def score_from_tt(score, ply):
+    '''
+    score_from_tt
+
+    Args:
+        score (_type_): a score from the transposition table, see score_to_tt.
+        ply (int): the distance of the position from the root.
+
+    Returns:
+        _type_: the score counted from the root again.
+    '''
+    if score >= MATE_SCORE - MAX_PLY:
+        return score - ply
+    if score <= -(MATE_SCORE - MAX_PLY):
+        return score + ply
+    return score
 
 
 class AI:
@@ -8,41 +75,197 @@ class AI:
      AI class
      contains the AI logic for the game
     '''    
-    def __init__(self, game: Game, color):
+    def __init__(self, game: Game, color, tt_size_mb=16, check_evasions=True, workers=1, book=None, tablebase=None,
+                 stats_log=None, pvs=True, aspiration=True, null_move=True, lmr=True, backend='game',
+                 timing=None):
         '''
         __init__ _summary_
 
         Args:
             game (Game): the game object that this AI is playing
             color (_type_): the color of the game object that this AI is playing
+            tt_size_mb (int, optional): the size of the transposition table in megabytes. Defaults to 16.
+            check_evasions (bool, optional): search all moves out of check in quiescence search. Defaults to True.
+            workers (int, optional): the number of processes to split the root moves over, 1 searches in this process. Defaults to 1.
+            book (OpeningBook, optional): the opening book to play from before searching. Defaults to None.
+            tablebase (Tablebase, optional): the endgame tables to play from before searching. Defaults to None.
+            stats_log (str, optional): a file to append the statistics of every search to as a JSON line. Defaults to None.
+            pvs (bool, optional): search the moves after the first with a zero window (principal variation search). Defaults to True.
+            aspiration (bool, optional): search the root in a window around the score of the previous depth. Defaults to True.
+            null_move (bool, optional): prune positions where passing the turn still fails high (null move pruning). Defaults to True.
+            lmr (bool, optional): search quiet moves ordered late less deep (late move reductions). Defaults to True.
+            backend (str, optional): the move generator to use, 'game' or one of BACKENDS. Defaults to 'game'.
+            timing (bool, optional): time move generation, check tests and evaluation for the statistics, which
+                costs two clock reads per call. Defaults to on when stats_log is set.
         '''        
         self.game = game
         self.color = color
+        self.rival_color = 'black' if color == 'white' else 'white'
+        if backend != 'game' and backend not in BACKENDS:
+            raise ValueError(f"unknown backend {backend!r}, use game or {', '.join(BACKENDS)}")
+        self.backend = backend
+        # the position of the backend during a search, it makes and takes back the same moves as the game
+        self.position = None
+        self.check_evasions = check_evasions
+        self.tt = TranspositionTable(tt_size_mb)
+        self.tt_size_mb = tt_size_mb
+        self.ordering = MoveOrdering()
+        # one move list per ply, filled again every time the search reaches the ply
+        self.move_lists = [[] for _ in range(MAX_PLY)]
+        self.workers = workers
+        self.book = book
+        self.tablebase = tablebase
+        # process pool of the parallel search, started by the first search that needs it
+        self.parallel = None
+        # shared stop flag when this AI searches inside a worker process of a parallel search
+        self.stop_flag = None
+        # search state of make_smart_move
+        self.deadline = None
+        self.stopped = False
+        self.depth_reached = 0
+        self.best_score = None
+        # what the last search did, see SearchStats
+        self.timing = stats_log is not None if timing is None else timing
+        self.stats = SearchStats(self.timing)
+        self.stats_log = stats_log
+        # the selective search, each part can be turned off to measure what it brings
+        self.pvs = pvs
+        self.aspiration = aspiration
+        self.null_move = null_move
+        self.lmr = lmr
 
     # Get list of valid moves from Game class
-    def get_all_valid_moves(self):
+    def get_all_valid_moves(self, color=None):
         '''
         get_all_valid_moves 
 
+        Args:
+            color (_type_, optional): the color to get the moves for. Defaults to the color of the AI.
+
         Returns:
-            _type_: list of valid moves from Game class.
+            _type_: list of the legal (piece, move) tuples from Game class.
         '''        
-        valid_moves = []
-        check_avoiding_moves = []
+        if color is None:
+            color = self.color
 
-        for row in range(ROWS):
-            for col in range(COLS):
-                piece = self.game.squares[row][col].piece
-                if piece and piece.color == self.color:
-                    self.game.calc_moves(piece, row, col, bool=True)
-                    for move in piece.moves:
-                        if self.game.valid_move(piece, move):
-                            if self.game.in_check(piece, move):
-                                check_avoiding_moves.append((piece, move))
-                            else:
-                                valid_moves.append((piece, move))
+        if self.backend in BACKENDS:
+            position = BACKENDS[self.backend].from_game(self.game, color)
+            return [self.game.key_move(position.to_game_code(move)) for move in position.legal_moves()]
 
-        return check_avoiding_moves, valid_moves
+        # Game only generates legal moves, so they need no further in_check test
+        return self.game.legal_moves(color)
+
+    def generate_moves(self, color, ply, captures=False):
+        '''
+        generate_moves
+
+        Args:
+            color (_type_): the color to get the moves for.
+            ply (int): the distance from the root of the search, the move list of the ply is filled.
+            captures (bool, optional): only generate captures and promotions, for quiescence search. Defaults to False.
+
+        Returns:
+            _type_: the move list of the ply, holding the legal moves as ints, see Move.encode.
+        '''        
+        while len(self.move_lists) <= ply:
+            self.move_lists.append([])
+        moves = self.move_lists[ply]
+        if self.timing:
+            start = time.perf_counter()
+        if self.position is not None:
+            self.get_backend_moves(moves, captures)
+        else:
+            self.game.generate_moves(moves, color, captures)
+        if self.timing:
+            self.stats.movegen_time += time.perf_counter() - start
+        return moves
+
+    def get_backend_moves(self, moves, captures=False):
+        '''
+        get_backend_moves
+        Generates the legal moves of the side to move on the position of the backend.
+
+        Args:
+            moves (list): the move list to fill with int moves, see Move.encode.
+            captures (bool, optional): only keep captures and promotions. Defaults to False.
+        '''        
+        position = self.position
+        moves[:] = [position.to_game_code(move) for move in position.legal_moves(captures)]
+
+    def load_position(self):
+        '''
+        load_position
+        Builds the position of the backend from the game, at the start of a search.
+        '''        
+        self.position = BACKENDS[self.backend].from_game(self.game) if self.backend in BACKENDS else None
+
+    def make_move(self, move):
+        '''
+        make_move
+        Game.make_move, made on the position of the backend as well so it stays in step with the game.
+
+        Args:
+            move (int): the int move, see Move.encode.
+
+        Returns:
+            Undo: the undo record of the game.
+        '''        
+        undo = self.game.make_move(move)
+        if self.position is not None:
+            self.position.make_move(self.position.from_game_code(move))
+        return undo
+
+    def unmake_move(self, undo):
+        '''
+        unmake_move
+
+        Args:
+            undo (Undo): the undo record make_move returned.
+        '''        
+        self.game.unmake_move(undo)
+        if self.position is not None:
+            self.position.unmake_move()
+
+    def make_null_move(self):
+        '''
+        make_null_move
+        Game.make_null_move, made on the position of the backend as well.
+
+        Returns:
+            tuple: the state to pass to unmake_null_move.
+        '''        
+        state = self.game.make_null_move()
+        return state, self.position.make_null_move() if self.position is not None else None
+
+    def unmake_null_move(self, state):
+        '''
+        unmake_null_move
+
+        Args:
+            state (tuple): the state make_null_move returned.
+        '''        
+        game_state, position_state = state
+        self.game.unmake_null_move(game_state)
+        if self.position is not None:
+            self.position.unmake_null_move(position_state)
+
+    def king_attacked(self, color):
+        '''
+        king_attacked
+        Game.king_attacked, timed for the statistics of the search when timing is on.
+
+        Args:
+            color (_type_): the color of the king.
+
+        Returns:
+            _type_: True if the king of the given color is in check.
+        '''        
+        if not self.timing:
+            return self.game.king_attacked(color)
+        start = time.perf_counter()
+        attacked = self.game.king_attacked(color)
+        self.stats.check_time += time.perf_counter() - start
+        return attacked
 
     # Dumb AI 
     # Makes a random move from the valid move list
@@ -53,14 +276,11 @@ class AI:
         Returns:
             _type_: random move from the valid move list.
         '''        
-        check_avoiding_moves, valid_moves = self.get_all_valid_moves()
+        valid_moves = self.get_all_valid_moves()
 
-        if check_avoiding_moves:
-            piece, move = random.choice(check_avoiding_moves)
-        elif valid_moves:
-            piece, move = random.choice(valid_moves)
-        else:
+        if not valid_moves:
             return False
+        piece, move = random.choice(valid_moves)
 
         self.game.move(piece, move)
 
@@ -68,82 +288,535 @@ class AI:
 
     # Smarter AI
     # Minimax with Alpha-Beta Pruning
-    def minimax(self, depth, alpha, beta, maximizing_player):
+    def minimax(self, depth, alpha, beta, maximizing_player, ply=1, null_allowed=True):
         '''
         minimax
 
+        The moves are made and taken back on the game in place, so the board is unchanged when this returns.
+        Positions already searched deep enough are looked up in the transposition table.
+        A position where passing the turn still fails high is cut off without searching its moves (null move pruning),
+        and quiet moves ordered late are searched less deep (late move reductions), see search_move.
+
         Args:
             depth (_type_): The depth of the minimax object to be used for minimax calculations.
             alpha (_type_): The alpha of the minimax object to be used for minimax calculations.
             beta (_type_): The beta of the minimax object to be used for minimax calculations.
-            maximizing_player (_type_): The maximum number of players to be minimaxed for minimax calculations.
+            maximizing_player (_type_): True if the AI is to move, False if its rival is to move.
+            ply (int, optional): The distance from the root of the search. Defaults to 1.
+            null_allowed (bool, optional): False right after a null move, so two are never made in a row. Defaults to True.
 
         Returns:
-            _type_: The type of minimax object to be used for minimax calculations based on the depth. The type is determined by the maximizing_player parameter. 
+            _type_: The score of the position from the point of view of the AI.
         '''        
+        # stop when the time budget runs out or stop was called, the caller throws the unfinished search away
+        if self.stopped or (self.deadline is not None and time.perf_counter() >= self.deadline):
+            self.stopped = True
+            return 0
+
+        stats = self.stats
+        stats.nodes += 1
+        # a search in another process is stopped through a shared flag, read now and then because it is slow
+        if self.stop_flag is not None and stats.nodes & 1023 == 0 and self.stop_flag.value:
+            self.stopped = True
+            return 0
+        key = self.game.hash
+
+        # transposition table lookup
+        tt_move = None
+        entry = self.tt.probe(key)
+        stats.tt_probes += 1
+        if entry is not None:
+            stats.tt_hits += 1
+            _, tt_depth, tt_score, tt_bound, tt_move, _ = entry
+            tt_score = score_from_tt(tt_score, ply)
+            if tt_depth >= depth:
+                if tt_bound == EXACT:
+                    return tt_score
+                if tt_bound == LOWER:
+                    alpha = max(alpha, tt_score)
+                else:
+                    beta = min(beta, tt_score)
+                if alpha >= beta:
+                    return tt_score
+        # the bound stored is that of the window searched, after it was narrowed by the table
+        alpha_orig, beta_orig = alpha, beta
+
         if depth == 0:
-            return evaluate_board()
+            return self.quiescence(alpha, beta, maximizing_player, ply)
+        if ply > stats.seldepth:
+            stats.seldepth = ply
+
+        color = self.color if maximizing_player else self.rival_color
+        in_check = depth >= min(NULL_MOVE_MIN_DEPTH, LMR_MIN_DEPTH) and self.king_attacked(color)
+
+        # null move pruning, not when in check, not against a mate score and not with only pawns,
+        # where passing would often be the best move
+        if (self.null_move and null_allowed and depth >= NULL_MOVE_MIN_DEPTH and not in_check
+                and abs(beta if maximizing_player else alpha) < MATE_SCORE - MAX_PLY and self.game.has_pieces(color)):
+            static = self.evaluate_board()
+            if static >= beta if maximizing_player else static <= alpha:
+                state = self.make_null_move()
+                if maximizing_player:
+                    score = self.minimax(depth - 1 - NULL_MOVE_REDUCTION, beta - 1, beta, False, ply + 1, False)
+                else:
+                    score = self.minimax(depth - 1 - NULL_MOVE_REDUCTION, alpha, alpha + 1, True, ply + 1, False)
+                self.unmake_null_move(state)
+                if self.stopped:
+                    return 0
+                if score >= beta if maximizing_player else score <= alpha:
+                    stats.null_cutoffs += 1
+                    return beta if maximizing_player else alpha
+
+        moves = self.generate_moves(color, ply)
+        if not moves:
+            return self.no_moves_score(color, maximizing_player, ply)
 
+        self.ordering.order(self.game, moves, ply, tt_move)
+        reduce = self.lmr and depth >= LMR_MIN_DEPTH and not in_check
+
+        best_move = None
         if maximizing_player:
-            max_eval = float("-inf")
-            for move in self.get_all_valid_moves()[1]:
-                piece, move = move
-                self.game.move(piece, move)
-                score = self.minimax(depth - 1, alpha, beta, False)
-                if score is not None:
-                    max_eval = max(max_eval, score)
-                    if max_eval >= beta:
-                        break
-            return max_eval if max_eval != float("-inf") else None
+            best_eval = float("-inf")
+            for index, move in enumerate(moves):
+                undo = self.make_move(move)
+                reduction = self.reduction(undo, index, depth, self.rival_color) if reduce else 0
+                score = self.search_move(depth - 1, alpha, beta, False, ply + 1, index == 0, reduction)
+                self.unmake_move(undo)
+                if self.stopped:
+                    return 0
+                if score > best_eval:
+                    best_eval = score
+                    best_move = move
+                alpha = max(alpha, score)
+                if best_eval >= beta:
+                    self.ordering.cutoff(self.game, move, ply, depth)
+                    stats.cutoffs += 1
+                    if move == moves[0]:
+                        stats.first_cutoffs += 1
+                    break
         
         else:   # Minimizing player
-            min_eval = float("inf")
-            for move in self.get_all_valid_moves()[0]:
-                piece, move = move
-                self.game.move(piece, move)
-                score = self.minimax(depth - 1, alpha, beta, True)
-                if score is not None:
-                    min_eval = min(min_eval, score)
-                    if min_eval <= alpha:
-                        break
-            return min_eval if min_eval != float("inf") else None
+            best_eval = float("inf")
+            for index, move in enumerate(moves):
+                undo = self.make_move(move)
+                reduction = self.reduction(undo, index, depth, self.color) if reduce else 0
+                score = self.search_move(depth - 1, alpha, beta, True, ply + 1, index == 0, reduction)
+                self.unmake_move(undo)
+                if self.stopped:
+                    return 0
+                if score < best_eval:
+                    best_eval = score
+                    best_move = move
+                beta = min(beta, score)
+                if best_eval <= alpha:
+                    self.ordering.cutoff(self.game, move, ply, depth)
+                    stats.cutoffs += 1
+                    if move == moves[0]:
+                        stats.first_cutoffs += 1
+                    break
+
+        # transposition table store
+        if best_eval <= alpha_orig:
+            bound = UPPER
+        elif best_eval >= beta_orig:
+            bound = LOWER
+        else:
+            bound = EXACT
+        self.tt.store(key, depth, score_to_tt(best_eval, ply), bound, best_move)
+
+        return best_eval
+
+    def search_move(self, depth, alpha, beta, maximizing_player, ply, first, reduction=0):
+        '''
+        search_move
+        Searches the position after a move of the parent node. With pvs the moves after the first are
+        searched with a zero window, which only tells if the move beats the best move so far, and only
+        the moves that do are searched again with the full window. A reduced move that beats it is
+        searched again to the full depth.
+
+        Args:
+            depth (_type_): The depth to search the position to, before the reduction.
+            alpha (_type_): The alpha of the parent.
+            beta (_type_): The beta of the parent.
+            maximizing_player (_type_): True if the AI is to move after the move.
+            ply (int): The distance of the position from the root of the search.
+            first (bool): True for the first move of the parent, which is always searched with the full window.
+            reduction (int, optional): The plies to search the move less deep, see reduction. Defaults to 0.
+
+        Returns:
+            _type_: The score of the position from the point of view of the AI.
+        '''        
+        if first or not (self.pvs or reduction):
+            return self.minimax(depth, alpha, beta, maximizing_player, ply)
+
+        # the parent maximizes when its rival is to move after the move
+        if not self.pvs:
+            low, high = alpha, beta
+        elif maximizing_player:
+            low, high = beta - 1, beta
+        else:
+            low, high = alpha, alpha + 1
+        score = self.minimax(depth - reduction, low, high, maximizing_player, ply)
+        if reduction and not self.stopped and (score < beta if maximizing_player else score > alpha):
+            self.stats.researches += 1
+            score = self.minimax(depth, low, high, maximizing_player, ply)
+        if self.pvs and not self.stopped and alpha < score < beta:
+            self.stats.researches += 1
+            score = self.minimax(depth, alpha, beta, maximizing_player, ply)
+        return score
+
+    def reduction(self, undo, index, depth, color):
+        '''
+        reduction
+        Late move reductions: the moves are ordered best first, so a quiet move far down the list rarely
+        turns out to be the best and is searched less deep. Captures, promotions and checks are not reduced.
+
+        Args:
+            undo (Undo): The undo record of the move, which was just made.
+            index (int): The place of the move in the ordered moves.
+            depth (_type_): The depth of the parent node.
+            color (_type_): The color to move after the move.
+
+        Returns:
+            int: The plies to search the move less deep.
+        '''        
+        if index < LMR_MOVES or undo.captured is not None or undo.promoted is not None or self.king_attacked(color):
+            return 0
+        self.stats.reductions += 1
+        return 2 if index >= LMR_LATE_MOVES and depth > LMR_MIN_DEPTH else 1
             
+    def quiescence(self, alpha, beta, maximizing_player, ply):
+        '''
+        quiescence
+
+        Searches only captures and promotions until the position is quiet, so the static evaluation
+        is never taken in the middle of an exchange. The side to move may stand pat on the static
+        evaluation, and captures that cannot raise it to alpha even with a margin are skipped.
+        When the side to move is in check and check_evasions is set, all its moves are searched instead.
+
+        Args:
+            alpha (_type_): The alpha of the search.
+            beta (_type_): The beta of the search.
+            maximizing_player (_type_): True if the AI is to move, False if its rival is to move.
+            ply (int): The distance from the root of the search.
+
+        Returns:
+            _type_: The score of the position from the point of view of the AI.
+        '''        
+        if self.stopped or (self.deadline is not None and time.perf_counter() >= self.deadline):
+            self.stopped = True
+            return 0
+
+        stats = self.stats
+        stats.qnodes += 1
+        if ply > stats.seldepth:
+            stats.seldepth = ply
+        color = self.color if maximizing_player else self.rival_color
+
+        if self.check_evasions and self.king_attacked(color):
+            moves = self.generate_moves(color, ply)
+            if not moves:
+                return self.no_moves_score(color, maximizing_player, ply)
+            stand_pat = None
+        else:
+            # stand pat
+            stand_pat = self.evaluate_board()
+            if maximizing_player:
+                if stand_pat >= beta:
+                    return stand_pat
+                alpha = max(alpha, stand_pat)
+            else:
+                if stand_pat <= alpha:
+                    return stand_pat
+                beta = min(beta, stand_pat)
+            moves = self.generate_moves(color, ply, captures=True)
+
+        best_eval = stand_pat
+        for move in self.ordering.order(self.game, moves, ply):
+            # delta pruning
+            if stand_pat is not None:
+                victim = self.game.cells[(move >> 6) & 63].piece
+                gain = MG_VALUES[victim.name] if victim is not None else 0
+                if move >> 15 == EN_PASSANT:
+                    gain = MG_VALUES['pawn']
+                promotion = (move >> 12) & 7
+                if promotion:
+                    gain += MG_VALUES[PROMOTION_NAMES[promotion]] - MG_VALUES['pawn']
+                # the skipped capture may still be worth up to the margin, so the score is not
+                # a bound tighter than that, else it depends on the window it was searched with
+                if maximizing_player and stand_pat + gain + DELTA_MARGIN <= alpha:
+                    best_eval = max(best_eval, stand_pat + gain + DELTA_MARGIN)
+                    continue
+                if not maximizing_player and stand_pat - gain - DELTA_MARGIN >= beta:
+                    best_eval = min(best_eval, stand_pat - gain - DELTA_MARGIN)
+                    continue
+
+            undo = self.make_move(move)
+            score = self.quiescence(alpha, beta, not maximizing_player, ply + 1)
+            self.unmake_move(undo)
+            if self.stopped:
+                return 0
+
+            if maximizing_player:
+                if best_eval is None or score > best_eval:
+                    best_eval = score
+                alpha = max(alpha, score)
+            else:
+                if best_eval is None or score < best_eval:
+                    best_eval = score
+                beta = min(beta, score)
+            if alpha >= beta:
+                break
+
+        return best_eval
+
+    def no_moves_score(self, color, maximizing_player, ply):
+        '''
+        no_moves_score
+
+        Args:
+            color (_type_): the color to move.
+            maximizing_player (_type_): True if the AI is to move, False if its rival is to move.
+            ply (int): The distance from the root of the search.
+
+        Returns:
+            _type_: The score of checkmate or stalemate from the point of view of the AI.
+        '''        
+        if not self.king_attacked(color):
+            return 0
+        # prefer the quickest mate and the slowest defeat
+        return -(MATE_SCORE - ply) if maximizing_player else MATE_SCORE - ply
+
     def evaluate_board(self):
         '''
         evaluate_board 
         This function is called when to evaluate the board. 
-        All the pieces have a specific score and the move determines the score based on the current state of the board.
+        Game keeps the material and piece-square scores of both colors as running totals,
+        so this only reads them and turns them to the side of the AI.
         
         Returns:
-            _type_: The value of the board after minimax calculations. The value is determined by the maximizing_player parameter. 
+            _type_: The value of the board in centipawns, positive when the AI is better. 
         '''        
-        ai_score = 0
-        for row in range(ROWS):
-            for col in range(COLS):
-                piece = self.game.squares[row][col].piece
-                if piece and piece.color == self.color:
-                    ai_score += piece.value
-
-        return ai_score
+        if self.timing:
+            start = time.perf_counter()
+            score = self.game.evaluate()
+            self.stats.eval_time += time.perf_counter() - start
+        else:
+            score = self.game.evaluate()
+        return score if self.color == 'white' else -score
 
 
-    def make_smart_move(self, depth):
+    def search_root(self, moves, depth, alpha=float("-inf"), beta=float("inf")):
         '''
-        make_smart_move
+        search_root
 
         Args:
-            depth (_type_): The depth to make the move from (integer or float or None for default value of depth value in seconds to make the move from the best possible move).
+            moves (_type_): the int moves to search, best first.
+            depth (_type_): The depth to search the moves to.
+            alpha (_type_, optional): The lower bound of the window, see search_window. Defaults to no bound.
+            beta (_type_, optional): The upper bound of the window. Defaults to no bound.
+
+        Returns:
+            _type_: the best score and move, or None if the search was stopped. A score at or below alpha
+            or at or above beta only tells the real score is not higher or not lower.
         '''        
         best_move = None
         best_score = float("-inf")
 
-        for move in self.get_all_valid_moves()[1]:
-            piece, move = move
-            self.game.move(piece, move)
-            score = self.minimax(depth - 1, float("-inf"), float("inf"), True)
-            if score > best_score:
+        for index, move in enumerate(moves):
+            undo = self.make_move(move)
+            score = self.search_move(depth - 1, max(alpha, best_score), beta, False, 1, index == 0)
+            self.unmake_move(undo)
+            if self.stopped:
+                return None
+            if best_move is None or score > best_score:
                 best_score = score
                 best_move = move
+            if best_score >= beta:
+                break
+
+        return best_score, best_move
+
+    def search_window(self, moves, depth):
+        '''
+        search_window
+        Searches the root in a narrow window around the score of the previous depth (an aspiration window),
+        which cuts off more of the tree. When the score falls outside the window it is searched again with
+        the window widened on that side. The root is searched on the worker processes when there are workers.
+
+        Args:
+            moves (_type_): the int moves to search, best first.
+            depth (_type_): The depth to search the moves to.
+
+        Returns:
+            _type_: the best score and move, or None if the search was stopped.
+        '''        
+        search = self.search_root_parallel if self.workers > 1 else self.search_root
+        previous = self.best_score
+        if not self.aspiration or previous is None or abs(previous) >= MATE_SCORE - MAX_PLY:
+            return search(moves, depth)
+
+        window = ASPIRATION_WINDOW
+        alpha, beta = previous - window, previous + window
+        while True:
+            result = search(moves, depth, alpha, beta)
+            if result is None:
+                return None
+            score = result[0]
+            if alpha < score < beta:
+                return result
+            self.stats.aspiration_fails += 1
+            window *= 4
+            if score <= alpha:
+                alpha = float("-inf") if window >= ASPIRATION_LIMIT else score - window
+            else:
+                beta = float("inf") if window >= ASPIRATION_LIMIT else score + window
+
+    def search_root_parallel(self, moves, depth, alpha=float("-inf"), beta=float("inf")):
+        '''
+        search_root_parallel
+        Searches the root moves on the worker processes, see ParallelSearch.
+
+        Args:
+            moves (_type_): the int moves to search, best first.
+            depth (_type_): The depth to search the moves to.
+            alpha (_type_, optional): The lower bound of the window, see search_window. Defaults to no bound.
+            beta (_type_, optional): The upper bound of the window. Defaults to no bound.
+
+        Returns:
+            _type_: the best score and move, or None if the search was stopped.
+        '''        
+        if self.parallel is None:
+            options = {'pvs': self.pvs, 'null_move': self.null_move, 'lmr': self.lmr, 'backend': self.backend,
+                       'timing': self.timing}
+            self.parallel = ParallelSearch(self.workers, self.tt_size_mb, self.check_evasions, options)
+        result = self.parallel.search_root(self.game, moves, depth, self.deadline, alpha, beta)
+        if result is None:
+            return None
+        best_score, best_move, counts = result
+        self.stats.merge(counts)
+        return best_score, best_move
+
+    @profiled('search')
+    def find_best_move(self, depth=None, time_limit=None, max_depth=None, on_depth=None):
+        '''
+        find_best_move
+
+        The search deepens one ply at a time and searches the best move of the previous depth first.
+        What the search did is left in stats, and appended to stats_log when it is set.
+        With a time limit it stops when the budget runs out and returns the best move of the last
+        depth it completed. Depth 1 is always completed, unless stop is called from another thread.
+        A position in the opening book is answered with a book move without searching, and a position
+        in the endgame tables with the move to the quickest mate.
+
+        Args:
+            depth (_type_, optional): The depth to search the moves to, when searching without a time limit.
+            time_limit (_type_, optional): The time budget in seconds. Defaults to no time limit.
+            max_depth (_type_, optional): The deepest depth to search with a time limit. Defaults to depth, or 64.
+            on_depth (callable, optional): called with the depth, the score and the best (piece, move) tuple
+                every time a depth is completed. Defaults to None.
+
+        Returns:
+            _type_: The best (piece, move) tuple, or None if the AI has no valid moves.
+        '''        
+        if max_depth is None:
+            max_depth = depth if depth is not None else 64
+        if time_limit is None and depth is None:
+            raise ValueError('find_best_move needs a depth or a time limit')
+
+        start = time.perf_counter()
+        self.tt.new_search()
+        self.ordering.reset()
+        self.stopped = False
+        self.deadline = None
+        self.depth_reached = 0
+        self.best_score = None
+        self.stats.reset()
+
+        moves = self.generate_moves(self.color, 0)
+        if not moves:
+            return None
+
+        # positions in the opening book need no search
+        if self.book is not None:
+            book_move = self.book.choose(self.game)
+            if book_move is not None:
+                return self.game.key_move(book_move)
+
+        # so are endings with few enough pieces to be in the tables
+        if self.tablebase is not None:
+            tablebase_move = self.tablebase.choose(self.game)
+            if tablebase_move is not None:
+                return self.game.key_move(tablebase_move)
 
-        if best_move is not None:
-            self.game.move(piece, best_move)
+        entry = self.tt.probe(self.game.hash)
+        self.ordering.order(self.game, moves, 0, entry[4] if entry is not None else None)
+        self.load_position()
+        best_move = moves[0]
+        if len(moves) > 1:
+            for current_depth in range(1, max_depth + 1):
+                result = self.search_window(moves, current_depth)
+                if result is None or self.stopped:
+                    break
+                self.best_score, best_move = result
+                self.depth_reached = current_depth
+                self.stats.completed(current_depth, self.best_score)
+                if on_depth is not None:
+                    on_depth(current_depth, self.best_score, self.game.key_move(best_move))
+
+                # the budget only applies once depth 1 gave a move to fall back on
+                if time_limit is not None:
+                    self.deadline = start + time_limit
+                    if time.perf_counter() >= self.deadline:
+                        break
+
+                # search the best move first at the next depth
+                moves.remove(best_move)
+                moves.insert(0, best_move)
+
+        self.deadline = None
+        self.position = None
+        self.stats.finish()
+        best_move = self.game.key_move(best_move)
+        if self.stats_log is not None:
+            self.stats.write(self.stats_log, fen=self.game.fen(), move=best_move[1].uci())
+        return best_move
+
+    def make_smart_move(self, depth=None, time_limit=None, max_depth=None):
+        '''
+        make_smart_move
+        Searches with find_best_move and plays the move it finds.
+
+        Args:
+            depth (_type_, optional): The depth to search the moves to, when searching without a time limit.
+            time_limit (_type_, optional): The time budget in seconds. Defaults to no time limit.
+            max_depth (_type_, optional): The deepest depth to search with a time limit. Defaults to depth, or 64.
+
+        Returns:
+            _type_: True if a move was made, False if the AI has no valid moves.
+        '''        
+        best_move = self.find_best_move(depth, time_limit, max_depth)
+        if best_move is None:
+            return False
+        self.game.move(*best_move)
+        return True
+
+    def stop(self):
+        '''
+        stop
+        Makes a running find_best_move return as soon as possible, with the best move of the last depth it completed.
+        Safe to call from another thread.
+        '''        
+        self.stopped = True
+        if self.parallel is not None:
+            self.parallel.stop()
+
+    def close(self):
+        '''
+        close
+
+        Stops the worker processes of the parallel search, if they were started.
+        '''        
+        if self.parallel is not None:
+            self.parallel.close()
+            self.parallel = None
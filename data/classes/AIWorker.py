@@ -0,0 +1,104 @@
+import copy
+import queue
+import threading
+
+
+class AIWorker:
+    '''
+    AIWorker class
+    runs the search of an AI on a thread so the window keeps drawing and handling events while the AI thinks.
+    The AI searches a copy of the game and sends the key of its move back through a queue,
+    which the main loop polls once per frame. A search that fails sends its error instead.
+    '''
+
+    def __init__(self):
+        '''
+        __init__
+        '''
+        self.results = queue.Queue()
+        self.thread = None
+        self.ai = None
+        # the error of the last search that found no move, see poll
+        self.error = None
+
+    def thinking(self):
+        '''
+        thinking
+
+        Returns:
+            bool: True while a search is running or its move has not been polled yet.
+        '''
+        return self.thread is not None
+
+    def start(self, ai, game, time_limit):
+        '''
+        start
+
+        Args:
+            ai (AI): the AI to search with, it is left as it is.
+            game (Game): the game to find a move in. It must have a legal move for the AI.
+            time_limit (float): the time budget of the search in seconds.
+        '''
+        self.cancel()
+        self.error = None
+        # a shallow copy keeps the transposition table and move ordering of the AI, but searches a game of its own
+        self.ai = copy.copy(ai)
+        self.ai.game = copy.deepcopy(game)
+        self.thread = threading.Thread(target=self._search, args=(self.ai, time_limit), daemon=True)
+        self.thread.start()
+
+    def _search(self, ai, time_limit):
+        try:
+            best_move = ai.find_best_move(time_limit=time_limit)
+            if best_move is None:
+                raise RuntimeError('the AI found no move')
+            self.results.put(best_move[1].key())
+        except Exception as error:
+            self.results.put(error)
+
+    def poll(self):
+        '''
+        poll
+
+        Returns:
+            int: the key of the move the AI found, see Move.key, or None while it is still thinking.
+                None also when the search failed, which stops the thinking and leaves the exception in error.
+        '''
+        if self.thread is None:
+            return None
+        try:
+            result = self.results.get_nowait()
+        except queue.Empty:
+            return None
+        self.thread = None
+        self.ai = None
+        if isinstance(result, Exception):
+            self.error = result
+            return None
+        return result
+
+    def move_now(self):
+        '''
+        move_now
+
+        Stops the search, its best move so far arrives through poll.
+        '''
+        if self.ai is not None:
+            self.ai.stop()
+
+    def cancel(self):
+        '''
+        cancel
+
+        Stops the search and throws its move away.
+        '''
+        if self.thread is None:
+            return
+        # the search clears the stopped flag when it starts, so keep setting it until the thread is done
+        while self.thread.is_alive():
+            self.ai.stop()
+            self.thread.join(0.01)
+        self.thread = None
+        self.ai = None
+        while not self.results.empty():
+            self.results.get_nowait()
@@ -0,0 +1,518 @@
+'''
+This file contains the bitboard move generation backend.
+Every piece type of every color is kept as a 64 bit Python int with bit row * 8 + col set
+for each square it stands on. Knight, king and pawn attacks come from tables built at import
+and sliding attacks from classical ray tables.
+'''
+from classes.Const import ROWS, COLS
+from classes.Move import encode
+from classes.Mailbox import (EMPTY, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING, NAMES,
+                             DOUBLE_PUSH, EN_PASSANT, CASTLING,
+                             WHITE_KINGSIDE, WHITE_QUEENSIDE, BLACK_KINGSIDE, BLACK_QUEENSIDE)
+
+WHITE = 0
+BLACK = 1
+
+FULL = (1 << 64) - 1
+FILE_A = sum(1 << (row * 8) for row in range(ROWS))
+FILE_H = FILE_A << 7
+ROW_MASKS = tuple(0xFF << (row * 8) for row in range(ROWS))
+
+
+def _table(deltas):
+    '''
+    _table
+
+    Args:
+        deltas (tuple): the (row, col) steps of the piece.
+
+    Returns:
+        tuple: the attack bitboard for every square.
+    '''
+    table = []
+    for row in range(ROWS):
+        for col in range(COLS):
+            bb = 0
+            for row_delta, col_delta in deltas:
+                r, c = row + row_delta, col + col_delta
+                if 0 <= r < ROWS and 0 <= c < COLS:
+                    bb |= 1 << (r * 8 + c)
+            table.append(bb)
+    return tuple(table)
+
+
+KNIGHT_ATTACKS = _table(((2, 1), (2, -1), (-2, 1), (-2, -1), (1, 2), (1, -2), (-1, 2), (-1, -2)))
+KING_ATTACKS = _table(((-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0), (1, -1), (0, -1), (-1, -1)))
+# white pawns move up the board (to row 0), black pawns move down
+PAWN_ATTACKS = (_table(((-1, -1), (-1, 1))), _table(((1, -1), (1, 1))))
+
+# Ray directions, the first four run to higher square indices and the last four to lower ones
+DIRECTIONS = ((0, 1), (1, 0), (1, 1), (1, -1), (0, -1), (-1, 0), (-1, -1), (-1, 1))
+ROOK_DIRECTIONS = (0, 1, 4, 5)
+BISHOP_DIRECTIONS = (2, 3, 6, 7)
+
+
+def _ray(sq, direction):
+    '''
+    _ray
+
+    Args:
+        sq (int): the square the ray starts from.
+        direction (int): the index of the direction in DIRECTIONS.
+
+    Returns:
+        int: the bitboard of the squares on the ray up to the edge of the board.
+    '''
+    row_delta, col_delta = DIRECTIONS[direction]
+    row, col = divmod(sq, 8)
+    bb = 0
+    row += row_delta
+    col += col_delta
+    while 0 <= row < ROWS and 0 <= col < COLS:
+        bb |= 1 << (row * 8 + col)
+        row += row_delta
+        col += col_delta
+    return bb
+
+
+RAYS = tuple(tuple(_ray(sq, direction) for sq in range(64)) for direction in range(8))
+
+# Castling rights kept after a piece moves from or to a square
+CASTLING_MASK = [15] * 64
+CASTLING_MASK[60] = 15 & ~(WHITE_KINGSIDE | WHITE_QUEENSIDE)
+CASTLING_MASK[63] = 15 & ~WHITE_KINGSIDE
+CASTLING_MASK[56] = 15 & ~WHITE_QUEENSIDE
+CASTLING_MASK[4] = 15 & ~(BLACK_KINGSIDE | BLACK_QUEENSIDE)
+CASTLING_MASK[7] = 15 & ~BLACK_KINGSIDE
+CASTLING_MASK[0] = 15 & ~BLACK_QUEENSIDE
+
+
+def ray_attacks(sq, occupied, directions):
+    '''
+    ray_attacks
+
+    Args:
+        sq (int): the square the slider stands on.
+        occupied (int): the bitboard of all pieces.
+        directions (tuple): the ray directions the slider moves in.
+
+    Returns:
+        int: the bitboard of the squares the slider attacks.
+    '''
+    attacks = 0
+    for direction in directions:
+        ray = RAYS[direction][sq]
+        blockers = ray & occupied
+        if blockers:
+            if direction < 4:
+                # nearest blocker is the lowest set bit
+                blocker = (blockers & -blockers).bit_length() - 1
+            else:
+                # nearest blocker is the highest set bit
+                blocker = blockers.bit_length() - 1
+            ray ^= RAYS[direction][blocker]
+        attacks |= ray
+    return attacks
+
+
+class Bitboard:
+    '''
+    Bitboard class
+    contains a chess position as 12 piece bitboards and the set-wise move generation for it.
+    '''
+
+    def __init__(self):
+        '''
+        __init__
+
+        Creates an empty board with white to move.
+        '''
+        self.pieces = [[0] * 7, [0] * 7]
+        self.occupied = [0, 0]
+        self.board = bytearray(64)
+        self.side = WHITE
+        self.castling = 0
+        self.ep = -1
+        self.history = []
+
+    @classmethod
+    def from_game(cls, game, color=None):
+        '''
+        from_game
+        Builds the bitboards from the pieces of a Game.
+
+        Args:
+            game (Game): the game to copy the position from.
+            color (str, optional): the color to move. Defaults to game.turn.
+
+        Returns:
+            Bitboard: the position of the game.
+        '''
+        bitboard = cls()
+        for row in range(ROWS):
+            for col in range(COLS):
+                piece = game.squares[row][col].piece
+                if piece is not None:
+                    bitboard.put(row * 8 + col, BLACK if piece.color == 'black' else WHITE, NAMES[piece.name])
+
+        bitboard.side = BLACK if (color or game.turn) == 'black' else WHITE
+
+        rights = game.castling_rights()
+        for right, flag in (('K', WHITE_KINGSIDE), ('Q', WHITE_QUEENSIDE), ('k', BLACK_KINGSIDE), ('q', BLACK_QUEENSIDE)):
+            if right in rights:
+                bitboard.castling |= flag
+
+        if game.en_passant is not None:
+            row, col = game.en_passant
+            pawn = game.squares[row][col].piece
+            bitboard.ep = (row - pawn.dir) * 8 + col
+
+        return bitboard
+
+    def put(self, sq, color, kind):
+        '''
+        put
+
+        Args:
+            sq (int): the square to put the piece on.
+            color (int): WHITE or BLACK.
+            kind (int): the piece type.
+        '''
+        bit = 1 << sq
+        self.pieces[color][kind] |= bit
+        self.occupied[color] |= bit
+        self.board[sq] = kind | (color << 3)
+
+    def is_attacked(self, sq, by):
+        '''
+        is_attacked
+
+        Args:
+            sq (int): the square to check.
+            by (int): the attacking color, WHITE or BLACK.
+
+        Returns:
+            bool: True if a piece of the attacking color attacks the square.
+        '''
+        pieces = self.pieces[by]
+        if KNIGHT_ATTACKS[sq] & pieces[KNIGHT]:
+            return True
+        if KING_ATTACKS[sq] & pieces[KING]:
+            return True
+        # a pawn of the attacking color attacks sq from where a rival pawn on sq would attack
+        if PAWN_ATTACKS[by ^ 1][sq] & pieces[PAWN]:
+            return True
+        occupied = self.occupied[WHITE] | self.occupied[BLACK]
+        rooks = pieces[ROOK] | pieces[QUEEN]
+        if rooks and ray_attacks(sq, occupied, ROOK_DIRECTIONS) & rooks:
+            return True
+        bishops = pieces[BISHOP] | pieces[QUEEN]
+        if bishops and ray_attacks(sq, occupied, BISHOP_DIRECTIONS) & bishops:
+            return True
+        return False
+
+    def in_check(self, side=None):
+        '''
+        in_check
+
+        Args:
+            side (int, optional): the color of the king, WHITE or BLACK. Defaults to the side to move.
+
+        Returns:
+            bool: True if the king of the side is attacked.
+        '''
+        if side is None:
+            side = self.side
+        king = self.pieces[side][KING]
+        return self.is_attacked(king.bit_length() - 1, side ^ 1)
+
+    def pseudo_moves(self):
+        '''
+        pseudo_moves
+        Generates the moves of the side to move without checking if they leave the king in check.
+
+        Returns:
+            list: the moves as ints.
+        '''
+        side = self.side
+        rival = side ^ 1
+        pieces = self.pieces[side]
+        own = self.occupied[side]
+        them = self.occupied[rival]
+        occupied = own | them
+        empty = ~occupied & FULL
+        moves = []
+        append = moves.append
+
+        # pawns, generated for all pawns at once
+        pawns = pieces[PAWN]
+        if side == WHITE:
+            forward = -8
+            single = (pawns >> 8) & empty
+            double = ((single & ROW_MASKS[5]) >> 8) & empty
+            left = ((pawns & ~FILE_A) >> 9) & FULL
+            right = (pawns & ~FILE_H) >> 7
+            last_row = ROW_MASKS[0]
+        else:
+            forward = 8
+            single = (pawns << 8) & empty
+            double = ((single & ROW_MASKS[2]) << 8) & empty
+            left = ((pawns & ~FILE_A) << 7) & FULL
+            right = ((pawns & ~FILE_H) << 9) & FULL
+            last_row = ROW_MASKS[7]
+
+        for targets, delta in ((single, forward), (left & them, forward - 1), (right & them, forward + 1)):
+            while targets:
+                bit = targets & -targets
+                targets ^= bit
+                to = bit.bit_length() - 1
+                if bit & last_row:
+                    for promotion in (QUEEN, ROOK, BISHOP, KNIGHT):
+                        append(encode(to - delta, to, promotion))
+                else:
+                    append(encode(to - delta, to))
+        while double:
+            bit = double & -double
+            double ^= bit
+            to = bit.bit_length() - 1
+            append(encode(to - 2 * forward, to, 0, DOUBLE_PUSH))
+        if self.ep >= 0:
+            # the pawns that can capture en passant attack the target square like a rival pawn would
+            attackers = PAWN_ATTACKS[rival][self.ep] & pawns
+            while attackers:
+                bit = attackers & -attackers
+                attackers ^= bit
+                append(encode(bit.bit_length() - 1, self.ep, 0, EN_PASSANT))
+
+        # knights, sliders and kings
+        for kind in (KNIGHT, BISHOP, ROOK, QUEEN, KING):
+            bb = pieces[kind]
+            while bb:
+                bit = bb & -bb
+                bb ^= bit
+                frm = bit.bit_length() - 1
+                if kind == KNIGHT:
+                    targets = KNIGHT_ATTACKS[frm]
+                elif kind == KING:
+                    targets = KING_ATTACKS[frm]
+                elif kind == BISHOP:
+                    targets = ray_attacks(frm, occupied, BISHOP_DIRECTIONS)
+                elif kind == ROOK:
+                    targets = ray_attacks(frm, occupied, ROOK_DIRECTIONS)
+                else:
+                    targets = ray_attacks(frm, occupied, ROOK_DIRECTIONS + BISHOP_DIRECTIONS)
+                targets &= ~own
+                while targets:
+                    target = targets & -targets
+                    targets ^= target
+                    append(encode(frm, target.bit_length() - 1))
+
+        # castling moves
+        if side == WHITE:
+            king, kingside, queenside = 60, WHITE_KINGSIDE, WHITE_QUEENSIDE
+        else:
+            king, kingside, queenside = 4, BLACK_KINGSIDE, BLACK_QUEENSIDE
+        if self.castling & (kingside | queenside) and not self.is_attacked(king, rival):
+            if (self.castling & kingside and not occupied & (0b11 << (king + 1))
+                    and not self.is_attacked(king + 1, rival)):
+                append(encode(king, king + 2, 0, CASTLING))
+            if (self.castling & queenside and not occupied & (0b111 << (king - 3))
+                    and not self.is_attacked(king - 1, rival)):
+                append(encode(king, king - 2, 0, CASTLING))
+
+        return moves
+
+    def legal_moves(self, captures=False):
+        '''
+        legal_moves
+
+        Args:
+            captures (bool, optional): only captures and promotions, for quiescence search. Defaults to False.
+
+        Returns:
+            list: the moves of the side to move that do not leave its king in check.
+        '''
+        side = self.side
+        board = self.board
+        legal = []
+        for move in self.pseudo_moves():
+            if captures and not (board[(move >> 6) & 63] or (move >> 12) & 7 or move >> 15 == EN_PASSANT):
+                continue
+            self.make_move(move)
+            if not self.in_check(side):
+                legal.append(move)
+            self.unmake_move()
+        return legal
+
+    def make_move(self, move):
+        '''
+        make_move
+
+        Args:
+            move (int): the move to make.
+        '''
+        board = self.board
+        side = self.side
+        rival = side ^ 1
+        frm = move & 63
+        to = (move >> 6) & 63
+        promotion = (move >> 12) & 7
+        flag = move >> 15
+        kind = board[frm] & 7
+
+        captured = board[to]
+        self.history.append((move, captured, self.castling, self.ep))
+
+        if flag == EN_PASSANT:
+            captured_sq = to + 8 if side == WHITE else to - 8
+            bit = 1 << captured_sq
+            self.pieces[rival][PAWN] ^= bit
+            self.occupied[rival] ^= bit
+            board[captured_sq] = EMPTY
+        elif captured:
+            bit = 1 << to
+            self.pieces[rival][captured & 7] ^= bit
+            self.occupied[rival] ^= bit
+
+        move_bits = (1 << frm) | (1 << to)
+        self.occupied[side] ^= move_bits
+        if promotion:
+            self.pieces[side][PAWN] ^= 1 << frm
+            self.pieces[side][promotion] |= 1 << to
+            board[to] = promotion | (side << 3)
+        else:
+            self.pieces[side][kind] ^= move_bits
+            board[to] = board[frm]
+        board[frm] = EMPTY
+
+        if flag == CASTLING:
+            rook_from, rook_to = (frm + 3, frm + 1) if to > frm else (frm - 4, frm - 1)
+            rook_bits = (1 << rook_from) | (1 << rook_to)
+            self.pieces[side][ROOK] ^= rook_bits
+            self.occupied[side] ^= rook_bits
+            board[rook_to] = board[rook_from]
+            board[rook_from] = EMPTY
+
+        self.castling &= CASTLING_MASK[frm] & CASTLING_MASK[to]
+        self.ep = (frm + to) // 2 if flag == DOUBLE_PUSH else -1
+        self.side = rival
+
+    def unmake_move(self):
+        '''
+        unmake_move
+        Takes back the last move made with make_move.
+        '''
+        board = self.board
+        move, captured, self.castling, self.ep = self.history.pop()
+        rival = self.side
+        side = self.side = rival ^ 1
+        frm = move & 63
+        to = (move >> 6) & 63
+        promotion = (move >> 12) & 7
+        flag = move >> 15
+
+        if flag == CASTLING:
+            rook_from, rook_to = (frm + 3, frm + 1) if to > frm else (frm - 4, frm - 1)
+            rook_bits = (1 << rook_from) | (1 << rook_to)
+            self.pieces[side][ROOK] ^= rook_bits
+            self.occupied[side] ^= rook_bits
+            board[rook_from] = board[rook_to]
+            board[rook_to] = EMPTY
+
+        move_bits = (1 << frm) | (1 << to)
+        self.occupied[side] ^= move_bits
+        if promotion:
+            self.pieces[side][promotion] ^= 1 << to
+            self.pieces[side][PAWN] |= 1 << frm
+            board[frm] = PAWN | (side << 3)
+        else:
+            self.pieces[side][board[to] & 7] ^= move_bits
+            board[frm] = board[to]
+        board[to] = captured
+
+        if flag == EN_PASSANT:
+            captured_sq = to + 8 if side == WHITE else to - 8
+            bit = 1 << captured_sq
+            self.pieces[rival][PAWN] |= bit
+            self.occupied[rival] |= bit
+            board[captured_sq] = PAWN | (rival << 3)
+        elif captured:
+            bit = 1 << to
+            self.pieces[rival][captured & 7] |= bit
+            self.occupied[rival] |= bit
+
+    @staticmethod
+    def promotion(move):
+        '''
+        promotion
+
+        Args:
+            move (int): the bitboard move.
+
+        Returns:
+            int: the piece type a pawn promotes to, or 0.
+        '''
+        return (move >> 12) & 7
+
+    def to_game_code(self, move):
+        '''
+        to_game_code
+        Bitboard moves number the squares like the Game and are made with the same encode,
+        so they are already the int moves the Game and the search use.
+
+        Args:
+            move (int): the bitboard move.
+
+        Returns:
+            int: the same move for the Game.
+        '''
+        return move
+
+    def from_game_code(self, code):
+        '''
+        from_game_code
+
+        Args:
+            code (int): an int move of the Game, see Move.encode.
+
+        Returns:
+            int: the same move for the bitboards, see to_game_code.
+        '''
+        return code
+
+    def make_null_move(self):
+        '''
+        make_null_move
+        Passes the turn to the other side without moving a piece, for null move pruning.
+
+        Returns:
+            int: the en passant square from before, to pass to unmake_null_move.
+        '''
+        ep = self.ep
+        self.ep = -1
+        self.side ^= 1
+        return ep
+
+    def unmake_null_move(self, ep):
+        '''
+        unmake_null_move
+
+        Args:
+            ep (int): the en passant square make_null_move returned.
+        '''
+        self.ep = ep
+        self.side ^= 1
+
+    def to_game_move(self, game, move):
+        '''
+        to_game_move
+        Converts a bitboard move to the piece and Move the Game uses for it.
+
+        Args:
+            game (Game): the game the bitboards were built from.
+            move (int): the bitboard move.
+
+        Returns:
+            tuple: the piece to move and the Move.
+        '''
+        return game.key_move(move)
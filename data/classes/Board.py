@@ -1,9 +1,17 @@
+import os
 import pygame
 
 from classes.Const import *
 from classes.Game import Game
 from classes.Dragger import Dragger
+from classes.Textures import Textures
 from classes.AI import AI
+from classes.AIWorker import AIWorker
+from classes.OpeningBook import OpeningBook
+from classes.Tablebase import Tablebase
+
+# Event the AI vs AI modes schedule with a timer to play their next move
+AI_MOVE = pygame.USEREVENT + 1
 
 
 class Board:    
@@ -14,60 +22,96 @@ class Board:
         '''        
         self.next_player = 'white'
         self.game = Game()
-        self.dragger = Dragger()
+        # piece images, loaded once instead of every frame
+        self.textures = Textures()
+        self.dragger = Dragger(self.textures)
+        # one AI per color, so its transposition table lasts the whole game
+        self.ais = {}
+        # the opening book of the AIs, if there is one
+        self.book = OpeningBook(BOOK_FILE) if os.path.exists(BOOK_FILE) else None
+        # and their endgame tables
+        self.tablebase = Tablebase(TABLEBASE_DIR) if os.path.isdir(TABLEBASE_DIR) else None
+        # the smart AI thinks on a worker thread, the board polls it every frame
+        self.worker = AIWorker()
+        self.paused = False
+        self.game_over = False
+        self.font = None
+        # what the last render drew, so the next one only draws what changed
+        self.background = None
+        self.drawn_pieces = None
+        self.drawn_moves = set()
+        self.drawn_drag = None
+        self.drawn_text = None
+        self.drawn_label = None
 
         self.game_mode = input("Choose game mode\n1: Player vs Player\n2: Player vs Dumb AI\n3: Dumb AI vs Dumb AI\n4: Player vs AI\n5: AI vs AI\n")
 
 
     # blit methods
 
-    def show_bg(self, surface):
+    def show_bg(self, surface, squares=None):
         '''
         show_bg 
+        Blits the checkerboard from a background surface that is drawn only once.
 
         Args:
             surface (_type_): the surface to blit the background to.
+            squares (_type_, optional): the (row, col) squares to blit. Defaults to all squares.
         '''        
-        for row in range(ROWS):
-            for col in range(COLS):
-                if (row + col) % 2 == 0:
-                    color = (128, 128, 128)
-                else:
-                    color = (96, 96, 96)
+        if self.background is None:
+            self.background = pygame.Surface((COLS * SQSIZE, ROWS * SQSIZE))
+            for row in range(ROWS):
+                for col in range(COLS):
+                    if (row + col) % 2 == 0:
+                        color = (128, 128, 128)
+                    else:
+                        color = (96, 96, 96)
 
-                rect = (col * SQSIZE, row * SQSIZE, SQSIZE, SQSIZE)
+                    rect = (col * SQSIZE, row * SQSIZE, SQSIZE, SQSIZE)
 
-                pygame.draw.rect(surface, color, rect)
+                    pygame.draw.rect(self.background, color, rect)
 
-    def show_pieces(self, surface):
+        if squares is None:
+            surface.blit(self.background, (0, 0))
+            return
+        for row, col in squares:
+            rect = (col * SQSIZE, row * SQSIZE, SQSIZE, SQSIZE)
+            surface.blit(self.background, rect, rect)
+
+    def show_pieces(self, surface, squares=None):
         '''
         show_pieces
 
         Args:
             surface (_type_): the surface to blit the pieces to.
+            squares (_type_, optional): the (row, col) squares to blit. Defaults to all squares.
         '''        
-        for row in range(ROWS):
-            for col in range(COLS):
-                if self.game.squares[row][col].has_piece():
-                    piece = self.game.squares[row][col].piece
-                    # all pieces except the last one
-                    if piece is not self.dragger.piece:
+        if squares is None:
+            squares = [(row, col) for row in range(ROWS) for col in range(COLS)]
+        for row, col in squares:
+            if self.game.squares[row][col].has_piece():
+                piece = self.game.squares[row][col].piece
+                # all pieces except the last one
+                if piece is not self.dragger.piece:
 
-                        img = pygame.image.load(piece.texture)
-                        img_center = col * SQSIZE + SQSIZE // 2, row * SQSIZE + SQSIZE // 2
-                        piece.texture_rect = img.get_rect(center=img_center)
-                        surface.blit(img, piece.texture_rect)
+                    img = self.textures.get(piece)
+                    img_center = col * SQSIZE + SQSIZE // 2, row * SQSIZE + SQSIZE // 2
+                    piece.texture_rect = img.get_rect(center=img_center)
+                    surface.blit(img, piece.texture_rect)
 
-    def show_moves(self, surface):
+    def show_moves(self, surface, squares=None):
         '''
         show_moves
         Args:
             surface (_type_): The surface to display the moves from.
+            squares (_type_, optional): the (row, col) squares to blit. Defaults to all squares.
         '''        
         if self.dragger.dragging:
             piece = self.dragger.piece
 
             for move in piece.moves:
+                if squares is not None and (move.final.row, move.final.col) not in squares:
+                    continue
                 # color
                 color = (200, 100, 100) if (move.final.row + move.final.col) % 2 == 0 else (200, 70, 70)
                 # rect
@@ -75,7 +119,135 @@ class Board:
                 # blit
                 pygame.draw.rect(surface, color, rect)
 
+    def thinking_text(self):
+        '''
+        thinking_text
+
+        Returns:
+            _type_: the text of the thinking indicator, or None when it is hidden.
+        '''        
+        if self.worker.thinking():
+            dots = '.' * (pygame.time.get_ticks() // 300 % 4)
+            return f'{self.next_player} is thinking{dots:<3}   space: move now   esc: cancel'
+        if self.paused and not self.game_over:
+            return 'AI paused   space: resume'
+        return None
+
+    def show_thinking(self, surface):
+        '''
+        show_thinking
+        Shows that the AI is thinking, and which keys move now or cancel.
+
+        Args:
+            surface (_type_): the surface to blit the indicator to.
+
+        Returns:
+            _type_: the rect of the indicator, or None when it is hidden.
+        '''        
+        text = self.thinking_text()
+        if text is None:
+            return None
+
+        if self.font is None:
+            self.font = pygame.font.Font(None, 28)
+        label = self.font.render(text, True, (255, 255, 255), (0, 0, 0))
+        return surface.blit(label, (8, 8))
+
+    @staticmethod
+    def squares_under(rect):
+        '''
+        squares_under
+
+        Args:
+            rect (_type_): a rect on the screen, or None.
+
+        Returns:
+            _type_: the set of (row, col) squares the rect overlaps.
+        '''        
+        if rect is None:
+            return set()
+        rect = rect.clip(pygame.Rect(0, 0, COLS * SQSIZE, ROWS * SQSIZE))
+        if rect.width == 0 or rect.height == 0:
+            return set()
+        return {(row, col)
+                for row in range(rect.top // SQSIZE, (rect.bottom - 1) // SQSIZE + 1)
+                for col in range(rect.left // SQSIZE, (rect.right - 1) // SQSIZE + 1)}
+
+    def invalidate(self):
+        '''
+        invalidate
+
+        Makes the next render draw the whole board, after the window was covered for example.
+        '''        
+        self.drawn_pieces = None
+
+    def render(self, surface):
+        '''
+        render
+        Draws only what changed since the last render: squares whose piece changed, squares whose move
+        highlight changed and the squares under the dragged piece and the thinking indicator when they move.
+
+        Args:
+            surface (_type_): the surface to draw to.
+
+        Returns:
+            _type_: the rects of the surface that were drawn, for pygame.display.update.
+        '''        
+        dragger = self.dragger
+        pieces = [square.piece if square.piece is not dragger.piece else None
+                  for row in self.game.squares for square in row]
+        moves = {(move.final.row, move.final.col) for move in dragger.piece.moves} if dragger.dragging else set()
+        drag_rect = None
+        if dragger.dragging:
+            drag_rect = self.textures.get(dragger.piece).get_rect(center=(dragger.MouseX, dragger.MouseY))
+        text = self.thinking_text()
+
+        if self.drawn_pieces is None:
+            dirty = {(row, col) for row in range(ROWS) for col in range(COLS)}
+        else:
+            dirty = {divmod(i, COLS) for i in range(ROWS * COLS) if pieces[i] is not self.drawn_pieces[i]}
+            dirty |= moves ^ self.drawn_moves
+            if drag_rect != self.drawn_drag:
+                dirty |= self.squares_under(self.drawn_drag) | self.squares_under(drag_rect)
+            if text != self.drawn_text:
+                dirty |= self.squares_under(self.drawn_label)
+
+        self.drawn_pieces = pieces
+        self.drawn_moves = moves
+        self.drawn_drag = drag_rect
+        self.drawn_text = text
+
+        self.show_bg(surface, dirty)
+        self.show_moves(surface, dirty)
+        self.show_pieces(surface, dirty)
+        rects = [pygame.Rect(col * SQSIZE, row * SQSIZE, SQSIZE, SQSIZE) for row, col in dirty]
+
+        # the dragged piece and the indicator go on top of the squares drawn under them
+        if drag_rect is not None and drag_rect.collidelist(rects) != -1:
+            dragger.update_blit(surface)
+            rects.append(drag_rect)
+        if text is None:
+            self.drawn_label = None
+        elif self.drawn_label is None or self.drawn_label.collidelist(rects) != -1:
+            self.drawn_label = self.show_thinking(surface)
+            rects.append(self.drawn_label)
+        return rects
+
     # other methods
+    def get_ai(self, color):
+        '''
+        get_ai
+
+        Args:
+            color (_type_): the color the AI plays.
+
+        Returns:
+            _type_: the AI playing the given color.
+        '''        
+        if color not in self.ais:
+            self.ais[color] = AI(self.game, color, book=self.book, tablebase=self.tablebase)
+        return self.ais[color]
+
     # player vs player
     def player_vs_player_turn(self):
         '''
@@ -94,7 +266,7 @@ class Board:
         '''        
         if self.next_player == 'white':
             self.next_player = 'black'
-            ai = AI(self.game, self.next_player)
+            ai = self.get_ai(self.next_player)
             ai.make_random_move()
             self.next_player = 'white'
 
@@ -104,21 +276,19 @@ class Board:
         dumb_ai_vs_dumb_ai_turn 
 
         initializes the dumb ai versus dumb ai game mode.
+        Called on the AI_MOVE timer event, it plays one move and schedules the next one.
         '''        
-
+        if self.check_game_over(self.next_player):
+            return
         # Create AI for the current player
-        ai = AI(self.game, self.next_player)
+        ai = self.get_ai(self.next_player)
         # Make a move with the AI
         ai.make_random_move()
-        # Check if the game is a checkmate
-        if self.game.is_checkmate(self.next_player):
-            winner = 'white' if self.next_player == 'black' else 'black'
-            print(f'Checkmate! {winner} wins in {self.game.turn} turns.')
-            return
         # Switch to the other player
         self.next_player = 'white' if self.next_player == 'black' else 'black'
-        # Add a delay so you can watch the game
-        pygame.time.wait(250)  # delay for 1000 milliseconds (1 second)
+        # Wait a bit so you can watch the game, without blocking the window
+        if not self.check_game_over(self.next_player):
+            self.schedule_ai_move()
 
     # player vs smarter ai
     def player_vs_smarter_ai_turn(self):
@@ -130,27 +300,101 @@ class Board:
         '''        
         if self.next_player == 'white':
             self.next_player = 'black'
-            ai = AI(self.game, self.next_player)
-            ai.make_smart_move(depth=3)
-            self.next_player = 'white'
+            self.think()
 
     def ai_vs_ai_turn(self):
         '''
         ai_vs_ai_turn 
 
         Initializes the ai versus ai game mode.
-        This game mode is using minimax with alpha-beta pruning.        
+        This game mode is using minimax with alpha-beta pruning.
+        Called on the AI_MOVE timer event, it starts the search of the next player when no AI is thinking.
         '''        
-        # Create AI for the current player
-        ai = AI(self.game, self.next_player)
-        # Make a move with the AI
-        ai.make_smart_move(depth=3)
-        # Check if the game is a checkmate
-        if self.game.is_checkmate(self.next_player):
-            winner = 'white' if self.next_player == 'black' else 'black'
-            print(f'Checkmate! {winner} wins in {self.game.turn} turns.')
+        if not self.worker.thinking() and not self.paused and not self.game_over:
+            self.think()
+
+    def think(self):
+        '''
+        think
+
+        Starts the search of the AI of the next player on the worker, unless the game is over.
+        '''        
+        if self.check_game_over(self.next_player):
             return
-        # Switch to the other player
+        self.worker.start(self.get_ai(self.next_player), self.game, AI_TIME_LIMIT)
+
+    def update(self):
+        '''
+        update
+
+        Called every frame. Plays the move of the AI once the worker has found it.
+        A search that failed pauses the AI, move_now lets it think again.
+        '''        
+        key = self.worker.poll()
+        if self.worker.error is not None:
+            print(f'{self.next_player} AI failed: {self.worker.error!r}')
+            self.worker.error = None
+            self.paused = True
+            return
+        if key is None:
+            return
+        self.game.move(*self.game.key_move(key))
         self.next_player = 'white' if self.next_player == 'black' else 'black'
-        # Add a delay so you can watch the game
-        pygame.time.wait(250)  # delay for 250 milliseconds (0.25 second)
\ No newline at end of file
+        if not self.check_game_over(self.next_player) and self.game_mode == '5':
+            self.schedule_ai_move()
+
+    def schedule_ai_move(self, delay=AI_MOVE_DELAY):
+        '''
+        schedule_ai_move
+
+        Posts an AI_MOVE event once the delay has passed, the main loop then lets the next AI move.
+
+        Args:
+            delay (_type_, optional): the delay in milliseconds. Defaults to AI_MOVE_DELAY.
+        '''        
+        pygame.time.set_timer(AI_MOVE, delay, loops=1)
+
+    def move_now(self):
+        '''
+        move_now
+
+        Makes the thinking AI play its best move so far, or lets a paused AI think again.
+        '''        
+        if self.worker.thinking():
+            self.worker.move_now()
+        elif self.paused:
+            self.paused = False
+            if self.game_mode == '5' or (self.game_mode == '4' and self.next_player == 'black'):
+                self.think()
+
+    def cancel_thinking(self):
+        '''
+        cancel_thinking
+
+        Throws the search of the thinking AI away and pauses the AI until move_now.
+        '''        
+        if self.worker.thinking():
+            self.worker.cancel()
+            self.paused = True
+
+    def check_game_over(self, color):
+        '''
+        check_game_over
+
+        Args:
+            color (_type_): the color to move.
+
+        Returns:
+            _type_: True if the color has no legal moves left, the game is then over.
+        '''        
+        if self.game_over:
+            return True
+        if self.game.legal_moves(color):
+            return False
+        self.game_over = True
+        if self.game.king_attacked(color):
+            winner = 'white' if color == 'black' else 'black'
+            print(f'Checkmate! {winner} wins.')
+        else:
+            print('Stalemate!')
+        return True
\ No newline at end of file
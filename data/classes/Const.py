@@ -9,3 +9,20 @@ HEIGHT = 800
 ROWS = 8
 COLS = 8
 SQSIZE = WIDTH // COLS
+# Width and height the piece images are drawn at in pixels, the size of the images in data/imgs,
+# which leaves a margin of 20 pixels around a piece in its square
+PIECE_SIZE = 60
+
+# Time the AI may think per move in seconds
+AI_TIME_LIMIT = 2.0
+
+# Frames the window draws per second at most
+FPS = 60
+# Delay between the moves of the AI vs AI modes in milliseconds, so you can watch the game
+AI_MOVE_DELAY = 250
+
+# Opening book the AI plays from when the file exists, see OpeningBook
+BOOK_FILE = 'data/book.bin'
+
+# Endgame tables the AI plays from when the directory exists, see Tablebase
+TABLEBASE_DIR = 'data/tablebases'
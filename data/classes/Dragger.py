@@ -1,5 +1,3 @@
-import pygame
-
 from classes.Const import *
 
 class Dragger:
@@ -7,12 +5,16 @@ class Dragger:
     This class is used to handle the dragging of the piece.
     '''    
 
-    def __init__(self):
+    def __init__(self, textures=None):
         '''
         __init__ 
 
         This function contains the initialization of the class.
+
+        Args:
+            textures (Textures, optional): The piece images to draw the dragged piece with.
         '''        
+        self.textures = textures
         self.piece = None
         self.dragging = False
         self.MouseX = 0
@@ -29,12 +31,8 @@ class Dragger:
         Args:
             surface (_type_): The surface to update the blit to. This should be a pygame surface.
         '''        
-        # texture
-        self.piece.set_texture()
-        texture = self.piece.texture
-
         # image
-        img = pygame.image.load(texture)
+        img = self.textures.get(self.piece)
 
         # rect
         img_center = (self.MouseX, self.MouseY)
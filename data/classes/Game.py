@@ -1,67 +1,351 @@
-import copy
-
 from classes.Const import *
 from classes.Square import Square
 from classes.Piece import *
-from classes.Move import Move
+from classes.Move import Move, encode, DOUBLE_PUSH, EN_PASSANT, CASTLING, PROMOTION_CODES, PROMOTION_NAMES
+from classes.Undo import Undo
+from classes.Zobrist import SIDE_KEY, EP_KEYS, PIECE_KEYS, castling_key, hash_game
+from classes.Evaluation import MG_SCORES, EG_SCORES, PHASE_WEIGHTS, score_game, taper
+
+
+# (row, col) steps used to look outward from a square for attackers
+KNIGHT_STEPS = ((2, 1), (2, -1), (-2, 1), (-2, -1), (1, 2), (1, -2), (-1, 2), (-1, -2))
+KING_STEPS = ((-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0), (1, -1), (0, -1), (-1, -1))
+ROOK_STEPS = ((1, 0), (-1, 0), (0, 1), (0, -1))
+BISHOP_STEPS = ((1, 1), (-1, 1), (1, -1), (-1, -1))
+
+# Pieces a pawn can promote to
+PROMOTIONS = {'queen': Queen, 'rook': Rook, 'bishop': Bishop, 'knight': Knight}
+# promotion bits of the moves of a pawn reaching the last row, see encode
+PROMOTION_MOVES = tuple(PROMOTION_CODES[name] << 12 for name in PROMOTIONS)
+
+
+def _targets(sq, steps):
+    row, col = divmod(sq, COLS)
+    return tuple((row + row_step) * COLS + col + col_step for row_step, col_step in steps
+                 if 0 <= row + row_step < ROWS and 0 <= col + col_step < COLS)
+
+
+def _rays(sq, steps):
+    row, col = divmod(sq, COLS)
+    rays = []
+    for row_step, col_step in steps:
+        ray = []
+        r, c = row + row_step, col + col_step
+        while 0 <= r < ROWS and 0 <= c < COLS:
+            ray.append(r * COLS + c)
+            r += row_step
+            c += col_step
+        if ray:
+            rays.append(tuple(ray))
+    return tuple(rays)
+
+
+# Squares a knight or king reaches and the rays of the sliding pieces, for every square row * 8 + col
+KNIGHT_TARGETS = tuple(_targets(sq, KNIGHT_STEPS) for sq in range(ROWS * COLS))
+KING_TARGETS = tuple(_targets(sq, KING_STEPS) for sq in range(ROWS * COLS))
+SLIDER_RAYS = {
+    'bishop': tuple(_rays(sq, BISHOP_STEPS) for sq in range(ROWS * COLS)),
+    'rook': tuple(_rays(sq, ROOK_STEPS) for sq in range(ROWS * COLS)),
+    'queen': tuple(_rays(sq, ROOK_STEPS + BISHOP_STEPS) for sq in range(ROWS * COLS)),
+}
+
+# FEN letters of the black pieces, white pieces use the upper case letter
+FEN_PIECES = {'p': Pawn, 'n': Knight, 'b': Bishop, 'r': Rook, 'q': Queen, 'k': King}
+FEN_LETTERS = {'pawn': 'p', 'knight': 'n', 'bishop': 'b', 'rook': 'r', 'queen': 'q', 'king': 'k'}
+FEN_NAMES = {letter: name for name, letter in FEN_LETTERS.items()}
+FILES = 'abcdefgh'
 
 
 class Game:
 
-    def __init__(self):
+    def __init__(self, fen=None):
+        '''
+        __init__
+
+        Args:
+            fen (str, optional): The position to start from in FEN notation. Defaults to None, the initial position.
+        '''        
         self.squares = [[0, 0, 0, 0, 0, 0, 0, 0] for col in range(COLS)]
         self.turn = 'white'
+        self.en_passant = None
+        self.last_move = None
         self._create()
-        self._add_pieces('white')
-        self._add_pieces('black')
+        if fen is None:
+            self._add_pieces('white')
+            self._add_pieces('black')
+        else:
+            self._load_fen(fen)
+        # the same squares in one list, indexed by row * 8 + col like the int moves
+        self.cells = [square for row in self.squares for square in row]
+        # squares of the kings, kept up to date by make_move and unmake_move
+        self.kings = {square.piece.color: square for row in self.squares for square in row
+                      if isinstance(square.piece, King)}
+        # castling rights and Zobrist hash, kept up to date by make_move and unmake_move
+        self.castle_rights = self.castling_rights()
+        self.hash = hash_game(self)
+        # middlegame score, endgame score and phase of the position, kept up to date by make_move and unmake_move
+        self.mg, self.eg, self.phase = score_game(self)
         
-    def move(self, piece, move, testing=False):
+    def move(self, piece, move):
         '''
         move _summary_
-        This function is used to move a piece to a new square and returns the move. The move should be an instance of Move.
+        This function is used to move a piece to a new square. The move should be an instance of Move.
 
         Args:
-            piece (_type_):  The piece to move to the new square and return the move.
+            piece (_type_):  The piece to move to the new square.
             move (_type_): The move to make with the piece to the new square
-            testing (bool, optional): _description_. Defaults to False.
         '''        
-        initial = move.initial
-        final = move.final
+        self.make_move(move)
 
-        # check if the piece is already in the square and if it is not then return False.
-        en_passant_empty = self.squares[final.row][final.col].isempty()
+        # clear valid moves
+        piece.clear_moves()
 
-        # console game move update
-        self.squares[initial.row][initial.col].piece = None
-        self.squares[final.row][final.col].piece = piece
+    def make_move(self, move):
+        '''
+        make_move
+        This function makes a move on the board in place and returns an undo record.
+        Passing the undo record to unmake_move restores the exact position from before the move,
+        including the captured piece, moved flags, en passant state, the castling rook and promotion.
 
-        if piece.name == 'pawn':
-            # en passant capture
-            diff = final.col - initial.col
-            if diff != 0 and en_passant_empty:
-                # console game move update          
-                self.squares[initial.row][initial.col + diff].piece = None
-                self.squares[final.row][final.col].piece = piece
+        Args:
+            move (int): The move to make, made with encode. A Move is turned into one with move_code.
+                The initial square must hold the piece to move.
 
-            # pawn promotion
-            self.check_promotion(piece, final)
+        Returns:
+            Undo: The undo record of the move.
+        '''        
+        if not isinstance(move, int):
+            move = self.move_code(move)
+        frm = move & 63
+        to = (move >> 6) & 63
+        promotion = (move >> 12) & 7
+        flag = move >> 15
+        initial_row, initial_col = divmod(frm, COLS)
+        final_row, final_col = divmod(to, COLS)
+        cells = self.cells
+        piece = cells[frm].piece
+        captured = cells[to].piece
+
+        undo = Undo(move, piece, captured, final_row, final_col, piece.moved, self.en_passant, self.last_move)
+        undo.castle_rights = self.castle_rights
+        undo.hash = key = self.hash
+        undo.scores = (self.mg, self.eg, self.phase)
+        mg, eg, phase = self.mg, self.eg, self.phase
+
+        # the en passant right only lasts one move
+        if self.en_passant is not None:
+            self.squares[self.en_passant[0]][self.en_passant[1]].piece.en_passant = False
+            key ^= EP_KEYS[self.en_passant[1]]
+            self.en_passant = None
+
+        # en passant capture
+        if flag == EN_PASSANT:
+            undo.captured = cells[frm - initial_col + final_col].piece
+            undo.captured_row = initial_row
+            cells[frm - initial_col + final_col].piece = None
+
+        if undo.captured is not None:
+            sq = undo.captured_row * COLS + undo.captured_col
+            victim = (undo.captured.color, undo.captured.name)
+            key ^= PIECE_KEYS[victim][sq]
+            mg -= MG_SCORES[victim][sq]
+            eg -= EG_SCORES[victim][sq]
+            phase -= PHASE_WEIGHTS[undo.captured.name]
+
+        # console game move update
+        cells[frm].piece = None
+        cells[to].piece = piece
+        moving = (piece.color, piece.name)
+        key ^= PIECE_KEYS[moving][frm] ^ PIECE_KEYS[moving][to]
+        mg += MG_SCORES[moving][to] - MG_SCORES[moving][frm]
+        eg += EG_SCORES[moving][to] - EG_SCORES[moving][frm]
+
+        # pawn promotion
+        if promotion:
+            undo.promoted = self.check_promotion(piece, cells[to], PROMOTION_NAMES[promotion])
+            promoted = (undo.promoted.color, undo.promoted.name)
+            key ^= PIECE_KEYS[moving][to] ^ PIECE_KEYS[promoted][to]
+            mg += MG_SCORES[promoted][to] - MG_SCORES[moving][to]
+            eg += EG_SCORES[promoted][to] - EG_SCORES[moving][to]
+            phase += PHASE_WEIGHTS[undo.promoted.name]
 
         # king castling
-        if piece.name == 'king':
-            if self.castling(initial, final) and not testing:
-                diff = final.col - initial.col
-                rook = piece.left_rook if (diff < 0) else piece.right_rook
-                self.move(rook, rook.moves[-1])
+        if flag == CASTLING:
+            rook_from = 0 if final_col < initial_col else 7
+            rook_to = 3 if final_col < initial_col else 5
+            rook = self.squares[initial_row][rook_from].piece
+            undo.rook = rook
+            undo.rook_from = rook_from
+            undo.rook_to = rook_to
+            undo.rook_moved = rook.moved
+            self.squares[initial_row][rook_from].piece = None
+            self.squares[initial_row][rook_to].piece = rook
+            rook.moved = True
+            rook_key = (rook.color, 'rook')
+            rook_from, rook_to = initial_row * COLS + rook_from, initial_row * COLS + rook_to
+            key ^= PIECE_KEYS[rook_key][rook_from] ^ PIECE_KEYS[rook_key][rook_to]
+            mg += MG_SCORES[rook_key][rook_to] - MG_SCORES[rook_key][rook_from]
+            eg += EG_SCORES[rook_key][rook_to] - EG_SCORES[rook_key][rook_from]
+
+        # en passant state
+        if flag == DOUBLE_PUSH:
+            piece.en_passant = True
+            self.en_passant = (final_row, final_col)
+            key ^= EP_KEYS[final_col]
 
         # move
         piece.moved = True
+        if piece.name == 'king':
+            self.kings[piece.color] = cells[to]
+        self.turn = 'black' if self.turn == 'white' else 'white'
 
-        # clear valid moves
-        piece.clear_moves()
+        # castling rights can only change when a king or rook moves or a rook is captured
+        if piece.name == 'king' or piece.name == 'rook' or (undo.captured is not None and undo.captured.name == 'rook'):
+            rights = self.castling_rights()
+            if rights != self.castle_rights:
+                key ^= castling_key(self.castle_rights) ^ castling_key(rights)
+                self.castle_rights = rights
+
+        self.hash = key ^ SIDE_KEY
+        self.mg, self.eg, self.phase = mg, eg, phase
 
         # last move
         self.last_move = move
 
+        return undo
+
+    def unmake_move(self, undo):
+        '''
+        unmake_move
+        This function takes back a move made with make_move.
+        Moves have to be unmade in the reverse order they were made in.
+
+        Args:
+            undo (Undo): The undo record returned by make_move.
+        '''        
+        frm = undo.move & 63
+        piece = undo.piece
+        cells = self.cells
+
+        # en passant state
+        if self.en_passant is not None:
+            piece.en_passant = False
+
+        # king castling
+        if undo.rook is not None:
+            row = self.squares[frm // COLS]
+            row[undo.rook_to].piece = None
+            row[undo.rook_from].piece = undo.rook
+            undo.rook.moved = undo.rook_moved
+
+        # console game move update
+        cells[(undo.move >> 6) & 63].piece = None
+        self.squares[undo.captured_row][undo.captured_col].piece = undo.captured
+        cells[frm].piece = piece
+
+        # move
+        piece.moved = undo.moved
+        if piece.name == 'king':
+            self.kings[piece.color] = cells[frm]
+        self.turn = 'black' if self.turn == 'white' else 'white'
+        self.castle_rights = undo.castle_rights
+        self.hash = undo.hash
+        self.mg, self.eg, self.phase = undo.scores
+
+        # restore the en passant right the move took away
+        self.en_passant = undo.en_passant
+        if self.en_passant is not None:
+            self.squares[self.en_passant[0]][self.en_passant[1]].piece.en_passant = True
+
+        # last move
+        self.last_move = undo.last_move
+
+    def make_null_move(self):
+        '''
+        make_null_move
+        Passes the turn to the other color without moving a piece, for null move pruning.
+
+        Returns:
+            tuple: the en passant square and hash from before, to pass to unmake_null_move.
+        '''        
+        state = (self.en_passant, self.hash)
+        key = self.hash
+        if self.en_passant is not None:
+            self.squares[self.en_passant[0]][self.en_passant[1]].piece.en_passant = False
+            key ^= EP_KEYS[self.en_passant[1]]
+            self.en_passant = None
+        self.turn = 'black' if self.turn == 'white' else 'white'
+        self.hash = key ^ SIDE_KEY
+        return state
+
+    def unmake_null_move(self, state):
+        '''
+        unmake_null_move
+
+        Args:
+            state (tuple): the state returned by make_null_move.
+        '''        
+        self.en_passant, self.hash = state
+        if self.en_passant is not None:
+            self.squares[self.en_passant[0]][self.en_passant[1]].piece.en_passant = True
+        self.turn = 'black' if self.turn == 'white' else 'white'
+
+    def has_pieces(self, color):
+        '''
+        has_pieces
+
+        Args:
+            color (str): The color to look at.
+
+        Returns:
+            bool: True if the color has a piece besides its king and pawns. With only pawns left passing
+            the turn is often the best move there is (zugzwang), so null move pruning is not safe.
+        '''        
+        for cell in self.cells:
+            piece = cell.piece
+            if piece is not None and piece.color == color and piece.name != 'pawn' and piece.name != 'king':
+                return True
+        return False
+
+    def move_code(self, move):
+        '''
+        move_code
+        Turns a Move into the int make_move takes. The flag follows from the board,
+        so moves made by hand in the window need not know it.
+
+        Args:
+            move (Move): A move of the piece on its initial square.
+
+        Returns:
+            int: The move made with encode.
+        '''        
+        initial, final = move.initial, move.final
+        piece = self.squares[initial.row][initial.col].piece
+        promotion = PROMOTION_CODES.get(move.promotion, 0)
+        flag = 0
+        if piece.name == 'pawn':
+            if abs(final.row - initial.row) == 2:
+                flag = DOUBLE_PUSH
+            elif final.col != initial.col and self.squares[final.row][final.col].piece is None:
+                flag = EN_PASSANT
+            elif (final.row == 0 or final.row == 7) and not promotion:
+                # a pawn reaching the last row without a choice becomes a queen
+                promotion = PROMOTION_CODES['queen']
+        elif piece.name == 'king' and self.castling(initial, final):
+            flag = CASTLING
+        return encode(initial.row * COLS + initial.col, final.row * COLS + final.col, promotion, flag)
+
+    def evaluate(self):
+        '''
+        evaluate
+        Reads the evaluation of the position from the running totals, blending the middlegame
+        and endgame scores by the game phase.
+
+        Returns:
+            int: the evaluation in centipawns, positive when white is better.
+        '''
+        return taper(self.mg, self.eg, self.phase)
+
     def valid_move(self, piece, move):
         '''
         valid_move 
@@ -78,21 +362,31 @@ class Game:
         dest_piece = self.squares[move.final.row][move.final.col].piece
         # If the destination square is empty or contains an opponent's piece, the move is valid
         if dest_piece is None or dest_piece.color != piece.color:
-            return move in piece.moves
+            # compare the ints of the moves, the flags of the calculated moves follow from the board too
+            code = self.move_code(move)
+            return any(valid.key() == code for valid in piece.moves)
         # If the destination square contains a piece of the same color, the move is invalid
         return False
 
-    def check_promotion(self, piece, final):
+    def check_promotion(self, piece, final, promotion='queen'):
         '''
         check_promotion 
-        This function checks the promotion of a pawn against the destination square and returns True if the promotion is valid.
+        This function checks the promotion of a pawn against the destination square and promotes it.
 
         Args:
             piece (_type_): The piece to check
-            final (_type_): The promotion of the piece against the destination square and returns True if the promotion is valid.
+            final (_type_): The destination square of the piece.
+            promotion (str, optional): The name of the piece to promote to. Defaults to 'queen'.
+
+        Returns:
+            _type_: The promoted piece, or None if the pawn was not promoted.
         '''        
         if final.row == 0 or final.row == 7:
-            self.squares[final.row][final.col].piece = Queen(piece.color)
+            promoted = PROMOTIONS[promotion](piece.color)
+            promoted.moved = True
+            self.squares[final.row][final.col].piece = promoted
+            return promoted
+        return None
 
     def castling(self, initial, final):
         '''
@@ -106,33 +400,95 @@ class Game:
             _type_: The type of the castling of the king and rooks.
         '''        
         return abs(initial.col - final.col) == 2
-    
-    def set_true_en_passant(self, piece):
+
+    def castling_rights(self):
         '''
-        set_true_en_passant
+        castling_rights
+
+        The castling rights follow from the moved flags of the kings and rooks.
 
-        This function is called by pawn to set the true value of the piece on the board and return the piece value of the piece.
+        Returns:
+            str: the castling rights in FEN notation, 'KQkq' when no piece has moved and '' when none are left.
+        '''        
+        rights = ''
+        for color, row, kingside, queenside in (('white', 7, 'K', 'Q'), ('black', 0, 'k', 'q')):
+            king = self.squares[row][4].piece
+            if not isinstance(king, King) or king.color != color or king.moved:
+                continue
+            for col, right in ((7, kingside), (0, queenside)):
+                rook = self.squares[row][col].piece
+                if isinstance(rook, Rook) and rook.color == color and not rook.moved:
+                    rights += right
+        return rights
+
+    def is_square_attacked(self, square, by_color):
+        '''
+        is_square_attacked
+
+        This function looks outward from the square along knight jumps, king steps, pawn diagonals and
+        rook and bishop rays to find a piece of by_color that attacks it.
 
         Args:
-            piece (_type_): The piece to set true for.
+            square (Square): The square to check.
+            by_color (str): The color of the attacking pieces.
+
+        Returns:
+            bool: True if a piece of by_color attacks the square.
         '''        
+        squares = self.squares
+        row, col = square.row, square.col
+
+        # pawns attack the square from the row behind it, seen from the pawn
+        pawn_row = row + 1 if by_color == 'white' else row - 1
+        if 0 <= pawn_row < ROWS:
+            for pawn_col in (col - 1, col + 1):
+                if 0 <= pawn_col < COLS:
+                    p = squares[pawn_row][pawn_col].piece
+                    if p is not None and p.color == by_color and p.name == 'pawn':
+                        return True
+
+        # knights and kings
+        for steps, name in ((KNIGHT_STEPS, 'knight'), (KING_STEPS, 'king')):
+            for row_step, col_step in steps:
+                r, c = row + row_step, col + col_step
+                if 0 <= r < ROWS and 0 <= c < COLS:
+                    p = squares[r][c].piece
+                    if p is not None and p.color == by_color and p.name == name:
+                        return True
+
+        # rooks, bishops and queens along the rays
+        for steps, name in ((ROOK_STEPS, 'rook'), (BISHOP_STEPS, 'bishop')):
+            for row_step, col_step in steps:
+                r, c = row + row_step, col + col_step
+                while 0 <= r < ROWS and 0 <= c < COLS:
+                    p = squares[r][c].piece
+                    if p is not None:
+                        if p.color == by_color and (p.name == name or p.name == 'queen'):
+                            return True
+                        break
+                    r += row_step
+                    c += col_step
 
-        if piece.name != 'pawn':
-            return
-        
-        for row in range(ROWS):
-            for col in range(COLS):
-                if isinstance(self.squares[row][col].piece, Pawn):
-                    self.squares[row][col].piece.en_passant = False
+        return False
 
-        piece.en_passant = True
+    def king_attacked(self, color):
+        '''
+        king_attacked
+
+        Args:
+            color (str): The color of the king.
+
+        Returns:
+            bool: True if the king of the given color is in check.
+        '''        
+        return self.is_square_attacked(self.kings[color], 'black' if color == 'white' else 'white')
 
     def in_check(self, piece, move, print_message=False):
         '''
         in_check
 
-        This function is called when the piece has been moved to a new position.
-        It checks if the piece had put the enemy king in check.
+        This function is called to check if a move would leave the king of the moving piece in check.
+        The move is made in place and taken back before returning.
 
         Args:
             piece (_type_): The piece to check against the enemy king.
@@ -140,22 +496,14 @@ class Game:
             print_message (bool, optional): Message that is being printed only whn a king is in check. Defaults to False.
 
         Returns:
-            _type_: The type of piece to 
+            _type_: True if the king of the moving piece is attacked after the move.
         '''        
-        temp_piece = copy.deepcopy(piece)
-        temp_game = copy.deepcopy(self)
-        temp_game.move(temp_piece, move, testing=True)
-        for row in range(ROWS):
-            for col in range(COLS):
-                if temp_game.squares[row][col].has_rival_piece(piece.color):
-                    p = temp_game.squares[row][col].piece
-                    temp_game.calc_moves(p, row, col, bool=False)
-                    for m in p.moves:
-                        if isinstance(m.final.piece, King):
-                            if print_message:
-                                print(f'{p.color} is in check')
-                            return True            
-        return False
+        undo = self.make_move(move)
+        check = self.king_attacked(piece.color)
+        self.unmake_move(undo)
+        if check and print_message:
+            print(f'{piece.color} is in check')
+        return check
     
     def is_checkmate(self, color):
         '''
@@ -169,348 +517,473 @@ class Game:
         Returns:
             _type_: Returns True if the given color is a checkmate. False otherwise.
         '''        
-        for row in range(ROWS):
-            for col in range(COLS):
-                piece = self.squares[row][col].piece
-                if piece and piece.color == color:
-                    self.calc_moves(piece, row, col, bool=True)
-                    if piece.moves:
-                        return False
-        return True
+        if not self.king_attacked(color):
+            return False
+        return not self.generate_moves([], color)
+
+    def key_move(self, key):
+        '''
+        key_move
+
+        Args:
+            key (int): A move in this game made with encode, see Move.key.
 
-    def calc_moves(self, piece, row, col, bool=True):
+        Returns:
+            tuple: The piece to move and the Move.
+        '''        
+        initial_row, initial_col = divmod(key & 63, COLS)
+        final_row, final_col = divmod((key >> 6) & 63, COLS)
+        flag = key >> 15
+        piece = self.squares[initial_row][initial_col].piece
+        # the final square of an en passant capture holds the captured pawn, like the calculated moves
+        final_piece = self.squares[initial_row if flag == EN_PASSANT else final_row][final_col].piece
+        return piece, Move(Square(initial_row, initial_col), Square(final_row, final_col, final_piece),
+                           PROMOTION_NAMES.get((key >> 12) & 7), flag)
+
+    def legal_moves(self, color=None):
         '''
-        Calculates all possible moves for a piece.
+        legal_moves
+
+        Args:
+            color (str, optional): The color to get the moves for. Defaults to the color to move.
+
+        Returns:
+            list: The legal (piece, move) tuples of the color.
+        '''        
+        return [self.key_move(move) for move in self.generate_moves([], color)]
+
+    def generate_moves(self, moves, color=None, captures=False):
+        '''
+        generate_moves
+        Fills a move list the caller keeps and reuses, like the search does with one list per ply,
+        so generating moves builds no Move or Square objects.
+        The checks and pins are found once, see checks_and_pins, so only legal moves are added
+        and no move has to be tried on the board.
+
+        Args:
+            moves (list): The list to fill, the moves it held are removed.
+            color (str, optional): The color to generate the moves for. Defaults to the color to move.
+            captures (bool, optional): Only generate captures and promotions. Defaults to False.
+
+        Returns:
+            list: moves, holding the legal moves as ints made with encode.
+        '''        
+        color = color or self.turn
+        moves.clear()
+        checks = self.checks_and_pins(color)
+        cells = self.cells
+
+        # in double check only the king can move
+        if checks[0] > 1:
+            king = self.kings[color]
+            self._legal_moves(moves, king.row * COLS + king.col, king.piece, captures, checks)
+            return moves
+
+        for frm in range(ROWS * COLS):
+            piece = cells[frm].piece
+            if piece is not None and piece.color == color:
+                self._legal_moves(moves, frm, piece, captures, checks)
+        return moves
+
+    def checks_and_pins(self, color):
         '''
-        def pawn_moves():
-            # steps of pawn movement
-            if piece.moved:
-                steps = 1
-            else:
-                steps = 2
-
-            # vertical movement
-            start = row + piece.dir
-            end = row + (piece.dir * (1 + steps))
-            for possible_move_row in range(start, end, piece.dir):
-                if Square.in_range(possible_move_row):
-                    if self.squares[possible_move_row][col].isempty():
-                        # create initial and final moves
-                        initial = Square(row, col)
-                        final = Square(possible_move_row, col)
-
-                        # create new move
-                        move = Move(initial, final)
-
-                        # check potential checks
-                        if bool:
-                            if not self.in_check(piece, move):
-                                # append new move
-                                piece.add_move(move)
+        checks_and_pins
+        Looks outward from the king once for the pieces that give check and the pieces pinned to the king.
+
+        Args:
+            color (str): The color of the king.
+
+        Returns:
+            tuple: The number of pieces giving check, the squares a move has to go to to answer a single check
+            (the square of the checker and the squares in between), and the squares of the pinned pieces
+            with the squares of their pin ray.
+        '''        
+        cells = self.cells
+        square = self.kings[color]
+        ks = square.row * COLS + square.col
+        rival_color = 'black' if color == 'white' else 'white'
+        checkers = 0
+        evasions = set()
+        pins = {}
+
+        # pawns and knights check from one square, the check is answered by capturing them
+        pawn_row = square.row + 1 if rival_color == 'white' else square.row - 1
+        if 0 <= pawn_row < ROWS:
+            for pawn_col in (square.col - 1, square.col + 1):
+                if 0 <= pawn_col < COLS:
+                    p = cells[pawn_row * COLS + pawn_col].piece
+                    if p is not None and p.color == rival_color and p.name == 'pawn':
+                        checkers += 1
+                        evasions.add(pawn_row * COLS + pawn_col)
+        for sq in KNIGHT_TARGETS[ks]:
+            p = cells[sq].piece
+            if p is not None and p.color == rival_color and p.name == 'knight':
+                checkers += 1
+                evasions.add(sq)
+
+        # along the rays the first rival slider checks, or pins the one own piece in between
+        for name in ('rook', 'bishop'):
+            for ray in SLIDER_RAYS[name][ks]:
+                pinned = None
+                for i, sq in enumerate(ray):
+                    p = cells[sq].piece
+                    if p is None:
+                        continue
+                    if p.color == color:
+                        if pinned is not None:
+                            break
+                        pinned = sq
+                        continue
+                    if p.name == name or p.name == 'queen':
+                        if pinned is None:
+                            checkers += 1
+                            evasions.update(ray[:i + 1])
                         else:
-                            # append new move
-                            piece.add_move(move)
-                    # blocked
-                    else:
-                        break
-                # not in range
-                else:
+                            pins[pinned] = set(ray[:i + 1])
                     break
 
-            # diagonal movement
-            possible_move_row = row + piece.dir
-            possible_move_cols = [col - 1, col + 1]
-            for possible_move_col in possible_move_cols:
-                if Square.in_range(possible_move_row, possible_move_col):
-                    if self.squares[possible_move_row][possible_move_col].has_rival_piece(piece.color): # noqa
-                        # create initial and final moves
-                        initial = Square(row, col)
-                        final_piece = self.squares[possible_move_row][possible_move_col].piece # noqa
-                        final = Square(possible_move_row, possible_move_col, final_piece) # noqa
-                        # create new move
-                        move = Move(initial, final)
-
-                        # check potential checks
-                        if bool:
-                            if not self.in_check(piece, move):
-                                # append new move
-                                piece.add_move(move)
-                        else:
-                            # append new move
-                            piece.add_move(move)
-
-            # left en passant moves
-            r = 3 if piece.color == 'white' else 4
-            fr = 2 if piece.color == 'white' else 5
-            if Square.in_range(col - 1) and row == r:
-                if self.squares[row][col - 1].has_rival_piece(piece.color):
-                    p = self.squares[row][col - 1].piece
-                    if isinstance(p, Pawn):
-                        if p.en_passant:
-                            # create initial and final moves
-                            initial = Square(row, col)
-                            final = Square(fr, col - 1, p)
-                            # create new move
-                            move = Move(initial, final)
-
-                            # check potential checks
-                            if bool:
-                                if not self.in_check(piece, move):
-                                    # append new move
-                                    piece.add_move(move)
-                            else:
-                                # append new move
-                                piece.add_move(move)
-            
-            # right en passant moves
-            if Square.in_range(col + 1) and row == r:
-                if self.squares[row][col + 1].has_rival_piece(piece.color):
-                    p = self.squares[row][col + 1].piece
-                    if isinstance(p, Pawn):
-                        if p.en_passant:
-                            # create initial and final moves
-                            initial = Square(row, col)
-                            final = Square(fr, col + 1, p)
-                            # create new move
-                            move = Move(initial, final)
-
-                            # check potential checks
-                            if bool:
-                                if not self.in_check(piece, move):
-                                    # append new move
-                                    piece.add_move(move)
-                            else:
-                                # append new move
-                                piece.add_move(move)
-
-        def knight_moves():
-            possible_moves = [
-                (row + 2, col + 1),
-                (row + 2, col - 1),
-                (row - 2, col + 1),
-                (row - 2, col - 1),
-                (row + 1, col + 2),
-                (row + 1, col - 2),
-                (row - 1, col + 2),
-                (row - 1, col - 2)
-            ]
-            for possible_move in possible_moves:
-                possible_move_row, possible_move_col = possible_move
-
-                if Square.in_range(possible_move_row, possible_move_col):
-                    if self.squares[possible_move_row][possible_move_col].isempty_or_rival(piece.color): # noqa
-                        # create squares of the new move
-                        initial = Square(row, col)
-                        final_piece = self.squares[possible_move_row][possible_move_col].piece # noqa
-                        final = Square(possible_move_row, possible_move_col, final_piece) # noqa
-                        # create a new move
-                        move = Move(initial, final)
-
-                        # check potential checks
-                        if bool:
-                            if not self.in_check(piece, move):
-                                # append new move
-                                piece.add_move(move)
-                            else:
-                                break
-                        else:
-                            # append new move
-                            piece.add_move(move)
-
-        def straightline_moves(incrs):
-            for incr in incrs:
-                row_incr, col_incr = incr
-                possible_move_row = row + row_incr
-                possible_move_col = col + col_incr
-
-                while True:
-                    if Square.in_range(possible_move_row, possible_move_col):
-
-                        # create squares of the new move
-                        initial = Square(row, col)
-                        final_piece = self.squares[possible_move_row][possible_move_col].piece # noqa
-                        final = Square(possible_move_row, possible_move_col, final_piece) # noqa
-                        # create a new move
-                        move = Move(initial, final)
-                        
-                        # empty squares of the new move
-                        if self.squares[possible_move_row][possible_move_col].isempty(): # noqa
-                            # check potential checks
-                            if bool:
-                                if not self.in_check(piece, move):
-                                    # append new move
-                                    piece.add_move(move)
-                            else:
-                                # append new move
-                                piece.add_move(move)
-
-                        # has rival piece
-                        elif self.squares[possible_move_row][possible_move_col].has_rival_piece(piece.color):
-                            # check potential checks
-                            if bool:
-                                if not self.in_check(piece, move):
-                                    # append new move
-                                    piece.add_move(move)
-                            else:
-                                # append new move
-                                piece.add_move(move)
-                            break
+        return checkers, evasions, pins
 
-                        # has team piece
-                        elif self.squares[possible_move_row][possible_move_col].has_team_piece(piece.color):
-                            break
+    def calc_moves(self, piece, row, col, bool=True, captures=False):
+        '''
+        Calculates all possible moves for a piece as Move objects, for the window to show and check.
+        With captures set only captures and promotions are generated.
+        With bool set moves that leave the own king in check are left out.
+        '''
+        piece.clear_moves()
+        moves = []
+        if bool:
+            self._legal_moves(moves, row * COLS + col, piece, captures, self.checks_and_pins(piece.color))
+        else:
+            self._piece_moves(moves, row * COLS + col, piece, captures)
+        for move in moves:
+            piece.add_move(self.key_move(move)[1])
+
+    def _legal_moves(self, moves, frm, piece, captures, checks):
+        # adds the legal moves of one piece to moves, checks is what checks_and_pins found
+        checkers, evasions, pins = checks
+        if checkers > 1 and piece.name != 'king':
+            return
+        start = len(moves)
+        self._piece_moves(moves, frm, piece, captures)
+        cells = self.cells
+        legal = start
+
+        if piece.name == 'king':
+            # the king may not step onto an attacked square, looked at without the king so it does not hide the rays behind it
+            rival_color = 'black' if piece.color == 'white' else 'white'
+            cells[frm].piece = None
+            for i in range(start, len(moves)):
+                move = moves[i]
+                if not self.is_square_attacked(cells[(move >> 6) & 63], rival_color):
+                    moves[legal] = move
+                    legal += 1
+            cells[frm].piece = piece
+
+        else:
+            # a pinned piece stays on its pin ray and a check has to be blocked or its piece captured
+            allowed = pins.get(frm)
+            if checkers:
+                allowed = evasions if allowed is None else allowed & evasions
+            if allowed is None and piece.name != 'pawn':
+                return
+            for i in range(start, len(moves)):
+                move = moves[i]
+                if move >> 15 == EN_PASSANT:
+                    # en passant takes two pawns off the row at once, which can uncover a check no pin shows, so try it
+                    undo = self.make_move(move)
+                    ok = not self.king_attacked(piece.color)
+                    self.unmake_move(undo)
+                else:
+                    ok = allowed is None or (move >> 6) & 63 in allowed
+                if ok:
+                    moves[legal] = move
+                    legal += 1
+
+        del moves[legal:]
+
+    def _piece_moves(self, moves, frm, piece, captures):
+        # adds the moves of one piece to moves, also the ones that leave its king in check
+        # a move without promotion or flag is frm | to << 6, see encode
+        cells = self.cells
+        color = piece.color
+        name = piece.name
+
+        if name == 'pawn':
+            self._pawn_moves(moves, frm, piece, captures)
+
+        elif name == 'knight' or name == 'king':
+            for to in (KNIGHT_TARGETS if name == 'knight' else KING_TARGETS)[frm]:
+                target = cells[to].piece
+                if target is None:
+                    if not captures:
+                        moves.append(frm | to << 6)
+                elif target.color != color:
+                    moves.append(frm | to << 6)
+            if name == 'king' and not captures and not piece.moved:
+                self._castling_moves(moves, frm, color)
+
+        else:
+            for ray in SLIDER_RAYS[name][frm]:
+                for to in ray:
+                    target = cells[to].piece
+                    # empty squares are quiet moves, which are skipped in captures mode
+                    if target is None:
+                        if not captures:
+                            moves.append(frm | to << 6)
+                        continue
+                    if target.color != color:
+                        moves.append(frm | to << 6)
+                    break
 
-                    # not in range
+    def _pawn_moves(self, moves, frm, pawn, captures):
+        cells = self.cells
+        row, col = divmod(frm, COLS)
+        next_row = row + pawn.dir
+        if not 0 <= next_row < ROWS:
+            return
+        # a pawn reaching the last row promotes, one move for every piece it can become
+        last_row = next_row == 0 or next_row == ROWS - 1
+
+        # vertical movement, only a push onto the last row counts as a capture
+        to = frm + pawn.dir * COLS
+        if cells[to].piece is None:
+            if last_row:
+                for promotion in PROMOTION_MOVES:
+                    moves.append(frm | to << 6 | promotion)
+            elif not captures:
+                moves.append(frm | to << 6)
+                double = to + pawn.dir * COLS
+                if not pawn.moved and 0 <= double < ROWS * COLS and cells[double].piece is None:
+                    moves.append(encode(frm, double, 0, DOUBLE_PUSH))
+
+        # diagonal movement
+        for final_col in (col - 1, col + 1):
+            if 0 <= final_col < COLS:
+                to = next_row * COLS + final_col
+                target = cells[to].piece
+                if target is not None and target.color != pawn.color:
+                    if last_row:
+                        for promotion in PROMOTION_MOVES:
+                            moves.append(frm | to << 6 | promotion)
                     else:
-                        break
+                        moves.append(frm | to << 6)
+
+        # en passant, the pawn that just moved two squares stands next to this one
+        if self.en_passant is not None:
+            ep_row, ep_col = self.en_passant
+            if ep_row == row and abs(ep_col - col) == 1 and self.squares[ep_row][ep_col].piece.color != pawn.color:
+                moves.append(encode(frm, next_row * COLS + ep_col, 0, EN_PASSANT))
+
+    def _castling_moves(self, moves, frm, color):
+        # castling moves, not possible out of or through check, the rook is moved along by make_move
+        rival_color = 'black' if color == 'white' else 'white'
+        row = frm // COLS
+        squares = self.squares[row]
+        if self.is_square_attacked(squares[frm % COLS], rival_color):
+            return
 
-                    # incrementing the row and col
-                    possible_move_row = possible_move_row + row_incr
-                    possible_move_col = possible_move_col + col_incr
-
-        def king_moves():
-            adjs = [
-                (row - 1, col - 0),
-                (row - 1, col + 1),
-                (row + 0, col + 1),
-                (row + 1, col + 1),
-                (row + 1, col + 0),
-                (row + 1, col - 1),
-                (row + 0, col - 1),
-                (row - 1, col - 1)
-            ]
-            # normal moves
-            for possible_move in adjs:
-                possible_move_row, possible_move_col = possible_move
-
-                if Square.in_range(possible_move_row, possible_move_col):
-                    if self.squares[possible_move_row][possible_move_col].isempty_or_rival(piece.color): # noqa
-                        # create squares of the new move
-                        initial = Square(row, col)
-                        final = Square(possible_move_row, possible_move_col)
-                        # create a new move
-                        move = Move(initial, final)
-                        # check potential checks
-                        if bool:
-                            if not self.in_check(piece, move):
-                                # append new move
-                                piece.add_move(move)
-                            else:
-                                break
-                        else:
-                            # append new move
-                            piece.add_move(move)
-
-            # castling moves
-            if not piece.moved:
-                # queen castling moves
-                left_rook = self.squares[row][0].piece
-                if isinstance(left_rook, Rook):
-                    if not left_rook.moved:
-                        for c in range(1, 4):
-                            # castling not possible when pieces are inbetween the rook and the queen
-                            if self.squares[row][c].has_piece():
-                                break
-
-                            if c == 3:
-                                # add left rook to the king square
-                                piece.left_rook = left_rook
-
-                                # rook move
-                                initial = Square(row, 0)
-                                final = Square(row, 3)
-                                moveR = Move(initial, final)
-
-                                # king move
-                                initial = Square(row, col)
-                                final = Square(row, 2)
-                                moveK = Move(initial, final)
-
-                                # check potential checks
-                                if bool:
-                                    if not self.in_check(piece, moveK) and not self.in_check(left_rook, moveR): # noqa
-                                        # append new move to rook
-                                        left_rook.add_move(moveR)
-                                        # append new move to king
-                                        piece.add_move(moveK)
-                                else:
-                                    # append new move to rook
-                                    left_rook.add_move(moveR)
-                                    # append new move king
-                                    piece.add_move(moveK)
-
-                # king castling moves
-                right_rook = self.squares[row][7].piece
-                if isinstance(right_rook, Rook):
-                    if not right_rook.moved:
-                        for c in range(5, 7):
-                            # castling not possible when pieces are inbetween the rook and the queen # noqa
-                            if self.squares[row][c].has_piece():
-                                break
-
-                            if c == 6:
-                                # add right rook to the king square
-                                piece.right_rook = right_rook
-
-                                # rook move
-                                initial = Square(row, 7)
-                                final = Square(row, 5)
-                                moveR = Move(initial, final)
-
-                                # king move
-                                initial = Square(row, col)
-                                final = Square(row, 6)
-                                moveK = Move(initial, final)
-
-                                # check potential checks
-                                if bool:
-                                    if not self.in_check(piece, moveK) and not self.in_check(right_rook, moveR): # noqa
-                                        # append new move to rook
-                                        right_rook.add_move(moveR)
-                                        # append new move to king
-                                        piece.add_move(moveK)
-                                else:
-                                    # append new move to rook
-                                    right_rook.add_move(moveR)
-                                    # append new move king
-                                    piece.add_move(moveK)
-                
-        if piece.name == 'pawn':
-            pawn_moves()
-
-        elif piece.name == 'knight':
-            knight_moves()
-
-        elif piece.name == 'bishop':
-            straightline_moves([
-                (1, 1),
-                (-1, 1),
-                (1, -1),
-                (-1, -1)
-            ])   
-
-        elif piece.name == 'rook':
-            straightline_moves([
-                (1, 0),
-                (-1, 0),
-                (0, 1),
-                (0, -1)
-            ]) 
-
-        elif piece.name == 'queen':
-            straightline_moves([
-                (1, 0),
-                (-1, 0),
-                (0, 1),
-                (0, -1),
-                (1, 1),
-                (-1, 1),
-                (1, -1),
-                (-1, -1)
-            ]) 
-
-        elif piece.name == 'king':
-            king_moves()
+        # queen castling, no pieces in between the rook and the king
+        left_rook = squares[0].piece
+        if isinstance(left_rook, Rook) and not left_rook.moved:
+            if not any(squares[c].has_piece() for c in range(1, 4)) and not self.is_square_attacked(squares[3], rival_color):
+                moves.append(encode(frm, row * COLS + 2, 0, CASTLING))
+
+        # king castling
+        right_rook = squares[7].piece
+        if isinstance(right_rook, Rook) and not right_rook.moved:
+            if not any(squares[c].has_piece() for c in range(5, 7)) and not self.is_square_attacked(squares[5], rival_color):
+                moves.append(encode(frm, row * COLS + 6, 0, CASTLING))
+
+    def find_move(self, text):
+        '''
+        find_move
+
+        Args:
+            text (str): A move in long algebraic notation, like e2e4 or e7e8q.
+
+        Returns:
+            tuple: The legal (piece, move) tuple, or None if the move is not legal.
+        '''        
+        for piece, move in self.legal_moves():
+            if move.uci() == text:
+                return piece, move
+        return None
+
+    def san(self, move):
+        '''
+        san
+        Names a legal move in standard algebraic notation, like Nf3, exd5, O-O or e8=Q+, the notation of PGN.
+
+        Args:
+            move (int): A legal move of the color to move, made with encode.
+
+        Returns:
+            str: The move in standard algebraic notation.
+        '''        
+        frm, to = move & 63, (move >> 6) & 63
+        piece = self.cells[frm].piece
+        square = FILES[to % COLS] + str(ROWS - to // COLS)
+        capture = self.cells[to].piece is not None or move >> 15 == EN_PASSANT
+
+        if move >> 15 == CASTLING:
+            text = 'O-O' if to % COLS == 6 else 'O-O-O'
+        elif piece.name == 'pawn':
+            text = (FILES[frm % COLS] + 'x' if capture else '') + square
+            promotion = (move >> 12) & 7
+            if promotion:
+                text += '=' + FEN_LETTERS[PROMOTION_NAMES[promotion]].upper()
+        else:
+            # name the file, the rank or both when another piece of the same kind can go to the same square
+            others = [other & 63 for other in self.generate_moves([], piece.color)
+                      if (other >> 6) & 63 == to and other & 63 != frm and self.cells[other & 63].piece.name == piece.name]
+            extra = ''
+            if others:
+                if all(other % COLS != frm % COLS for other in others):
+                    extra = FILES[frm % COLS]
+                elif all(other // COLS != frm // COLS for other in others):
+                    extra = str(ROWS - frm // COLS)
+                else:
+                    extra = FILES[frm % COLS] + str(ROWS - frm // COLS)
+            text = FEN_LETTERS[piece.name].upper() + extra + ('x' if capture else '') + square
+
+        undo = self.make_move(move)
+        if self.king_attacked(self.turn):
+            text += '+' if self.generate_moves([]) else '#'
+        self.unmake_move(undo)
+        return text
+
+    def parse_san(self, text):
+        '''
+        parse_san
+        Reads a move in standard algebraic notation, the reverse of san. Check marks and annotations are ignored.
+
+        Args:
+            text (str): A move of the color to move, like Nf3, exd5, O-O, e8=Q or R1a3+.
+
+        Returns:
+            int: The legal move, made with encode.
+
+        Raises:
+            ValueError: If the text is not a legal move, or could be more than one.
+        '''        
+        name = text.rstrip('+#!?')
+        moves = self.generate_moves([])
+        if name in ('O-O', 'O-O-O', '0-0', '0-0-0'):
+            col = 6 if len(name) == 3 else 2
+            found = [move for move in moves if move >> 15 == CASTLING and (move >> 6) % COLS == col]
+        else:
+            piece_name, promotion = 'pawn', 0
+            if name[:1] in ('N', 'B', 'R', 'Q', 'K'):
+                piece_name = FEN_NAMES[name[0].lower()]
+                name = name[1:]
+            if '=' in name:
+                name, letter = name.split('=', 1)
+                promotion = PROMOTION_CODES.get(FEN_NAMES.get(letter.lower()), -1)
+            name = name.replace('x', '').replace('-', '')
+            if len(name) < 2 or name[-2] not in FILES or not name[-1].isdigit():
+                raise ValueError(f'invalid move {text!r}')
+            to = (ROWS - int(name[-1])) * COLS + FILES.index(name[-2])
+            # what is left of the origin, a file, a rank or both
+            hint = name[:-2]
+            found = []
+            for move in moves:
+                frm = move & 63
+                if (move >> 6) & 63 != to or self.cells[frm].piece.name != piece_name or (move >> 12) & 7 != promotion:
+                    continue
+                if any((char in FILES and FILES.index(char) != frm % COLS)
+                       or (char.isdigit() and ROWS - int(char) != frm // COLS) for char in hint):
+                    continue
+                found.append(move)
+        if len(found) != 1:
+            raise ValueError(f'{"ambiguous" if found else "illegal"} move {text!r} in {self.fen()}')
+        return found[0]
+
+    def fen(self):
+        '''
+        fen
+        The Game does not count moves, so the halfmove clock is always 0 and the fullmove number always 1.
+
+        Returns:
+            str: The position in FEN notation.
+        '''        
+        rows = []
+        for row in range(ROWS):
+            text = ''
+            empty = 0
+            for col in range(COLS):
+                piece = self.squares[row][col].piece
+                if piece is None:
+                    empty += 1
+                    continue
+                if empty:
+                    text += str(empty)
+                    empty = 0
+                letter = FEN_LETTERS[piece.name]
+                text += letter.upper() if piece.color == 'white' else letter
+            if empty:
+                text += str(empty)
+            rows.append(text)
+
+        en_passant = '-'
+        if self.en_passant is not None:
+            row, col = self.en_passant
+            # the square the pawn skipped over
+            en_passant = FILES[col] + str(ROWS - (row - self.squares[row][col].piece.dir))
+
+        return f"{'/'.join(rows)} {self.turn[0]} {self.castle_rights or '-'} {en_passant} 0 1"
+
+    def _load_fen(self, fen):
+        fields = fen.split()
+        rows = fields[0].split('/') if fields else []
+        if len(rows) != ROWS:
+            raise ValueError(f'invalid FEN: {fen!r}')
+
+        for row, text in enumerate(rows):
+            col = 0
+            for char in text:
+                if char.isdigit():
+                    col += int(char)
+                elif char.lower() in FEN_PIECES and col < COLS:
+                    piece = FEN_PIECES[char.lower()]('white' if char.isupper() else 'black')
+                    # pawns off their starting row have moved, kings and rooks get their flags from the castling rights
+                    if isinstance(piece, Pawn):
+                        piece.moved = row != (6 if piece.color == 'white' else 1)
+                    elif isinstance(piece, (King, Rook)):
+                        piece.moved = True
+                    self.squares[row][col].piece = piece
+                    col += 1
+                else:
+                    raise ValueError(f'invalid FEN: {fen!r}')
+            if col != COLS:
+                raise ValueError(f'invalid FEN: {fen!r}')
+
+        kings = [square.piece.color for row in self.squares for square in row if isinstance(square.piece, King)]
+        if sorted(kings) != ['black', 'white']:
+            raise ValueError(f'FEN needs one king of each color: {fen!r}')
+
+        self.turn = 'black' if len(fields) > 1 and fields[1] == 'b' else 'white'
+
+        castling = fields[2] if len(fields) > 2 else '-'
+        for right in castling.replace('-', ''):
+            color = 'white' if right.isupper() else 'black'
+            row = 7 if color == 'white' else 0
+            col = 7 if right.lower() == 'k' else 0
+            king = self.squares[row][4].piece
+            rook = self.squares[row][col].piece
+            if isinstance(king, King) and king.color == color and isinstance(rook, Rook) and rook.color == color:
+                king.moved = False
+                rook.moved = False
+
+        en_passant = fields[3] if len(fields) > 3 else '-'
+        if en_passant != '-':
+            col = FILES.index(en_passant[0])
+            # the pawn stands one row past the square it skipped over
+            row = 4 if en_passant[1] == '3' else 3
+            pawn = self.squares[row][col].piece
+            if isinstance(pawn, Pawn):
+                pawn.en_passant = True
+                self.en_passant = (row, col)
 
     def _create(self):
         for row in range(ROWS):
@@ -0,0 +1,553 @@
+'''
+This file contains the 10x12 mailbox board core.
+The board is a flat bytearray of integer piece codes surrounded by off-board sentinels,
+so move generation and evaluation only do integer arithmetic.
+'''
+from classes.Const import ROWS, COLS
+from classes.Move import DOUBLE_PUSH, EN_PASSANT, CASTLING, encode as encode_game_move
+
+# Piece codes
+EMPTY = 0
+PAWN = 1
+KNIGHT = 2
+BISHOP = 3
+ROOK = 4
+QUEEN = 5
+KING = 6
+BLACK = 8
+OFFBOARD = 16
+
+NAMES = {'pawn': PAWN, 'knight': KNIGHT, 'bishop': BISHOP, 'rook': ROOK, 'queen': QUEEN, 'king': KING}
+PIECE_NAMES = {code: name for name, code in NAMES.items()}
+
+# Piece values in centipawns, indexed by piece type
+VALUES = (0, 100, 300, 300, 500, 900, 0)
+
+# Castling rights
+WHITE_KINGSIDE = 1
+WHITE_QUEENSIDE = 2
+BLACK_KINGSIDE = 4
+BLACK_QUEENSIDE = 8
+
+# Directions
+N, S, E, W = -10, 10, 1, -1
+KNIGHT_OFFSETS = (-21, -19, -12, -8, 8, 12, 19, 21)
+KING_OFFSETS = (N, S, E, W, N + E, N + W, S + E, S + W)
+BISHOP_OFFSETS = (N + E, N + W, S + E, S + W)
+ROOK_OFFSETS = (N, S, E, W)
+SLIDER_OFFSETS = {BISHOP: BISHOP_OFFSETS, ROOK: ROOK_OFFSETS, QUEEN: KING_OFFSETS}
+
+
+def index(row, col):
+    '''
+    index
+
+    Args:
+        row (int): the row of the square on the Game board.
+        col (int): the col of the square on the Game board.
+
+    Returns:
+        int: the mailbox index of the square.
+    '''
+    return 21 + row * 10 + col
+
+
+def row_col(sq):
+    '''
+    row_col
+
+    Args:
+        sq (int): the mailbox index of the square.
+
+    Returns:
+        tuple: the row and col of the square on the Game board.
+    '''
+    return sq // 10 - 2, sq % 10 - 1
+
+
+# The 64 playing squares in Game order
+SQUARES = tuple(index(row, col) for row in range(ROWS) for col in range(COLS))
+
+# Castling rights kept after a piece moves from or to a square
+CASTLING_MASK = [15] * 120
+CASTLING_MASK[index(7, 4)] = 15 & ~(WHITE_KINGSIDE | WHITE_QUEENSIDE)
+CASTLING_MASK[index(7, 7)] = 15 & ~WHITE_KINGSIDE
+CASTLING_MASK[index(7, 0)] = 15 & ~WHITE_QUEENSIDE
+CASTLING_MASK[index(0, 4)] = 15 & ~(BLACK_KINGSIDE | BLACK_QUEENSIDE)
+CASTLING_MASK[index(0, 7)] = 15 & ~BLACK_KINGSIDE
+CASTLING_MASK[index(0, 0)] = 15 & ~BLACK_QUEENSIDE
+
+
+def encode(frm, to, promotion=0, flag=0):
+    '''
+    encode
+
+    Args:
+        frm (int): the mailbox index the piece moves from.
+        to (int): the mailbox index the piece moves to.
+        promotion (int, optional): the piece type a pawn promotes to. Defaults to 0.
+        flag (int, optional): DOUBLE_PUSH, EN_PASSANT or CASTLING. Defaults to 0.
+
+    Returns:
+        int: the move packed into an int.
+    '''
+    return frm | (to << 7) | (promotion << 14) | (flag << 17)
+
+
+def move_from(move):
+    '''
+    move_from
+
+    Args:
+        move (int): a move made with encode.
+
+    Returns:
+        int: the mailbox index the piece moves from.
+    '''
+    return move & 127
+
+
+def move_to(move):
+    '''
+    move_to
+
+    Args:
+        move (int): a move made with encode.
+
+    Returns:
+        int: the mailbox index the piece moves to.
+    '''
+    return (move >> 7) & 127
+
+
+def move_promotion(move):
+    '''
+    move_promotion
+
+    Args:
+        move (int): a move made with encode.
+
+    Returns:
+        int: the piece type a pawn promotes to, or 0.
+    '''
+    return (move >> 14) & 7
+
+
+def move_flag(move):
+    '''
+    move_flag
+
+    Args:
+        move (int): a move made with encode.
+
+    Returns:
+        int: the DOUBLE_PUSH, EN_PASSANT or CASTLING flag, or 0.
+    '''
+    return move >> 17
+
+
+class Mailbox:
+    '''
+    Mailbox class
+    contains a chess position on a 10x12 mailbox and the integer move generation for it.
+    Moves are ints made with encode, see move_from, move_to, move_promotion and move_flag.
+    '''
+
+    def __init__(self):
+        '''
+        __init__
+
+        Creates an empty board with white to move.
+        '''
+        self.board = bytearray([OFFBOARD]) * 120
+        for sq in SQUARES:
+            self.board[sq] = EMPTY
+        self.side = 0
+        self.castling = 0
+        self.ep = 0
+        self.kings = [0, 0]
+        self.history = []
+
+    @classmethod
+    def from_game(cls, game, color=None):
+        '''
+        from_game
+        Builds a mailbox from the pieces of a Game.
+
+        Args:
+            game (Game): the game to copy the position from.
+            color (str, optional): the color to move. Defaults to game.turn.
+
+        Returns:
+            Mailbox: the position of the game.
+        '''
+        mailbox = cls()
+        board = mailbox.board
+        for row in range(ROWS):
+            for col in range(COLS):
+                piece = game.squares[row][col].piece
+                if piece is None:
+                    continue
+                code = NAMES[piece.name] | (BLACK if piece.color == 'black' else 0)
+                board[index(row, col)] = code
+                if code & 7 == KING:
+                    mailbox.kings[code >> 3] = index(row, col)
+
+        mailbox.side = BLACK if (color or game.turn) == 'black' else 0
+
+        rights = game.castling_rights()
+        for right, flag in (('K', WHITE_KINGSIDE), ('Q', WHITE_QUEENSIDE), ('k', BLACK_KINGSIDE), ('q', BLACK_QUEENSIDE)):
+            if right in rights:
+                mailbox.castling |= flag
+
+        if game.en_passant is not None:
+            row, col = game.en_passant
+            pawn = game.squares[row][col].piece
+            mailbox.ep = index(row - pawn.dir, col)
+
+        return mailbox
+
+    def pack(self):
+        '''
+        pack
+        Packs the position into 67 bytes: one piece code per square, the side to move,
+        the castling rights and the en passant square.
+
+        Returns:
+            bytes: the packed position.
+        '''
+        board = self.board
+        return bytes([board[sq] for sq in SQUARES] + [self.side, self.castling, self.ep])
+
+    @classmethod
+    def unpack(cls, data):
+        '''
+        unpack
+
+        Args:
+            data (bytes): a position packed with pack.
+
+        Returns:
+            Mailbox: the unpacked position.
+        '''
+        mailbox = cls()
+        for i, sq in enumerate(SQUARES):
+            code = data[i]
+            mailbox.board[sq] = code
+            if code & 7 == KING:
+                mailbox.kings[code >> 3] = sq
+        mailbox.side, mailbox.castling, mailbox.ep = data[64], data[65], data[66]
+        return mailbox
+
+    def is_attacked(self, sq, by):
+        '''
+        is_attacked
+
+        Args:
+            sq (int): the mailbox index of the square.
+            by (int): the attacking color, 0 for white or BLACK.
+
+        Returns:
+            bool: True if a piece of the attacking color attacks the square.
+        '''
+        board = self.board
+
+        # pawns
+        if by:
+            if board[sq - 9] == BLACK | PAWN or board[sq - 11] == BLACK | PAWN:
+                return True
+        elif board[sq + 9] == PAWN or board[sq + 11] == PAWN:
+            return True
+
+        # knights and kings
+        knight = by | KNIGHT
+        for offset in KNIGHT_OFFSETS:
+            if board[sq + offset] == knight:
+                return True
+        king = by | KING
+        for offset in KING_OFFSETS:
+            if board[sq + offset] == king:
+                return True
+
+        # sliders
+        queen = by | QUEEN
+        for offsets, slider in ((ROOK_OFFSETS, by | ROOK), (BISHOP_OFFSETS, by | BISHOP)):
+            for offset in offsets:
+                target = sq + offset
+                code = board[target]
+                while code == EMPTY:
+                    target += offset
+                    code = board[target]
+                if code == slider or code == queen:
+                    return True
+
+        return False
+
+    def in_check(self, side=None):
+        '''
+        in_check
+
+        Args:
+            side (int, optional): the color of the king, 0 for white or BLACK. Defaults to the side to move.
+
+        Returns:
+            bool: True if the king of the side is attacked.
+        '''
+        if side is None:
+            side = self.side
+        return self.is_attacked(self.kings[side >> 3], side ^ BLACK)
+
+    def pseudo_moves(self):
+        '''
+        pseudo_moves
+        Generates the moves of the side to move without checking if they leave the king in check.
+
+        Returns:
+            list: the moves as ints.
+        '''
+        board = self.board
+        side = self.side
+        rival = side ^ BLACK
+        moves = []
+        append = moves.append
+
+        for frm in SQUARES:
+            code = board[frm]
+            if code == EMPTY or code & BLACK != side:
+                continue
+            kind = code & 7
+
+            if kind == PAWN:
+                forward = S if side else N
+                start_rank = 3 if side else 8
+                last_rank = 9 if side else 2
+                to = frm + forward
+                if board[to] == EMPTY:
+                    if to // 10 == last_rank:
+                        for promotion in (QUEEN, ROOK, BISHOP, KNIGHT):
+                            append(encode(frm, to, promotion))
+                    else:
+                        append(encode(frm, to))
+                        if frm // 10 == start_rank and board[to + forward] == EMPTY:
+                            append(encode(frm, to + forward, 0, DOUBLE_PUSH))
+                for to in (frm + forward + W, frm + forward + E):
+                    target = board[to]
+                    if target != EMPTY and target != OFFBOARD and target & BLACK == rival:
+                        if to // 10 == last_rank:
+                            for promotion in (QUEEN, ROOK, BISHOP, KNIGHT):
+                                append(encode(frm, to, promotion))
+                        else:
+                            append(encode(frm, to))
+                    elif to == self.ep:
+                        append(encode(frm, to, 0, EN_PASSANT))
+
+            elif kind == KNIGHT or kind == KING:
+                for offset in (KNIGHT_OFFSETS if kind == KNIGHT else KING_OFFSETS):
+                    to = frm + offset
+                    target = board[to]
+                    if target == EMPTY or (target != OFFBOARD and target & BLACK == rival):
+                        append(encode(frm, to))
+
+            else:
+                for offset in SLIDER_OFFSETS[kind]:
+                    to = frm + offset
+                    target = board[to]
+                    while target == EMPTY:
+                        append(encode(frm, to))
+                        to += offset
+                        target = board[to]
+                    if target != OFFBOARD and target & BLACK == rival:
+                        append(encode(frm, to))
+
+        # castling moves
+        if side:
+            king, kingside, queenside = index(0, 4), BLACK_KINGSIDE, BLACK_QUEENSIDE
+        else:
+            king, kingside, queenside = index(7, 4), WHITE_KINGSIDE, WHITE_QUEENSIDE
+        if self.castling & (kingside | queenside) and not self.is_attacked(king, rival):
+            if (self.castling & kingside and board[king + 1] == EMPTY and board[king + 2] == EMPTY
+                    and not self.is_attacked(king + 1, rival)):
+                append(encode(king, king + 2, 0, CASTLING))
+            if (self.castling & queenside and board[king - 1] == EMPTY and board[king - 2] == EMPTY
+                    and board[king - 3] == EMPTY and not self.is_attacked(king - 1, rival)):
+                append(encode(king, king - 2, 0, CASTLING))
+
+        return moves
+
+    def legal_moves(self, captures=False):
+        '''
+        legal_moves
+
+        Args:
+            captures (bool, optional): only captures and promotions, for quiescence search. Defaults to False.
+
+        Returns:
+            list: the moves of the side to move that do not leave its king in check.
+        '''
+        side = self.side
+        board = self.board
+        legal = []
+        for move in self.pseudo_moves():
+            if captures and not (board[(move >> 7) & 127] or (move >> 14) & 7 or move >> 17 == EN_PASSANT):
+                continue
+            self.make_move(move)
+            if not self.in_check(side):
+                legal.append(move)
+            self.unmake_move()
+        return legal
+
+    def make_move(self, move):
+        '''
+        make_move
+
+        Args:
+            move (int): the move to make.
+        '''
+        board = self.board
+        frm = move & 127
+        to = (move >> 7) & 127
+        promotion = (move >> 14) & 7
+        flag = move >> 17
+        code = board[frm]
+
+        captured = board[to]
+        self.history.append((move, captured, self.castling, self.ep))
+
+        board[to] = code if not promotion else promotion | self.side
+        board[frm] = EMPTY
+
+        if flag == EN_PASSANT:
+            board[to + (N if self.side else S)] = EMPTY
+        elif flag == CASTLING:
+            if to > frm:
+                board[frm + 1], board[frm + 3] = board[frm + 3], EMPTY
+            else:
+                board[frm - 1], board[frm - 4] = board[frm - 4], EMPTY
+
+        if code & 7 == KING:
+            self.kings[self.side >> 3] = to
+
+        self.castling &= CASTLING_MASK[frm] & CASTLING_MASK[to]
+        self.ep = (frm + to) // 2 if flag == DOUBLE_PUSH else 0
+        self.side ^= BLACK
+
+    def unmake_move(self):
+        '''
+        unmake_move
+        Takes back the last move made with make_move.
+        '''
+        board = self.board
+        move, captured, self.castling, self.ep = self.history.pop()
+        self.side ^= BLACK
+        frm = move & 127
+        to = (move >> 7) & 127
+        promotion = (move >> 14) & 7
+        flag = move >> 17
+
+        code = board[to] if not promotion else PAWN | self.side
+        board[frm] = code
+        board[to] = captured
+
+        if flag == EN_PASSANT:
+            board[to + (N if self.side else S)] = PAWN | (self.side ^ BLACK)
+        elif flag == CASTLING:
+            if to > frm:
+                board[frm + 3], board[frm + 1] = board[frm + 1], EMPTY
+            else:
+                board[frm - 4], board[frm - 1] = board[frm - 1], EMPTY
+
+        if code & 7 == KING:
+            self.kings[self.side >> 3] = frm
+
+    def evaluate(self):
+        '''
+        evaluate
+
+        Returns:
+            int: the material balance in centipawns from the point of view of white.
+        '''
+        board = self.board
+        score = 0
+        for sq in SQUARES:
+            code = board[sq]
+            if code:
+                score += -VALUES[code & 7] if code & BLACK else VALUES[code & 7]
+        return score
+
+    @staticmethod
+    def promotion(move):
+        '''
+        promotion
+
+        Args:
+            move (int): the mailbox move.
+
+        Returns:
+            int: the piece type a pawn promotes to, or 0.
+        '''
+        return move_promotion(move)
+
+    def to_game_code(self, move):
+        '''
+        to_game_code
+        Converts a mailbox move to the int move the Game and the search use, see Move.encode.
+
+        Args:
+            move (int): the mailbox move.
+
+        Returns:
+            int: the same move for the Game.
+        '''
+        initial_row, initial_col = row_col(move & 127)
+        final_row, final_col = row_col((move >> 7) & 127)
+        return encode_game_move(initial_row * COLS + initial_col, final_row * COLS + final_col,
+                                (move >> 14) & 7, move >> 17)
+
+    def from_game_code(self, code):
+        '''
+        from_game_code
+
+        Args:
+            code (int): an int move of the Game, see Move.encode.
+
+        Returns:
+            int: the same move for the mailbox, see to_game_code.
+        '''
+        return encode(SQUARES[code & 63], SQUARES[(code >> 6) & 63], (code >> 12) & 7, code >> 15)
+
+    def make_null_move(self):
+        '''
+        make_null_move
+        Passes the turn to the other side without moving a piece, for null move pruning.
+
+        Returns:
+            int: the en passant square from before, to pass to unmake_null_move.
+        '''
+        ep = self.ep
+        self.ep = 0
+        self.side ^= BLACK
+        return ep
+
+    def unmake_null_move(self, ep):
+        '''
+        unmake_null_move
+
+        Args:
+            ep (int): the en passant square make_null_move returned.
+        '''
+        self.ep = ep
+        self.side ^= BLACK
+
+    def to_game_move(self, game, move):
+        '''
+        to_game_move
+        Converts a mailbox move to the piece and Move the Game uses for it.
+
+        Args:
+            game (Game): the game the mailbox was built from.
+            move (int): the mailbox move.
+
+        Returns:
+            tuple: the piece to move and the Move.
+        '''
+        return game.key_move(self.to_game_code(move))
@@ -1,10 +1,58 @@
 
+# Move flags
+DOUBLE_PUSH = 1
+EN_PASSANT = 2
+CASTLING = 3
+
+# Codes of the pieces a pawn can promote to, the same as the piece types of Mailbox
+PROMOTION_CODES = {'knight': 2, 'bishop': 3, 'rook': 4, 'queen': 5}
+PROMOTION_NAMES = {code: name for name, code in PROMOTION_CODES.items()}
+
+
+def encode(frm, to, promotion=0, flag=0):
+    '''
+    encode
+    Packs a move into an int, how the move generators, the search and its tables handle moves.
+    Squares are numbered row * 8 + col.
+
+    Args:
+        frm (int): the square the piece moves from.
+        to (int): the square the piece moves to.
+        promotion (int, optional): the code of the piece a pawn promotes to, see PROMOTION_CODES. Defaults to 0.
+        flag (int, optional): DOUBLE_PUSH, EN_PASSANT or CASTLING. Defaults to 0.
+
+    Returns:
+        int: the move packed into an int.
+    '''
+    return frm | (to << 6) | (promotion << 12) | (flag << 15)
+
+
 class Move:
+    '''
+    Move class
+    a view of a move with Square objects, for the window and the tools that name moves.
+    The search works on the int moves of encode, see key.
+    '''
 
-    def __init__(self, initial, final):
+    def __init__(self, initial, final, promotion=None, flag=0):
         #initial and final are squares
         self.initial = initial
         self.final = final
+        # name of the piece a pawn promotes to, None for other moves
+        self.promotion = promotion
+        # DOUBLE_PUSH, EN_PASSANT or CASTLING, 0 for other moves and moves made by hand
+        self.flag = flag
 
     def __eq__(self, other):
-        return self.initial == other.initial and self.final == other.final
\ No newline at end of file
+        return self.initial == other.initial and self.final == other.final and self.promotion == other.promotion
+
+    def key(self):
+        # the move as an int made with encode, Game.move_code also works out the flag of moves made by hand
+        return encode(self.initial.row * 8 + self.initial.col, self.final.row * 8 + self.final.col,
+                      PROMOTION_CODES.get(self.promotion, 0), self.flag)
+
+    def uci(self):
+        # long algebraic notation like e2e4 or e7e8q, how UCI and perft name a move
+        promotion = '' if self.promotion is None else 'nbrq'['knight bishop rook queen'.split().index(self.promotion)]
+        return ('abcdefgh'[self.initial.col] + str(8 - self.initial.row)
+                + 'abcdefgh'[self.final.col] + str(8 - self.final.row) + promotion)
@@ -0,0 +1,130 @@
+'''
+This file contains the move ordering the AI uses between move generation and search.
+'''
+from classes.Move import EN_PASSANT, PROMOTION_NAMES
+
+# Piece ranks for most-valuable-victim / least-valuable-attacker ordering
+RANKS = {'pawn': 1, 'knight': 2, 'bishop': 3, 'rook': 4, 'queen': 5, 'king': 6}
+
+# Score bands, every band is tried before the next one
+TT_MOVE = 1 << 30
+CAPTURE = 1 << 28
+KILLER = 1 << 26
+# history scores are halved once one of them reaches this
+HISTORY_LIMIT = 1 << 24
+
+MAX_PLY = 128
+
+
+class MoveOrdering:
+    '''
+    MoveOrdering class
+    contains the killer moves and history table of one search and sorts moves with them:
+    the transposition table move first, then captures by most valuable victim and least valuable
+    attacker, then the two killer moves of the ply, then quiet moves by their history score.
+    '''
+
+    def __init__(self):
+        '''
+        __init__
+        '''
+        self.reset()
+
+    def reset(self):
+        '''
+        reset
+
+        Forgets the killer moves and history scores, called before every new search.
+        '''
+        self.killers = [[None, None] for _ in range(MAX_PLY)]
+        self.history = {'white': {}, 'black': {}}
+
+    @staticmethod
+    def is_capture(game, move):
+        '''
+        is_capture
+
+        Args:
+            game (Game): the game the move is made in.
+            move (int): the move, see Move.encode.
+
+        Returns:
+            bool: True if the move captures a piece or promotes a pawn.
+        '''
+        return game.cells[(move >> 6) & 63].piece is not None or (move >> 12) & 7 != 0 or move >> 15 == EN_PASSANT
+
+    def score(self, game, move, ply, tt_move):
+        '''
+        score
+
+        Args:
+            game (Game): the game the move is made in.
+            move (int): the move, see Move.encode.
+            ply (int): the distance from the root of the search.
+            tt_move (int): the transposition table move, or None.
+
+        Returns:
+            int: the ordering score of the move, higher is searched first.
+        '''
+        if move == tt_move:
+            return TT_MOVE
+        victim = game.cells[(move >> 6) & 63].piece
+        if victim is not None:
+            return CAPTURE + RANKS[victim.name] * 8 - RANKS[game.cells[move & 63].piece.name]
+        if move >> 15 == EN_PASSANT:
+            return CAPTURE + RANKS['pawn'] * 8 - RANKS['pawn']
+        promotion = (move >> 12) & 7
+        if promotion:
+            # a promotion wins about as much as capturing the piece the pawn becomes
+            return CAPTURE + RANKS[PROMOTION_NAMES[promotion]] * 8 - RANKS['pawn']
+        killers = self.killers[ply]
+        if move == killers[0]:
+            return KILLER + 1
+        if move == killers[1]:
+            return KILLER
+        return self.history[game.turn].get(move, 0)
+
+    def order(self, game, moves, ply, tt_move=None):
+        '''
+        order
+        Sorts the moves in place, so the move lists of the search are reused.
+
+        Args:
+            game (Game): the game the moves are made in.
+            moves (list): the int moves to order.
+            ply (int): the distance from the root of the search.
+            tt_move (int, optional): the transposition table move. Defaults to None.
+
+        Returns:
+            list: moves, best first.
+        '''
+        ply = min(ply, MAX_PLY - 1)
+        moves.sort(key=lambda move: self.score(game, move, ply, tt_move), reverse=True)
+        return moves
+
+    def cutoff(self, game, move, ply, depth):
+        '''
+        cutoff
+
+        Records a quiet move that caused a beta cutoff as a killer move of its ply and in the history table.
+
+        Args:
+            game (Game): the game the move was made in, with the move taken back.
+            move (int): the move.
+            ply (int): the distance from the root of the search.
+            depth (int): the remaining depth of the search, deeper cutoffs count for more.
+        '''
+        if self.is_capture(game, move):
+            return
+
+        killers = self.killers[min(ply, MAX_PLY - 1)]
+        if killers[0] != move:
+            killers[1] = killers[0]
+            killers[0] = move
+
+        history = self.history[game.turn]
+        score = history.get(move, 0) + depth * depth
+        history[move] = score
+        if score >= HISTORY_LIMIT:
+            for k in history:
+                history[k] //= 2
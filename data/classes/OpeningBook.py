@@ -0,0 +1,186 @@
+'''
+This file contains the opening book: a file of (position hash, move, weight) records sorted by the
+Zobrist hash of Game, read through mmap and binary searched, so a book of any size opens instantly
+and only the pages of the probed positions are ever read from disk.
+'''
+import mmap
+import random
+import struct
+
+from classes.Game import Game
+from classes.PGN import read_games
+
+# First bytes of a book file
+MAGIC = b'IPASBOOK'
+# One record: the hash of the position, the move (see Move.encode) and its weight, big endian
+RECORD = struct.Struct('>QII')
+# Plies of every game a book is built from
+BOOK_PLIES = 20
+
+
+class OpeningBook:
+    '''
+    OpeningBook class
+    contains an open book file and looks up the moves of a position in it.
+    '''
+
+    def __init__(self, path):
+        '''
+        __init__
+
+        Args:
+            path (str): the book file, made with write_book.
+
+        Raises:
+            ValueError: If the file is not a book.
+        '''
+        self.path = path
+        self.file = open(path, 'rb')
+        size = self.file.seek(0, 2)
+        if size < len(MAGIC) or (size - len(MAGIC)) % RECORD.size:
+            self.file.close()
+            raise ValueError(f'not an opening book: {path}')
+        # an empty book cannot be mapped, it has no records to look up anyway
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size > len(MAGIC) else MAGIC
+        if self.data[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f'not an opening book: {path}')
+        self.count = (size - len(MAGIC)) // RECORD.size
+
+    def _key(self, index):
+        return RECORD.unpack_from(self.data, len(MAGIC) + index * RECORD.size)[0]
+
+    def probe(self, key):
+        '''
+        probe
+
+        Args:
+            key (int): the Zobrist hash of a position, see Game.hash.
+
+        Returns:
+            list: the (move, weight) tuples of the position, heaviest first, empty if it is not in the book.
+        '''
+        # the first record with a key at least as large
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self._key(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        entries = []
+        while low < self.count:
+            record_key, move, weight = RECORD.unpack_from(self.data, len(MAGIC) + low * RECORD.size)
+            if record_key != key:
+                break
+            entries.append((move, weight))
+            low += 1
+        return entries
+
+    def choose(self, game, rng=random):
+        '''
+        choose
+        Picks a book move of the position at random, heavier moves more often.
+
+        Args:
+            game (Game): the position to find a move for.
+            rng (Random, optional): the random number generator to pick with. Defaults to the random module.
+
+        Returns:
+            int: a legal move, see Move.encode, or None if the position is not in the book.
+        '''
+        entries = self.probe(game.hash)
+        if not entries:
+            return None
+        # a hash collision could give the moves of another position, so only legal moves are played
+        legal = set(game.generate_moves([]))
+        entries = [(move, weight) for move, weight in entries if move in legal and weight > 0]
+        if not entries:
+            return None
+        return rng.choices([move for move, _ in entries], [weight for _, weight in entries])[0]
+
+    def close(self):
+        '''
+        close
+
+        Closes the book file.
+        '''
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self.file.close()
+
+
+def write_book(path, counts):
+    '''
+    write_book
+
+    Args:
+        path (str): the file to write the book to.
+        counts (dict): the weight of every move, keyed by the position hash and then by the move.
+
+    Returns:
+        int: the number of records written.
+    '''
+    records = sorted(((key, move, min(weight, 0xFFFFFFFF)) for key, moves in counts.items() for move, weight in moves.items()),
+                     key=lambda record: (record[0], -record[2], record[1]))
+    with open(path, 'wb') as file:
+        file.write(MAGIC)
+        for record in records:
+            file.write(RECORD.pack(*record))
+    return len(records)
+
+
+def count_moves(games, plies=BOOK_PLIES, counts=None):
+    '''
+    count_moves
+    Plays the first plies of every game and counts how often each move was played in each position.
+    Games with a move that cannot be read are counted up to that move.
+
+    Args:
+        games (iterable): games as read_games gives them.
+        plies (int, optional): the plies of every game to count. Defaults to BOOK_PLIES.
+        counts (dict, optional): counts to add to, see write_book. Defaults to new counts.
+
+    Returns:
+        tuple: the counts and the number of games read.
+    '''
+    counts = {} if counts is None else counts
+    read = 0
+    for record in games:
+        try:
+            game = Game(record['tags'].get('FEN'))
+        except ValueError:
+            continue
+        read += 1
+        for san in record['moves'][:plies]:
+            try:
+                move = game.parse_san(san)
+            except ValueError:
+                break
+            moves = counts.setdefault(game.hash, {})
+            moves[move] = moves.get(move, 0) + 1
+            game.make_move(move)
+    return counts, read
+
+
+def build_book(pgn_paths, path, plies=BOOK_PLIES, min_count=1):
+    '''
+    build_book
+
+    Args:
+        pgn_paths (list): the PGN files to build the book from.
+        path (str): the book file to write.
+        plies (int, optional): the plies of every game to put in the book. Defaults to BOOK_PLIES.
+        min_count (int, optional): moves played fewer times than this are left out. Defaults to 1.
+
+    Returns:
+        tuple: the number of games read, positions and records written.
+    '''
+    counts, games = {}, 0
+    for pgn_path in pgn_paths:
+        with open(pgn_path, encoding='utf-8', errors='replace') as file:
+            counts, read = count_moves(read_games(file), plies, counts)
+            games += read
+    counts = {key: {move: count for move, count in moves.items() if count >= min_count} for key, moves in counts.items()}
+    counts = {key: moves for key, moves in counts.items() if moves}
+    return games, len(counts), write_book(path, counts)
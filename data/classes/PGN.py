@@ -0,0 +1,54 @@
+'''
+This file contains a reader for games in PGN, the format game collections are shared in.
+Only the main line is read: comments, variations and annotation glyphs are skipped.
+'''
+import re
+
+# Tokens of the movetext: comments, variations, glyphs, move numbers, results and moves
+_TOKENS = re.compile(r'\{[^}]*\}|;[^\n]*|\(|\)|\$\d+|\d+\.(?:\.\.)?|1-0|0-1|1/2-1/2|\*|[^\s(){};]+')
+_TAG = re.compile(r'\[(\w+)\s+"((?:[^"\\]|\\.)*)"\]')
+RESULTS = ('1-0', '0-1', '1/2-1/2', '*')
+
+
+def read_games(file):
+    '''
+    read_games
+
+    Args:
+        file (file): an open PGN file, or any iterable of its lines.
+
+    Yields:
+        dict: the tags of every game, its moves in standard algebraic notation and its result.
+    '''
+    tags, text = {}, []
+    for line in file:
+        line = line.strip()
+        if line.startswith('[') and text:
+            # the tags of the next game start, the movetext of this one is complete
+            yield _game(tags, text)
+            tags, text = {}, []
+        match = _TAG.match(line)
+        if match is not None:
+            tags[match.group(1)] = match.group(2).replace('\\"', '"')
+        elif line and not line.startswith('%'):
+            text.append(line)
+    if tags or text:
+        yield _game(tags, text)
+
+
+def _game(tags, text):
+    moves = []
+    result = tags.get('Result', '*')
+    depth = 0
+    for token in _TOKENS.findall('\n'.join(text)):
+        if token == '(':
+            depth += 1
+        elif token == ')':
+            depth = max(0, depth - 1)
+        elif depth or token[0] in '{;$' or token[0].isdigit() and token.endswith('.'):
+            continue
+        elif token in RESULTS:
+            result = token
+        else:
+            moves.append(token)
+    return {'tags': tags, 'moves': moves, 'result': result}
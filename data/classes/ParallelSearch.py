@@ -0,0 +1,166 @@
+'''
+This file contains the parallel root search: the root moves of every depth are split over a pool of processes,
+so the search uses more than one core in spite of the GIL. The processes share the best score found so far
+as the alpha bound of every root move they start, and a flag to stop them. Every root move is searched like
+AI.search_root searches it, with principal variation search inside the aspiration window of AI.search_window.
+The alpha a move gets depends on which moves finished before it, so the scores of moves that are not the
+best, and the node counts, can differ from those of a search in one process.
+'''
+import multiprocessing
+import time
+
+from classes.Game import Game
+from classes.SearchStats import SearchStats
+
+# Search state of a worker process, set by _init_worker
+_worker = {}
+
+
+def _init_worker(alpha, stop_flag, tt_size_mb, check_evasions, options):
+    '''
+    _init_worker
+    Runs once in every worker process.
+
+    Args:
+        alpha (Value): the shared best score of the root moves searched so far.
+        stop_flag (RawValue): set to 1 to stop the running searches.
+        tt_size_mb (int): the size of the transposition table of each color in megabytes.
+        check_evasions (bool): see AI.
+        options (dict): the parts of the selective search to use, see AI.
+    '''
+    _worker['alpha'] = alpha
+    _worker['stop_flag'] = stop_flag
+    _worker['settings'] = (tt_size_mb, check_evasions, options)
+    # one AI per color to move at the root, so their transposition tables last between tasks
+    _worker['ais'] = {}
+
+
+def _search_move(fen, move, depth, time_left, beta, first):
+    '''
+    _search_move
+    Runs in a worker process.
+
+    Args:
+        fen (str): the root position.
+        move (int): the root move to search, see Move.encode.
+        depth (int): the depth to search the root move to.
+        time_left (float): the seconds the search may take, or None.
+        beta (float): the upper bound of the window of the root.
+        first (bool): True for the first root move, which is searched with the full window.
+
+    Returns:
+        tuple: the score of the move, the alpha bound it was searched with, True if the search was stopped,
+        and the counters of its statistics, see SearchStats.counts.
+    '''
+    from classes.AI import AI
+
+    game = Game(fen)
+    ai = _worker['ais'].get(game.turn)
+    if ai is None:
+        tt_size_mb, check_evasions, options = _worker['settings']
+        ai = _worker['ais'][game.turn] = AI(game, game.turn, tt_size_mb, check_evasions, **options)
+        ai.stop_flag = _worker['stop_flag']
+    ai.game = game
+    ai.stopped = False
+    ai.deadline = None if time_left is None else time.perf_counter() + time_left
+    ai.stats.reset()
+    ai.load_position()
+
+    alpha = _worker['alpha']
+    bound = alpha.value
+    undo = ai.make_move(move)
+    # until a move has raised alpha there is no bound for a zero window search
+    score = ai.search_move(depth - 1, bound, beta, False, 1, first or bound == float('-inf'))
+    ai.unmake_move(undo)
+
+    if not ai.stopped:
+        with alpha.get_lock():
+            if score > alpha.value:
+                alpha.value = score
+    return score, bound, ai.stopped, ai.stats.counts()
+
+
+class ParallelSearch:
+    '''
+    ParallelSearch class
+    contains the process pool of one AI and searches the root moves of one depth at a time on it.
+    '''
+
+    def __init__(self, workers, tt_size_mb=16, check_evasions=True, options=None):
+        '''
+        __init__
+
+        Args:
+            workers (int): the number of worker processes.
+            tt_size_mb (int, optional): the size of the transposition tables of each worker in megabytes. Defaults to 16.
+            check_evasions (bool, optional): see AI. Defaults to True.
+            options (dict, optional): the parts of the selective search to use, like {'lmr': False}, see AI. Defaults to all.
+        '''
+        # spawn works the same on every platform and is safe next to the threads of the window
+        context = multiprocessing.get_context('spawn')
+        self.alpha = context.Value('d', float('-inf'))
+        self.stop_flag = context.RawValue('b', 0)
+        self.pool = context.Pool(workers, initializer=_init_worker,
+                                 initargs=(self.alpha, self.stop_flag, tt_size_mb, check_evasions, options or {}))
+
+    def search_root(self, game, moves, depth, deadline=None, alpha=float('-inf'), beta=float('inf')):
+        '''
+        search_root
+
+        Args:
+            game (Game): the root position, the color to move is the color of the AI.
+            moves (list): the int moves to search, best first.
+            depth (int): the depth to search the moves to.
+            deadline (float, optional): the time.perf_counter time the search has to stop at. Defaults to None.
+            alpha (float, optional): the lower bound of the window, see AI.search_window. Defaults to no bound.
+            beta (float, optional): the upper bound of the window. Defaults to no bound.
+
+        Returns:
+            tuple: the best score, the best move and the counters of the statistics of all workers, see SearchStats.counts,
+            or None if the search was stopped before every move was searched. Like AI.search_root, a score at or
+            below alpha or at or above beta only tells the real score is not higher or not lower.
+        '''
+        self.stop_flag.value = 0
+        self.alpha.value = alpha
+        fen = game.fen()
+        time_left = None if deadline is None else deadline - time.perf_counter()
+        # the tasks are handed out in order, so the best moves of the last depth raise alpha first
+        tasks = [self.pool.apply_async(_search_move, (fen, move, depth, time_left, beta, index == 0))
+                 for index, move in enumerate(moves)]
+
+        best_score, best_move = None, None
+        # the best of the moves that all failed low, when no move got above the window
+        low_score, low_move = None, None
+        stats = SearchStats()
+        stopped = False
+        for move, task in zip(moves, tasks):
+            score, bound, move_stopped, counts = task.get()
+            stopped = stopped or move_stopped
+            stats.merge(counts)
+            # a score at or below the alpha it was searched with is only an upper bound
+            if score > bound and (best_move is None or score > best_score):
+                best_score, best_move = score, move
+            elif low_move is None or score > low_score:
+                low_score, low_move = score, move
+        if stopped:
+            return None
+        if best_move is None:
+            best_score, best_move = low_score, low_move
+        return best_score, best_move, stats.counts()
+
+    def stop(self):
+        '''
+        stop
+
+        Stops the running searches of the workers.
+        '''
+        self.stop_flag.value = 1
+
+    def close(self):
+        '''
+        close
+
+        Stops the worker processes.
+        '''
+        self.pool.terminate()
+        self.pool.join()
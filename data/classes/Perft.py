@@ -0,0 +1,172 @@
+'''
+This file contains perft, which counts the leaf nodes of the move tree to a fixed depth.
+The counts of the standard positions below are known, so any difference points at a move generation bug,
+and the time it takes measures move generation speed.
+'''
+import time
+
+from classes.Game import Game
+from classes.Mailbox import Mailbox
+from classes.Bitboard import Bitboard
+
+# Move generators perft can run on besides Game.generate_moves
+BACKENDS = {'mailbox': Mailbox, 'bitboard': Bitboard}
+
+# Standard test positions with their known node counts per depth
+POSITIONS = {
+    'initial': (
+        'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1',
+        {1: 20, 2: 400, 3: 8902, 4: 197281, 5: 4865609},
+    ),
+    'kiwipete': (
+        'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1',
+        {1: 48, 2: 2039, 3: 97862, 4: 4085603},
+    ),
+    # en passant captures that uncover a check along the row
+    'en-passant': (
+        '8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1',
+        {1: 14, 2: 191, 3: 2812, 4: 43238, 5: 674624},
+    ),
+    # promotions with and without capture for both colors, castling only for black
+    'promotion': (
+        'r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1',
+        {1: 6, 2: 264, 3: 9467, 4: 422333},
+    ),
+    'underpromotion': (
+        'n1n5/PPPk4/8/8/8/8/4Kppp/5N1N b - - 0 1',
+        {1: 24, 2: 496, 3: 9483, 4: 182838},
+    ),
+    'position-5': (
+        'rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8',
+        {1: 44, 2: 1486, 3: 62379, 4: 2103487},
+    ),
+}
+
+
+def _perft_game(game, depth, move_lists):
+    # one move list per depth, filled again at every node
+    moves = game.generate_moves(move_lists[depth])
+    # the leaves do not have to be made to be counted
+    if depth == 1:
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        undo = game.make_move(move)
+        nodes += _perft_game(game, depth - 1, move_lists)
+        game.unmake_move(undo)
+    return nodes
+
+
+def _perft_position(position, depth):
+    moves = position.legal_moves()
+    if depth == 1:
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        position.make_move(move)
+        nodes += _perft_position(position, depth - 1)
+        position.unmake_move()
+    return nodes
+
+
+def divide(game, depth, backend=None):
+    '''
+    divide
+
+    Args:
+        game (Game): the game to count from, left as it was.
+        depth (int): the depth to count to, at least 1.
+        backend (str, optional): 'mailbox' or 'bitboard' to count with that move generator. Defaults to None, Game.generate_moves.
+
+    Returns:
+        dict: the node count below every root move, keyed by the move in long algebraic notation.
+    '''
+    if depth < 1:
+        raise ValueError('divide needs a depth of at least 1')
+    counts = {}
+    if backend is None:
+        move_lists = [[] for _ in range(depth)]
+        for piece, move in game.legal_moves():
+            undo = game.make_move(move)
+            counts[move.uci()] = _perft_game(game, depth - 1, move_lists) if depth > 1 else 1
+            game.unmake_move(undo)
+    else:
+        position = BACKENDS[backend].from_game(game)
+        for move in position.legal_moves():
+            name = position.to_game_move(game, move)[1].uci()
+            position.make_move(move)
+            counts[name] = _perft_position(position, depth - 1) if depth > 1 else 1
+            position.unmake_move()
+    return counts
+
+
+def perft(game, depth, backend=None):
+    '''
+    perft
+
+    Args:
+        game (Game): the game to count from, left as it was.
+        depth (int): the depth to count to.
+        backend (str, optional): 'mailbox' or 'bitboard' to count with that move generator. Defaults to None, Game.generate_moves.
+
+    Returns:
+        int: the number of leaf nodes at the depth.
+    '''
+    if depth < 1:
+        return 1
+    if backend is None:
+        return _perft_game(game, depth, [[] for _ in range(depth + 1)])
+    return _perft_position(BACKENDS[backend].from_game(game), depth)
+
+
+def run(fen, depth, backend=None, expected=None, name=None):
+    '''
+    run
+    Counts one position and times it.
+
+    Args:
+        fen (str): the position in FEN notation.
+        depth (int): the depth to count to.
+        backend (str, optional): the move generator, see perft. Defaults to None.
+        expected (int, optional): the known node count. Defaults to None.
+        name (str, optional): the name of the position. Defaults to None.
+
+    Returns:
+        dict: the name, fen, depth, backend, nodes, expected nodes, ok flag, seconds and nodes per second of the run.
+    '''
+    game = Game(fen)
+    start = time.perf_counter()
+    nodes = perft(game, depth, backend)
+    seconds = time.perf_counter() - start
+    return {
+        'name': name,
+        'fen': fen,
+        'depth': depth,
+        'backend': backend or 'game',
+        'nodes': nodes,
+        'expected': expected,
+        'ok': expected is None or nodes == expected,
+        'seconds': round(seconds, 4),
+        'nps': int(nodes / seconds) if seconds > 0 else 0,
+    }
+
+
+def run_suite(max_depth=3, backend=None, names=None):
+    '''
+    run_suite
+
+    Args:
+        max_depth (int, optional): the deepest depth to count each position to. Defaults to 3.
+        backend (str, optional): the move generator, see perft. Defaults to None.
+        names (list, optional): the names of the positions to run. Defaults to None, all of them.
+
+    Returns:
+        list: the result of run for every position and depth up to max_depth.
+    '''
+    results = []
+    for name in names or POSITIONS:
+        fen, counts = POSITIONS[name]
+        for depth in sorted(counts):
+            if depth <= max_depth:
+                results.append(run(fen, depth, backend, counts[depth], name))
+    return results
@@ -1,21 +1,14 @@
-import os
-
 class Piece:
     
-    def __init__(self, name, color, value, texture=None, texture_rect=None):
+    def __init__(self, name, color, value, texture_rect=None):
         self.name = name
         self.color = color
         value_sign = 1 if color == 'white' else -1
-        self.value = value = value_sign
+        self.value = value * value_sign
         self.moves = []
         self.moved = False
-        self.set_texture()
         self.texture_rect = texture_rect
 
-    def set_texture(self):
-        self.texture = os.path.join(
-            f'data/imgs/{self.color}_{self.name}.png')
-        
     def add_move(self, move):
         self.moves.append(move)
 
@@ -0,0 +1,120 @@
+'''
+This file contains the opt-in profiler of the search. Set the environment variable CHESS_PROFILE to a
+directory, or pass --profile to main.py, uci.py or tournament.py, and every search is run under cProfile:
+its profile is written to the directory as a pstats file, which pstats, snakeviz and flameprof read, and the
+call counts and times of the hot functions of the move generator and the search are printed to stderr.
+When profiling is off a search costs one extra function call.
+'''
+import cProfile
+import functools
+import os
+import pstats
+import sys
+import threading
+import time
+
+# Environment variable that turns the profiler on, its value is the directory to write the profiles to
+PROFILE_ENV = 'CHESS_PROFILE'
+# Functions summarized after every search, as (class, function); the ones that were not called are left out
+HOT_FUNCTIONS = (
+    ('AI', 'find_best_move'), ('AI', 'minimax'), ('AI', 'quiescence'), ('AI', 'generate_moves'),
+    ('AI', 'get_all_valid_moves'), ('AI', 'evaluate_board'),
+    ('Game', 'calc_moves'), ('Game', 'generate_moves'), ('Game', 'checks_and_pins'), ('Game', '_legal_moves'),
+    ('Game', '_piece_moves'), ('Game', '_pawn_moves'), ('Game', '_castling_moves'), ('Game', 'in_check'),
+    ('Game', 'king_attacked'), ('Game', 'is_square_attacked'), ('Game', 'move'), ('Game', 'make_move'),
+    ('Game', 'unmake_move'), ('Game', 'evaluate'),
+    ('MoveOrdering', 'order'), ('TranspositionTable', 'probe'), ('TranspositionTable', 'store'),
+)
+
+# the directory the profiles go to, None when profiling is off, and the number of profiles written
+_state = {'directory': os.environ.get(PROFILE_ENV) or None, 'count': 0}
+# one profile can run at a time, a search that starts while another is profiled runs without
+_lock = threading.Lock()
+
+
+def enable_profiler(directory):
+    '''
+    enable_profiler
+    Turns the profiler on, like setting CHESS_PROFILE, which it also sets for the processes started after it.
+
+    Args:
+        directory (str): the directory to write the profiles to, None turns the profiler off.
+    '''
+    _state['directory'] = directory or None
+    if directory:
+        os.environ[PROFILE_ENV] = directory
+    else:
+        os.environ.pop(PROFILE_ENV, None)
+
+
+def profiler_enabled():
+    '''
+    profiler_enabled
+
+    Returns:
+        bool: True if searches are profiled.
+    '''
+    return _state['directory'] is not None
+
+
+def profiled(name):
+    '''
+    profiled
+    Makes a function write a profile of every call to it while the profiler is on.
+
+    Args:
+        name (str): the start of the file names of the profiles, like 'search'.
+
+    Returns:
+        function: the decorator.
+    '''
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if _state['directory'] is None or not _lock.acquire(blocking=False):
+                return function(*args, **kwargs)
+            try:
+                return _profile(name, function, args, kwargs)
+            finally:
+                _lock.release()
+        return wrapper
+    return decorate
+
+
+def _profile(name, function, args, kwargs):
+    directory = _state['directory']
+    profile = cProfile.Profile()
+    start = time.perf_counter()
+    try:
+        return profile.runcall(function, *args, **kwargs)
+    finally:
+        seconds = time.perf_counter() - start
+        _state['count'] += 1
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{name}-{os.getpid()}-{_state['count']:04d}.prof")
+        profile.dump_stats(path)
+        print(summary(pstats.Stats(profile), f'{path} ({seconds:.3f} s)'), file=sys.stderr, flush=True)
+
+
+def summary(stats, title=''):
+    '''
+    summary
+
+    Args:
+        stats (pstats.Stats): a profile.
+        title (str, optional): the first line of the summary. Defaults to ''.
+
+    Returns:
+        str: a table of the calls, own time and cumulative time of the functions of HOT_FUNCTIONS in the profile.
+    '''
+    rows = []
+    # every class has a file of its own name, so the file tells whose function it is
+    for (path, _, function), (_, calls, own_time, cumulative_time, _) in stats.stats.items():
+        owner = os.path.splitext(os.path.basename(path))[0]
+        if (owner, function) in HOT_FUNCTIONS:
+            rows.append((cumulative_time, calls, own_time, f'{owner}.{function}'))
+    rows.sort(reverse=True)
+    lines = [title] if title else []
+    lines.append(f"{'calls':>10} {'own s':>9} {'total s':>9}  function")
+    lines += [f'{calls:>10} {own_time:>9.3f} {cumulative_time:>9.3f}  {label}' for cumulative_time, calls, own_time, label in rows]
+    return '\n'.join(lines)
@@ -0,0 +1,231 @@
+'''
+This file contains the statistics of a search: what the search did and where its time went, so the effect
+of a change to the search can be measured instead of guessed.
+'''
+import json
+import time
+
+# Counters of a search, in the order counts gives them
+COUNTERS = ('nodes', 'qnodes', 'cutoffs', 'first_cutoffs', 'tt_probes', 'tt_hits',
+            'null_cutoffs', 'reductions', 'researches', 'aspiration_fails',
+            'movegen_time', 'check_time', 'eval_time')
+
+
+class SearchStats:
+    '''
+    SearchStats class
+    contains the counters of one search of AI, filled while it searches.
+    '''
+
+    def __init__(self, timing=True):
+        '''
+        __init__
+
+        Args:
+            timing (bool, optional): False when the search does not time its calls, the times are then left out. Defaults to True.
+        '''
+        self.timing = timing
+        self.reset()
+
+    def reset(self):
+        '''
+        reset
+
+        Sets every counter to zero and starts the clock, at the start of a search.
+        '''
+        # nodes visited by minimax and by quiescence search
+        self.nodes = 0
+        self.qnodes = 0
+        # beta cutoffs, and those made by the first move searched
+        self.cutoffs = 0
+        self.first_cutoffs = 0
+        # transposition table lookups and the ones that found the position
+        self.tt_probes = 0
+        self.tt_hits = 0
+        # cutoffs by null moves, moves searched less deep, moves searched again with a wider window or
+        # to full depth, and aspiration windows the score fell outside of
+        self.null_cutoffs = 0
+        self.reductions = 0
+        self.researches = 0
+        self.aspiration_fails = 0
+        # seconds spent generating moves, testing for check and evaluating, only kept when timing is on
+        self.movegen_time = 0.0
+        self.check_time = 0.0
+        self.eval_time = 0.0
+        # deepest ply reached, quiescence search included
+        self.seldepth = 0
+        # the last completed depth, its score and the nodes of every completed depth
+        self.depth = 0
+        self.score = None
+        self.depth_nodes = []
+        self.start = time.perf_counter()
+        self.seconds = 0.0
+
+    def counts(self):
+        '''
+        counts
+
+        Returns:
+            tuple: the counters, in the order of COUNTERS, to send from a worker process to merge.
+        '''
+        return tuple(getattr(self, name) for name in COUNTERS)
+
+    def merge(self, counts):
+        '''
+        merge
+
+        Args:
+            counts (tuple): the counters of another search, as counts gives them.
+        '''
+        for name, count in zip(COUNTERS, counts):
+            setattr(self, name, getattr(self, name) + count)
+
+    def completed(self, depth, score):
+        '''
+        completed
+        Records a depth of the iterative deepening that was searched to the end.
+
+        Args:
+            depth (int): the depth.
+            score (int): the score of the best move at that depth.
+        '''
+        self.depth = depth
+        self.score = score
+        self.depth_nodes.append(self.nodes + self.qnodes - sum(self.depth_nodes))
+
+    def finish(self):
+        '''
+        finish
+
+        Stops the clock, at the end of a search.
+        '''
+        self.seconds = time.perf_counter() - self.start
+
+    def elapsed(self):
+        '''
+        elapsed
+
+        Returns:
+            float: the seconds the search took, or has taken so far.
+        '''
+        return self.seconds or time.perf_counter() - self.start
+
+    def nps(self):
+        '''
+        nps
+
+        Returns:
+            int: the nodes searched per second, quiescence nodes included.
+        '''
+        elapsed = self.elapsed()
+        return int((self.nodes + self.qnodes) / elapsed) if elapsed > 0 else 0
+
+    def first_cutoff_rate(self):
+        '''
+        first_cutoff_rate
+
+        Returns:
+            float: the share of the beta cutoffs made by the first move, a measure of the move ordering, or None without cutoffs.
+        '''
+        return self.first_cutoffs / self.cutoffs if self.cutoffs else None
+
+    def branching_factor(self):
+        '''
+        branching_factor
+
+        Returns:
+            float: the effective branching factor, the nodes of the last completed depth divided by those of the depth before it,
+            or None with fewer than two depths.
+        '''
+        if len(self.depth_nodes) < 2 or not self.depth_nodes[-2]:
+            return None
+        return self.depth_nodes[-1] / self.depth_nodes[-2]
+
+    def tt_hit_rate(self):
+        '''
+        tt_hit_rate
+
+        Returns:
+            float: the share of the transposition table lookups that found the position, or None without lookups.
+        '''
+        return self.tt_hits / self.tt_probes if self.tt_probes else None
+
+    def to_dict(self):
+        '''
+        to_dict
+
+        Returns:
+            dict: the counters and the measures made from them, for JSON.
+        '''
+        def rounded(value, digits=4):
+            return None if value is None else round(value, digits)
+
+        return {
+            'depth': self.depth,
+            'seldepth': self.seldepth,
+            'score': self.score,
+            'nodes': self.nodes,
+            'qnodes': self.qnodes,
+            'seconds': round(self.elapsed(), 4),
+            'nps': self.nps(),
+            'cutoffs': self.cutoffs,
+            'first_cutoff_rate': rounded(self.first_cutoff_rate()),
+            'branching_factor': rounded(self.branching_factor(), 2),
+            'depth_nodes': self.depth_nodes,
+            'tt_probes': self.tt_probes,
+            'tt_hits': self.tt_hits,
+            'tt_hit_rate': rounded(self.tt_hit_rate()),
+            'null_cutoffs': self.null_cutoffs,
+            'reductions': self.reductions,
+            'researches': self.researches,
+            'aspiration_fails': self.aspiration_fails,
+            'movegen_time': round(self.movegen_time, 4) if self.timing else None,
+            'check_time': round(self.check_time, 4) if self.timing else None,
+            'eval_time': round(self.eval_time, 4) if self.timing else None,
+        }
+
+    def info_lines(self, score=None, pv=None):
+        '''
+        info_lines
+
+        Args:
+            score (str, optional): the score in UCI notation, like 'cp 35' or 'mate 3'. Defaults to None.
+            pv (str, optional): the moves of the principal variation in long algebraic notation. Defaults to None.
+
+        Returns:
+            list: UCI info lines, the standard fields first and the rest as an info string.
+        '''
+        nodes = self.nodes + self.qnodes
+        line = f'info depth {self.depth} seldepth {self.seldepth}'
+        if score is not None:
+            line += f' score {score}'
+        line += f' nodes {nodes} nps {self.nps()} time {int(self.elapsed() * 1000)}'
+        if pv:
+            line += f' pv {pv}'
+
+        def percent(value):
+            return '-' if value is None else f'{value:.1%}'
+
+        branching = self.branching_factor()
+        counters = (f'info string qnodes {self.qnodes} cutoffs {self.cutoffs} '
+                    f'firstcutoff {percent(self.first_cutoff_rate())} '
+                    f"ebf {'-' if branching is None else f'{branching:.2f}'} "
+                    f'tthits {self.tt_hits}/{self.tt_probes} '
+                    f'nullcuts {self.null_cutoffs} reductions {self.reductions} researches {self.researches} '
+                    f'aspirationfails {self.aspiration_fails}')
+        if self.timing:
+            counters += (f' movegen {self.movegen_time * 1000:.0f}ms check {self.check_time * 1000:.0f}ms '
+                         f'eval {self.eval_time * 1000:.0f}ms')
+        return [line, counters]
+
+    def write(self, path, **fields):
+        '''
+        write
+        Appends the statistics as one JSON line to a log file.
+
+        Args:
+            path (str): the log file.
+            **fields: more fields to write, like the position and the move played.
+        '''
+        with open(path, 'a') as file:
+            file.write(json.dumps({**fields, **self.to_dict()}) + '\n')
@@ -0,0 +1,461 @@
+'''
+This file contains the endgame tablebases: the distance to mate of every position of an ending with a few
+pieces and no pawns, worked out backwards from the checkmates (retrograde analysis). A table is a file of one
+byte per position, indexed by the side to move and the squares of the pieces and read through mmap, so
+looking up a position costs the same however far away the mate is.
+'''
+import mmap
+import os
+from itertools import product
+
+from classes.Const import ROWS, COLS
+from classes.Game import KNIGHT_TARGETS, KING_TARGETS, SLIDER_RAYS, FEN_LETTERS
+
+# First bytes of a table file
+MAGIC = b'IPASDTM1'
+# File extension of the table files, the file name is the ending like KQK.dtm
+EXTENSION = '.dtm'
+# Most pieces, kings included, of the endings that can be built
+MAX_PIECES = 4
+# Endings built when none are named
+DEFAULT_ENDINGS = ('KQK', 'KRK')
+# Plies of the slowest loss by a capture of a position that cannot lose, for the generator
+CANNOT_LOSE = 255
+
+# Pieces of a table name, the letters of each side are written strongest first after its king
+PIECE_NAMES = {'K': 'king', 'Q': 'queen', 'R': 'rook', 'B': 'bishop', 'N': 'knight'}
+LETTER_ORDER = 'KQRBN'
+LETTER_VALUES = {'K': 0, 'Q': 9, 'R': 5, 'B': 3, 'N': 3}
+
+# A position is stored as one byte: 0 for a draw, otherwise the plies to mate plus one.
+# An odd number of plies is a win for the side to move, an even number a loss.
+# The squares of the first piece, the white king, are mirrored into one quarter of the board, which
+# leaves 16 squares for it and makes a table a quarter of the size.
+QUARTER = ROWS // 2 * COLS // 2
+TRANSFORMS = tuple(tuple((ROWS - 1 - sq // COLS if flip_rows else sq // COLS) * COLS
+                         + (COLS - 1 - sq % COLS if flip_cols else sq % COLS) for sq in range(ROWS * COLS))
+                   for flip_rows in (False, True) for flip_cols in (False, True))
+# the transform that mirrors a square of the white king into the quarter, and its number there
+KING_TRANSFORMS = tuple(TRANSFORMS[(sq // COLS >= ROWS // 2) * 2 + (sq % COLS >= COLS // 2)] for sq in range(ROWS * COLS))
+QUARTER_SQUARES = tuple((sq // COLS) * (COLS // 2) + sq % COLS if sq // COLS < ROWS // 2 and sq % COLS < COLS // 2 else None
+                        for sq in range(ROWS * COLS))
+
+
+def _mask(squares):
+    mask = 0
+    for sq in squares:
+        mask |= 1 << sq
+    return mask
+
+
+# Squares attacked by a king or knight as bit masks, and for every two squares on a line the kind of
+# slider that moves along it and the squares in between, for the attack tests of the generator
+STEP_MASKS = {'king': tuple(_mask(targets) for targets in KING_TARGETS),
+              'knight': tuple(_mask(targets) for targets in KNIGHT_TARGETS)}
+LINES = [[None] * (ROWS * COLS) for _ in range(ROWS * COLS)]
+BETWEEN = [[0] * (ROWS * COLS) for _ in range(ROWS * COLS)]
+for _kind in ('rook', 'bishop'):
+    for _sq in range(ROWS * COLS):
+        for _ray in SLIDER_RAYS[_kind][_sq]:
+            for _i, _target in enumerate(_ray):
+                LINES[_sq][_target] = _kind
+                BETWEEN[_sq][_target] = _mask(_ray[:_i])
+
+
+def table_size(name):
+    '''
+    table_size
+
+    Args:
+        name (str): the ending, like 'KQK' or 'KRKN'.
+
+    Returns:
+        int: the number of positions, and bytes, of its table.
+    '''
+    return 2 * QUARTER * (ROWS * COLS) ** (len(name) - 1)
+
+
+def table_name(pieces):
+    '''
+    table_name
+    Names the ending of the pieces, the stronger side first.
+
+    Args:
+        pieces (list): (letter, color) tuples of the pieces, letters like in a table name and color 0 for white, 1 for black.
+
+    Returns:
+        tuple: the name of the table, like 'KRKN', and True if black is the stronger side, so its pieces are the first in the table.
+    '''
+    sides = [''.join(sorted((letter for letter, piece_color in pieces if piece_color == color), key=LETTER_ORDER.index))
+             for color in (0, 1)]
+    strength = [(sum(LETTER_VALUES[letter] for letter in side), len(side), [-LETTER_ORDER.index(letter) for letter in side])
+                for side in sides]
+    swap = strength[1] > strength[0]
+    return (sides[1] + sides[0] if swap else sides[0] + sides[1]), swap
+
+
+def _index(stm, squares):
+    # squares in the order of the table name, the first one is the square of the white king
+    transform = KING_TRANSFORMS[squares[0]]
+    index = stm * QUARTER + QUARTER_SQUARES[transform[squares[0]]]
+    for sq in squares[1:]:
+        index = index * 64 + transform[sq]
+    return index
+
+
+def _lookup(tables, pieces, stm, offset=0):
+    # the stored byte of a position given as (letter, color, square) tuples, None if its table is missing
+    if len(pieces) == 2:
+        return 0
+    name, swap = table_name([(letter, color) for letter, color, _ in pieces])
+    table = tables.get(name)
+    if table is None:
+        return None
+    if swap:
+        pieces = [(letter, 1 - color, sq) for letter, color, sq in pieces]
+        stm = 1 - stm
+    pieces = sorted(pieces, key=lambda piece: (piece[1], LETTER_ORDER.index(piece[0])))
+    return table[offset + _index(stm, [sq for _, _, sq in pieces])]
+
+
+def _attacked(target, attackers, occupied):
+    # True if one of the (kind, square) attackers attacks the target square
+    for kind, sq in attackers:
+        if kind == 'king' or kind == 'knight':
+            if STEP_MASKS[kind][sq] >> target & 1:
+                return True
+        else:
+            line = LINES[sq][target]
+            if line is not None and (kind == 'queen' or kind == line) and not BETWEEN[sq][target] & occupied:
+                return True
+    return False
+
+
+def _targets(kind, sq, occupied):
+    # the squares a piece moves to on an otherwise empty board, sliders stop at the first occupied square
+    if kind == 'king':
+        return KING_TARGETS[sq]
+    if kind == 'knight':
+        return KNIGHT_TARGETS[sq]
+    targets = []
+    for ray in SLIDER_RAYS[kind][sq]:
+        for target in ray:
+            targets.append(target)
+            if occupied >> target & 1:
+                break
+    return targets
+
+
+def dependencies(name):
+    '''
+    dependencies
+
+    Args:
+        name (str): the ending, like 'KQKR'.
+
+    Returns:
+        list: the endings a capture in this ending leads to, the endings they lead to first.
+    '''
+    black = name.index('K', 1)
+    pieces = [(letter, int(i >= black)) for i, letter in enumerate(name)]
+    names = []
+    for i, (letter, _) in enumerate(pieces):
+        if letter == 'K':
+            continue
+        sub_name = table_name(pieces[:i] + pieces[i + 1:])[0]
+        if len(sub_name) > 2:
+            for dependency in dependencies(sub_name) + [sub_name]:
+                if dependency not in names:
+                    names.append(dependency)
+    return names
+
+
+def generate(name, tables):
+    '''
+    generate
+    Works out the distance to mate of every position of the ending. The checkmates are found first,
+    then every position that mates in one ply more than a known loss for the other side, and every
+    position whose moves all lead to known wins for the other side, until nothing changes.
+    The rest are draws.
+
+    Args:
+        name (str): the ending, like 'KQK', as table_name gives it.
+        tables (dict): the tables of the endings captures lead to, see dependencies, keyed by name.
+
+    Returns:
+        bytearray: the table, see the comment above TRANSFORMS.
+    '''
+    n = len(name)
+    black = name.index('K', 1)
+    letters = list(name)
+    kinds = [PIECE_NAMES[letter] for letter in letters]
+    colors = [int(i >= black) for i in range(n)]
+    kings = (0, black)
+    size = table_size(name)
+    values = bytearray(size)
+    # moves in the ending not yet known to lose, and the plies of the slowest loss by a capture,
+    # CANNOT_LOSE when a capture or stalemate saves the position
+    counts = bytearray(size)
+    slowest = bytearray(size)
+    # positions to store with the plies of their index
+    found = [[] for _ in range(CANNOT_LOSE)]
+
+    index = -1
+    for stm in (0, 1):
+        for king in range(ROWS * COLS):
+            if QUARTER_SQUARES[king] is None:
+                continue
+            for rest in product(range(ROWS * COLS), repeat=n - 1):
+                index += 1
+                squares = (king,) + rest
+                occupied = _mask(squares)
+                if bin(occupied).count('1') < n:
+                    continue
+                them = [(kinds[i], squares[i]) for i in range(n) if colors[i] != stm]
+                if _attacked(squares[kings[1 - stm]], [(kinds[i], squares[i]) for i in range(n) if colors[i] == stm], occupied):
+                    continue
+                moves = 0
+                count = 0
+                best = 0
+                worst = 0
+                for i in range(n):
+                    if colors[i] != stm:
+                        continue
+                    kind, frm = kinds[i], squares[i]
+                    for to in _targets(kind, frm, occupied):
+                        captured = None
+                        if occupied >> to & 1:
+                            captured = squares.index(to)
+                            if colors[captured] == stm:
+                                continue
+                        after = occupied & ~(1 << frm) | (1 << to)
+                        king_sq = to if i == kings[stm] else squares[kings[stm]]
+                        attackers = them if captured is None else [attacker for attacker in them if attacker[1] != to]
+                        if _attacked(king_sq, attackers, after):
+                            continue
+                        moves += 1
+                        if captured is None:
+                            count += 1
+                            continue
+                        value = _lookup(tables, [(letters[j], colors[j], to if j == i else squares[j])
+                                                 for j in range(n) if j != captured], 1 - stm)
+                        if value == 0:
+                            worst = CANNOT_LOSE
+                        elif value % 2:
+                            # the other side is mated in value - 1 plies
+                            best = value if not best else min(best, value)
+                        elif worst != CANNOT_LOSE:
+                            worst = max(worst, value)
+                if not moves:
+                    if _attacked(squares[kings[stm]], them, occupied):
+                        found[0].append(index)
+                    continue
+                if best:
+                    found[best].append(index)
+                    worst = CANNOT_LOSE
+                elif not count and worst != CANNOT_LOSE:
+                    found[worst].append(index)
+                counts[index] = count
+                slowest[index] = worst
+
+    for plies in range(CANNOT_LOSE - 1):
+        for index in found[plies]:
+            if values[index]:
+                continue
+            values[index] = plies + 1
+            stm, rest = divmod(index, QUARTER * 64 ** (n - 1))
+            squares = [0] * n
+            for i in range(n - 1, 0, -1):
+                rest, squares[i] = divmod(rest, 64)
+            squares[0] = rest // (COLS // 2) * COLS + rest % (COLS // 2)
+            occupied = _mask(squares)
+            # the positions one move of the other side before this one
+            mover = 1 - stm
+            for i in range(n):
+                if colors[i] != mover:
+                    continue
+                kind = kinds[i]
+                for frm in _targets(kind, squares[i], occupied):
+                    if occupied >> frm & 1:
+                        continue
+                    before = list(squares)
+                    before[i] = frm
+                    before_occupied = occupied & ~(1 << squares[i]) | (1 << frm)
+                    if _attacked(before[kings[stm]], [(kinds[j], before[j]) for j in range(n) if colors[j] == mover],
+                                 before_occupied):
+                        continue
+                    previous = _index(mover, before)
+                    if values[previous]:
+                        continue
+                    if plies % 2 == 0:
+                        found[plies + 1].append(previous)
+                    else:
+                        counts[previous] -= 1
+                        if not counts[previous] and slowest[previous] != CANNOT_LOSE:
+                            found[max(plies + 1, slowest[previous])].append(previous)
+        found[plies] = None
+    return values
+
+
+def write_table(path, table):
+    '''
+    write_table
+
+    Args:
+        path (str): the file to write the table to.
+        table (bytearray): the table, as generate gives it.
+    '''
+    with open(path, 'wb') as file:
+        file.write(MAGIC)
+        file.write(table)
+
+
+def build_tables(names, directory, callback=None):
+    '''
+    build_tables
+    Builds the tables of the endings and of the endings captures in them lead to.
+    Tables already in the directory are read instead of built again.
+
+    Args:
+        names (list): the endings, like ['KQK', 'KRKN'], in any order of sides.
+        directory (str): the directory to write the tables to.
+        callback (function, optional): called with the name of every table before it is built. Defaults to None.
+
+    Raises:
+        ValueError: If an ending has pawns, too many pieces or not one king per side.
+
+    Returns:
+        list: the names of the tables that were built.
+    '''
+    wanted = []
+    for name in names:
+        name = name.upper()
+        black = name.find('K', 1)
+        if not name.startswith('K') or black < 0 or name.count('K') != 2 or set(name) - set(PIECE_NAMES) \
+                or not 3 <= len(name) <= MAX_PIECES:
+            raise ValueError(f'not an ending without pawns of 3 to {MAX_PIECES} pieces: {name}')
+        name = table_name([(letter, int(i >= black)) for i, letter in enumerate(name)])[0]
+        for dependency in dependencies(name) + [name]:
+            if dependency not in wanted:
+                wanted.append(dependency)
+
+    os.makedirs(directory, exist_ok=True)
+    tables, built = {}, []
+    for name in wanted:
+        path = os.path.join(directory, name + EXTENSION)
+        if os.path.exists(path):
+            with open(path, 'rb') as file:
+                data = file.read()
+            if data[:len(MAGIC)] == MAGIC and len(data) == len(MAGIC) + table_size(name):
+                tables[name] = data[len(MAGIC):]
+                continue
+        if callback is not None:
+            callback(name)
+        tables[name] = generate(name, tables)
+        write_table(path, tables[name])
+        built.append(name)
+    return built
+
+
+class Tablebase:
+    '''
+    Tablebase class
+    contains the open tables of a directory and looks up positions in them.
+    '''
+
+    def __init__(self, directory):
+        '''
+        __init__
+
+        Args:
+            directory (str): the directory with the table files, made with build_tables.
+
+        Raises:
+            ValueError: If a table file is damaged.
+        '''
+        self.directory = directory
+        self.files = []
+        self.tables = {}
+        for file_name in sorted(os.listdir(directory)):
+            name, extension = os.path.splitext(file_name)
+            if extension != EXTENSION:
+                continue
+            file = open(os.path.join(directory, file_name), 'rb')
+            self.files.append(file)
+            if file.seek(0, 2) != len(MAGIC) + table_size(name):
+                self.close()
+                raise ValueError(f'not a table of {name}: {file.name}')
+            self.tables[name] = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            if self.tables[name][:len(MAGIC)] != MAGIC:
+                self.close()
+                raise ValueError(f'not a table of {name}: {file.name}')
+        self.max_pieces = max((len(name) for name in self.tables), default=0)
+
+    def probe(self, game):
+        '''
+        probe
+
+        Args:
+            game (Game): the position to look up.
+
+        Returns:
+            tuple: 1 if the side to move mates, -1 if it is mated and 0 for a draw, and the plies to mate,
+            or None if the position is not in the tables.
+        '''
+        pieces = []
+        for sq, cell in enumerate(game.cells):
+            piece = cell.piece
+            if piece is not None:
+                if piece.name == 'pawn' or len(pieces) == self.max_pieces:
+                    return None
+                pieces.append((FEN_LETTERS[piece.name].upper(), 0 if piece.color == 'white' else 1, sq))
+        # the tables do not know castling, which a king and rook that never moved may still do
+        if game.castle_rights:
+            return None
+        value = _lookup(self.tables, pieces, 0 if game.turn == 'white' else 1, len(MAGIC))
+        if value is None:
+            return None
+        if not value:
+            return 0, 0
+        return (1 if value % 2 == 0 else -1), value - 1
+
+    def choose(self, game):
+        '''
+        choose
+        Picks the move to the quickest mate, or when there is none the move that keeps the draw
+        or puts off the mate the longest.
+
+        Args:
+            game (Game): the position to find a move for.
+
+        Returns:
+            int: a legal move, see Move.encode, or None if the position or a position after one of its moves is not in the tables.
+        '''
+        if self.probe(game) is None:
+            return None
+        best_move, best_key = None, None
+        for move in game.generate_moves([]):
+            undo = game.make_move(move)
+            result = self.probe(game)
+            game.unmake_move(undo)
+            if result is None:
+                return None
+            outcome, plies = result
+            # the result of the other side after the move, so a loss for it is the best
+            key = (-outcome, outcome * plies)
+            if best_key is None or key > best_key:
+                best_move, best_key = move, key
+        return best_move
+
+    def close(self):
+        '''
+        close
+
+        Closes the table files.
+        '''
+        for table in self.tables.values():
+            table.close()
+        for file in self.files:
+            file.close()
+        self.tables = {}
+        self.files = []
@@ -0,0 +1,43 @@
+import os
+
+import pygame
+
+from classes.Const import *
+
+
+class Textures:
+    '''
+    Textures class
+    contains the images of the 12 pieces, loaded from disk once, converted to the format of the
+    screen and scaled to PIECE_SIZE, so drawing a piece is a single blit.
+    Pieces stay free of pygame, so the engine runs without a window, and the images are looked up by color and name.
+    '''
+
+    def __init__(self, directory=os.path.join('data', 'imgs'), size=PIECE_SIZE):
+        '''
+        __init__
+        Needs the display mode to be set, convert_alpha converts to its pixel format.
+
+        Args:
+            directory (str, optional): the folder with the {color}_{name}.png images. Defaults to 'data/imgs'.
+            size (int, optional): the width and height to scale the images to. Defaults to PIECE_SIZE.
+        '''
+        self.surfaces = {}
+        for color in ('white', 'black'):
+            for name in ('pawn', 'knight', 'bishop', 'rook', 'queen', 'king'):
+                image = pygame.image.load(os.path.join(directory, f'{color}_{name}.png')).convert_alpha()
+                if image.get_size() != (size, size):
+                    image = pygame.transform.smoothscale(image, (size, size))
+                self.surfaces[color, name] = image
+
+    def get(self, piece):
+        '''
+        get
+
+        Args:
+            piece (Piece): the piece to draw.
+
+        Returns:
+            Surface: the image of the piece.
+        '''
+        return self.surfaces[piece.color, piece.name]
@@ -0,0 +1,430 @@
+'''
+This file contains the headless self-play tournament: games between two AI settings are played
+on a pool of processes without pygame, and every finished game is streamed to JSONL and PGN
+while the Elo difference between the settings is kept up to date.
+'''
+import datetime
+import json
+import math
+import multiprocessing
+import random
+import time
+
+from classes.Game import Game
+from classes.AI import AI, BACKENDS
+from classes.OpeningBook import OpeningBook
+from classes.Tablebase import Tablebase
+
+# Ply limit after which a game is adjudicated a draw
+MAX_PLIES = 300
+# Random plies played from the initial position when no openings are given
+RANDOM_PLIES = 8
+# Half moves without a capture or pawn move after which a game is drawn
+FIFTY_MOVES = 100
+# Depth of a smart player that sets neither a depth nor a time
+DEFAULT_DEPTH = 2
+# z-score of the 95% error bars
+Z_95 = 1.96
+
+# Settings of a player, the types they are read as
+PLAYER_OPTIONS = {'depth': int, 'time': float, 'backend': str, 'hash': int, 'evasions': int, 'book': str,
+                  'tablebase': str, 'pvs': int, 'aspiration': int, 'nullmove': int, 'lmr': int}
+
+
+def parse_player(text):
+    '''
+    parse_player
+
+    Args:
+        text (str): the settings of a player, 'random' or 'smart' followed by options,
+            like 'smart:depth=3', 'smart:time=0.5,backend=bitboard,hash=32' or 'smart:depth=4,nullmove=0,lmr=0'.
+
+    Returns:
+        dict: the name, type and options of the player.
+    '''
+    kind, _, options = text.partition(':')
+    if kind not in ('random', 'smart'):
+        raise ValueError(f'unknown player type {kind!r}, use random or smart')
+    player = {'name': text, 'type': kind}
+    for option in filter(None, options.split(',')):
+        name, _, value = option.partition('=')
+        if name not in PLAYER_OPTIONS or not value:
+            raise ValueError(f'invalid player option {option!r}, use {", ".join(PLAYER_OPTIONS)}')
+        player[name] = PLAYER_OPTIONS[name](value)
+    if player.get('backend', 'game') not in ('game',) + tuple(BACKENDS):
+        raise ValueError(f"unknown backend {player['backend']!r}, use game or {', '.join(BACKENDS)}")
+    return player
+
+
+def parse_opening(line):
+    '''
+    parse_opening
+
+    Args:
+        line (str): a FEN, or the moves from the initial position in long algebraic notation like 'e2e4 e7e5'.
+
+    Returns:
+        dict: the fen to start from, None for the initial position, and the moves to play from it.
+    '''
+    if '/' in line:
+        return {'fen': line.strip(), 'moves': []}
+    return {'fen': None, 'moves': line.split()}
+
+
+def load_openings(path):
+    '''
+    load_openings
+
+    Args:
+        path (str): a text file with one opening per line, see parse_opening. Empty lines and lines starting with # are skipped.
+
+    Returns:
+        list: the openings.
+    '''
+    with open(path) as file:
+        return [parse_opening(line) for line in file if line.strip() and not line.startswith('#')]
+
+
+def elo_difference(wins, losses, draws):
+    '''
+    elo_difference
+
+    Args:
+        wins (int): the games the first player won.
+        losses (int): the games the first player lost.
+        draws (int): the drawn games.
+
+    Returns:
+        tuple: the Elo difference of the first player over the second and the margin of its 95% error bars,
+        inf or -inf when the score is all wins or all losses.
+    '''
+    games = wins + losses + draws
+    if games == 0:
+        return 0.0, float('inf')
+    score = (wins + draws / 2) / games
+    # standard deviation of the mean score, from the spread of the game results around it
+    variance = (wins * (1 - score) ** 2 + losses * score ** 2 + draws * (0.5 - score) ** 2) / games
+    margin = Z_95 * math.sqrt(variance / games)
+    spread = _elo(min(score + margin, 1)) - _elo(max(score - margin, 0))
+    return _elo(score), spread / 2 if math.isfinite(spread) else float('inf')
+
+
+def _elo(score):
+    if score <= 0:
+        return float('-inf')
+    if score >= 1:
+        return float('inf')
+    return -400 * math.log10(1 / score - 1)
+
+
+def _draw_by_material(game):
+    # kings alone, or with one knight or bishop, cannot mate
+    pieces = [square.piece.name for square in game.cells if square.piece is not None and square.piece.name != 'king']
+    return not pieces or (len(pieces) == 1 and pieces[0] in ('knight', 'bishop'))
+
+
+def _setup(task, rng):
+    # the start position and the opening moves of a game, random openings come from the seed of the pair
+    opening = task['opening']
+    if opening is not None:
+        game = Game(opening['fen'])
+        played = []
+        for text in opening['moves']:
+            found = game.find_move(text)
+            if found is None:
+                raise ValueError(f'illegal opening move {text} in {opening}')
+            played.append((game.san(found[1].key()), text))
+            game.move(*found)
+        return opening['fen'], game, played
+
+    while True:
+        game = Game()
+        played = []
+        for _ in range(task['random_plies']):
+            moves = game.generate_moves([])
+            if not moves:
+                break
+            move = rng.choice(moves)
+            played.append((game.san(move), game.key_move(move)[1].uci()))
+            game.make_move(move)
+        # openings that already ended are drawn again
+        if game.generate_moves([]):
+            return None, game, played
+
+
+def play_game(task):
+    '''
+    play_game
+    Plays one game of the tournament, runs in a worker process.
+
+    Args:
+        task (dict): the round, the white and black players (see parse_player), whether the first player is white,
+            the opening (see parse_opening, or None for random_plies random plies), the seed of the opening and the ply limit.
+
+    Returns:
+        dict: the round, players, whether the first player was white, the result, the reason the game ended, the start fen, the moves
+        in long algebraic and standard algebraic notation, the number of opening plies and the seconds it took.
+    '''
+    start = time.perf_counter()
+    start_fen, game, played = _setup(task, random.Random(task['seed']))
+    # the random players draw from the seed of the game, so a tournament can be played again
+    rng = random.Random(f"{task['seed']}:{task['round']}")
+
+    players = {}
+    for color in ('white', 'black'):
+        player = task[color]
+        ai = None
+        if player['type'] == 'smart':
+            book = OpeningBook(player['book']) if 'book' in player else None
+            tablebase = Tablebase(player['tablebase']) if 'tablebase' in player else None
+            ai = AI(game, color, player.get('hash', 16), bool(player.get('evasions', 1)),
+                    book=book, tablebase=tablebase, pvs=bool(player.get('pvs', 1)),
+                    aspiration=bool(player.get('aspiration', 1)), null_move=bool(player.get('nullmove', 1)),
+                    lmr=bool(player.get('lmr', 1)), backend=player.get('backend', 'game'))
+        players[color] = (player, ai)
+
+    seen = {game.hash: 1}
+    quiet = 0
+    moves = []
+    result = reason = None
+    while result is None:
+        if not game.generate_moves(moves):
+            if game.king_attacked(game.turn):
+                result, reason = ('0-1' if game.turn == 'white' else '1-0'), 'checkmate'
+            else:
+                result, reason = '1/2-1/2', 'stalemate'
+            break
+
+        player, ai = players[game.turn]
+        if player['type'] == 'random':
+            piece, move = game.key_move(rng.choice(moves))
+        else:
+            depth = player.get('depth')
+            time_limit = player.get('time')
+            if depth is None and time_limit is None:
+                depth = DEFAULT_DEPTH
+            piece, move = ai.find_best_move(depth=depth, time_limit=time_limit)
+
+        # a capture or pawn move starts the count of the fifty move rule again
+        quiet = 0 if move.final.piece is not None or piece.name == 'pawn' else quiet + 1
+        played.append((game.san(game.move_code(move)), move.uci()))
+        game.move(piece, move)
+
+        seen[game.hash] = seen.get(game.hash, 0) + 1
+        if seen[game.hash] >= 3:
+            result, reason = '1/2-1/2', 'threefold repetition'
+        elif quiet >= FIFTY_MOVES:
+            result, reason = '1/2-1/2', 'fifty move rule'
+        elif _draw_by_material(game):
+            result, reason = '1/2-1/2', 'insufficient material'
+        elif len(played) >= task['max_plies']:
+            result, reason = '1/2-1/2', 'ply limit'
+
+    for player, ai in players.values():
+        if ai is not None:
+            ai.close()
+            if ai.book is not None:
+                ai.book.close()
+            if ai.tablebase is not None:
+                ai.tablebase.close()
+    return {
+        'round': task['round'],
+        'white': task['white']['name'],
+        'black': task['black']['name'],
+        'first_white': task['first_white'],
+        'result': result,
+        'reason': reason,
+        'fen': start_fen,
+        'moves': [text for san, text in played],
+        'san': [san for san, text in played],
+        'opening_plies': task['opening_plies'],
+        'seconds': round(time.perf_counter() - start, 3),
+    }
+
+
+def pgn(record, date=None):
+    '''
+    pgn
+
+    Args:
+        record (dict): a game as play_game returns it.
+        date (str, optional): the date in PGN notation, like 2023.06.30. Defaults to today.
+
+    Returns:
+        str: the game in PGN, ending with an empty line.
+    '''
+    date = date or datetime.date.today().strftime('%Y.%m.%d')
+    tags = [('Event', 'IPASS2023-ChessAI tournament'), ('Site', '?'), ('Date', date), ('Round', str(record['round'])),
+            ('White', record['white']), ('Black', record['black']), ('Result', record['result'])]
+    if record['fen'] is not None:
+        tags += [('SetUp', '1'), ('FEN', record['fen'])]
+    tags += [('PlyCount', str(len(record['san']))), ('Termination', record['reason'])]
+    lines = [f'[{name} "{value}"]' for name, value in tags]
+
+    # the moves, numbered from the side to move of the start position
+    black_first = record['fen'] is not None and record['fen'].split()[1:2] == ['b']
+    words = []
+    for ply, san in enumerate(record['san']):
+        number, black = divmod(ply + black_first, 2)
+        if not black:
+            words.append(f'{number + 1}.')
+        elif ply == 0:
+            words.append(f'{number + 1}...')
+        words.append(san)
+    words.append(record['result'])
+
+    # movetext lines stay under 80 characters
+    text, line = [], ''
+    for word in words:
+        if line and len(line) + 1 + len(word) > 79:
+            text.append(line)
+            line = word
+        else:
+            line = f'{line} {word}' if line else word
+    text.append(line)
+    return '\n'.join(lines) + '\n\n' + '\n'.join(text) + '\n\n'
+
+
+def make_tasks(first, second, games, openings=None, random_plies=RANDOM_PLIES, max_plies=MAX_PLIES, seed=None):
+    '''
+    make_tasks
+    Every opening is played twice, once with each player as white, so neither gets the better openings.
+
+    Args:
+        first (dict): the first player, see parse_player.
+        second (dict): the second player.
+        games (int): the number of games.
+        openings (list, optional): the openings to cycle through, see parse_opening. Defaults to random openings.
+        random_plies (int, optional): the length of the random openings. Defaults to RANDOM_PLIES.
+        max_plies (int, optional): the ply limit of a game. Defaults to MAX_PLIES.
+        seed (int, optional): the seed of the random openings and random players. Defaults to a random seed.
+
+    Returns:
+        list: the tasks for play_game.
+    '''
+    if seed is None:
+        seed = random.randrange(1 << 30)
+    tasks = []
+    for index in range(games):
+        pair = index // 2
+        opening = openings[pair % len(openings)] if openings else None
+        white, black = (first, second) if index % 2 == 0 else (second, first)
+        tasks.append({
+            'round': index + 1,
+            'white': white,
+            'black': black,
+            'first_white': index % 2 == 0,
+            'opening': opening,
+            'opening_plies': len(opening['moves']) if opening else random_plies,
+            'random_plies': random_plies,
+            'seed': seed + pair,
+            'max_plies': max_plies,
+        })
+    return tasks
+
+
+class Tournament:
+    '''
+    Tournament class
+    contains the score of a match between two players, kept up to date as the games of run come in.
+    '''
+
+    def __init__(self, first, second):
+        '''
+        __init__
+
+        Args:
+            first (dict): the first player, see parse_player. The score and Elo are from its side.
+            second (dict): the second player.
+        '''
+        self.first = first
+        self.second = second
+        self.wins = 0
+        self.losses = 0
+        self.draws = 0
+        self.reasons = {}
+        self.start = None
+        self.seconds = 0.0
+
+    def add(self, record):
+        '''
+        add
+
+        Args:
+            record (dict): a finished game, see play_game.
+        '''
+        if record['result'] == '1/2-1/2':
+            self.draws += 1
+        elif (record['result'] == '1-0') == record['first_white']:
+            self.wins += 1
+        else:
+            self.losses += 1
+        self.reasons[record['reason']] = self.reasons.get(record['reason'], 0) + 1
+        if self.start is not None:
+            self.seconds = time.perf_counter() - self.start
+
+    def summary(self):
+        '''
+        summary
+
+        Returns:
+            dict: the players, the games, wins, losses and draws of the first player, its score,
+            the Elo difference with the margin of its 95% error bars, the reasons games ended and the games per hour.
+            JSON has no infinity, so an Elo or margin without bounds is the string '+inf' or '-inf'.
+        '''
+        games = self.wins + self.losses + self.draws
+        elo, margin = (value if math.isfinite(value) else f'{value:+}'
+                       for value in elo_difference(self.wins, self.losses, self.draws))
+        return {
+            'first': self.first['name'],
+            'second': self.second['name'],
+            'games': games,
+            'wins': self.wins,
+            'losses': self.losses,
+            'draws': self.draws,
+            'score': (self.wins + self.draws / 2) / games if games else 0.0,
+            'elo': elo,
+            'elo_margin': margin,
+            'reasons': self.reasons,
+            'seconds': round(self.seconds, 3),
+            'games_per_hour': games * 3600 / self.seconds if self.seconds > 0 else 0.0,
+        }
+
+    def run(self, tasks, workers=None, jsonl=None, pgn_file=None, callback=None):
+        '''
+        run
+        Plays the tasks on a process pool and streams every game as soon as it is finished.
+
+        Args:
+            tasks (list): the games to play, see make_tasks.
+            workers (int, optional): the number of processes, 1 plays in this process. Defaults to the number of cores.
+            jsonl (file, optional): where to write one JSON line per game. Defaults to None.
+            pgn_file (file, optional): where to write the games in PGN. Defaults to None.
+            callback (function, optional): called with every game record and the tournament after it is added. Defaults to None.
+
+        Returns:
+            dict: the summary of the tournament.
+        '''
+        workers = workers or multiprocessing.cpu_count()
+        self.start = time.perf_counter()
+        if workers == 1:
+            self._collect(map(play_game, tasks), jsonl, pgn_file, callback)
+        else:
+            # spawn works the same on every platform, like the parallel search
+            context = multiprocessing.get_context('spawn')
+            with context.Pool(workers) as pool:
+                self._collect(pool.imap_unordered(play_game, tasks), jsonl, pgn_file, callback)
+        self.seconds = time.perf_counter() - self.start
+        return self.summary()
+
+    def _collect(self, records, jsonl, pgn_file, callback):
+        for record in records:
+            self.add(record)
+            if jsonl is not None:
+                jsonl.write(json.dumps(record, allow_nan=False) + '\n')
+                jsonl.flush()
+            if pgn_file is not None:
+                pgn_file.write(pgn(record))
+                pgn_file.flush()
+            if callback is not None:
+                callback(record, self)
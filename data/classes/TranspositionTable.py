@@ -0,0 +1,87 @@
+'''
+This file contains the transposition table the AI uses to remember searched positions.
+'''
+
+# Bound types of a stored score
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+
+class TranspositionTable:
+    '''
+    TranspositionTable class
+    contains a fixed number of buckets indexed by the Zobrist hash of a position.
+    Every bucket has a depth-preferred slot, which keeps the deepest search of the current
+    search, and an always-replace slot, which takes every entry the first slot turns down.
+    '''
+    # rough number of bytes one entry takes: the slot, the entry tuple and its hash int
+    ENTRY_SIZE = 160
+
+    def __init__(self, size_mb=16):
+        '''
+        __init__
+
+        Args:
+            size_mb (int, optional): the size of the table in megabytes. Defaults to 16.
+        '''
+        self.buckets = max(1, int(size_mb * 1024 * 1024) // (2 * self.ENTRY_SIZE))
+        self.slots = [None] * (2 * self.buckets)
+        self.age = 0
+
+    def new_search(self):
+        '''
+        new_search
+
+        Marks the entries stored so far as old, so the depth-preferred slots make room for the next search.
+        '''
+        self.age += 1
+
+    def clear(self):
+        '''
+        clear
+
+        Removes all entries from the table.
+        '''
+        self.slots = [None] * (2 * self.buckets)
+
+    def probe(self, key):
+        '''
+        probe
+
+        Args:
+            key (int): the Zobrist hash of the position.
+
+        Returns:
+            tuple: the (key, depth, score, bound, move, age) entry of the position, or None.
+        '''
+        index = (key % self.buckets) * 2
+        entry = self.slots[index]
+        if entry is not None and entry[0] == key:
+            return entry
+        entry = self.slots[index + 1]
+        if entry is not None and entry[0] == key:
+            return entry
+        return None
+
+    def store(self, key, depth, score, bound, move):
+        '''
+        store
+
+        Args:
+            key (int): the Zobrist hash of the position.
+            depth (int): the depth the position was searched to.
+            score (float): the score of the position.
+            bound (int): EXACT, LOWER or UPPER.
+            move (int): the best move found, see Move.encode, or None.
+        '''
+        index = (key % self.buckets) * 2
+        entry = (key, depth, score, bound, move, self.age)
+        old = self.slots[index]
+        if old is None or old[0] == key or old[5] != self.age or depth >= old[1]:
+            # the entry pushed out of the depth-preferred slot still gets the always-replace slot
+            if old is not None and old[0] != key:
+                self.slots[index + 1] = old
+            self.slots[index] = entry
+        else:
+            self.slots[index + 1] = entry
@@ -0,0 +1,372 @@
+'''
+This file contains the Texel tuning of the evaluation: the material and piece-square scores of Evaluation
+are fitted to the results of the games a large set of positions came from. The features of every position
+are put in a NumPy matrix once, after which the whole set is evaluated with one matrix product per
+iteration. Tuning is the only part of the game that needs NumPy: pip install numpy.
+'''
+import json
+import math
+import random
+import re
+
+from classes.Const import ROWS, COLS
+from classes.Evaluation import MG_VALUES, EG_VALUES, MG_TABLES, EG_TABLES, PHASE_WEIGHTS, TOTAL_PHASE
+from classes.Game import Game, FEN_NAMES
+from classes.PGN import read_games
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Pieces in the order of the features, every piece has one feature per square
+PIECES = ('pawn', 'knight', 'bishop', 'rook', 'queen', 'king')
+FEATURES = len(PIECES) * ROWS * COLS
+# Scores of the results, from the side of white
+RESULTS = {'1-0': 1.0, '0-1': 0.0, '1/2-1/2': 0.5}
+# Rows of the feature matrix multiplied at a time, so the matrix can be stored as int8
+CHUNK = 65536
+# Plies of every game left out when positions are taken from games, the opening is mostly book moves
+SKIP_PLIES = 8
+
+_RESULT = re.compile(r'1/2-1/2|1-0|0-1|\[\s*([01](?:\.\d+)?|\.5)\s*\]')
+
+
+def require_numpy():
+    '''
+    require_numpy
+
+    Raises:
+        ImportError: If NumPy is not installed.
+    '''
+    if np is None:
+        raise ImportError("tuning the evaluation needs NumPy, install it with 'pip install numpy'")
+
+
+def read_positions(lines):
+    '''
+    read_positions
+    Reads labelled positions: a FEN followed by the result of its game, like the EPD files of tuning sets.
+    The result is written as 1-0, 0-1 or 1/2-1/2, or as a score of white in brackets like [0.5].
+
+    Args:
+        lines (iterable): the lines of the file.
+
+    Yields:
+        tuple: the FEN and the score of white.
+    '''
+    for line in lines:
+        fields = line.split()
+        if len(fields) < 2:
+            continue
+        fen = ' '.join(fields[:2])
+        match = _RESULT.search(line, len(fen))
+        if match is None:
+            continue
+        yield fen, RESULTS[match.group()] if match.group(1) is None else float(match.group(1))
+
+
+def positions_from_games(games, skip_plies=SKIP_PLIES):
+    '''
+    positions_from_games
+
+    Args:
+        games (iterable): games as PGN.read_games gives them, games without a result are left out.
+        skip_plies (int, optional): the plies at the start of every game to leave out. Defaults to SKIP_PLIES.
+
+    Yields:
+        tuple: the FEN of every position of the games and the score of white in its game.
+    '''
+    for record in games:
+        if record['result'] not in RESULTS:
+            continue
+        result = RESULTS[record['result']]
+        try:
+            game = Game(record['tags'].get('FEN'))
+        except ValueError:
+            continue
+        for ply, san in enumerate(record['moves']):
+            try:
+                game.make_move(game.parse_san(san))
+            except ValueError:
+                break
+            if ply + 1 >= skip_plies:
+                yield game.fen(), result
+
+
+def load_positions(paths, skip_plies=SKIP_PLIES):
+    '''
+    load_positions
+
+    Args:
+        paths (list): files of labelled positions, see read_positions, or games in PGN when they end in .pgn.
+        skip_plies (int, optional): see positions_from_games. Defaults to SKIP_PLIES.
+
+    Returns:
+        list: the (FEN, score of white) tuples of all files.
+    '''
+    positions = []
+    for path in paths:
+        with open(path, encoding='utf-8', errors='replace') as file:
+            if path.lower().endswith('.pgn'):
+                positions.extend(positions_from_games(read_games(file), skip_plies))
+            else:
+                positions.extend(read_positions(file))
+    return positions
+
+
+def extract(positions):
+    '''
+    extract
+    Turns the positions into features. A white piece counts 1 on its square, a black piece -1 on the
+    square seen from black, so the evaluation is the product of the features with the scores of white.
+
+    Args:
+        positions (list): (FEN, score of white) tuples.
+
+    Returns:
+        tuple: the features as an int8 matrix with a row per position, the share of middlegame of every
+        position (its phase divided by TOTAL_PHASE) and the scores of white.
+    '''
+    require_numpy()
+    features = np.zeros((len(positions), FEATURES), dtype=np.int8)
+    phases = np.zeros(len(positions), dtype=np.float32)
+    results = np.zeros(len(positions), dtype=np.float32)
+    offsets = {name: i * ROWS * COLS for i, name in enumerate(PIECES)}
+    for index, (fen, result) in enumerate(positions):
+        row = features[index]
+        phase = 0
+        for rank, text in enumerate(fen.split()[0].split('/')):
+            col = 0
+            for letter in text:
+                if letter.isdigit():
+                    col += int(letter)
+                    continue
+                name = FEN_NAMES[letter.lower()]
+                if letter.isupper():
+                    row[offsets[name] + rank * COLS + col] += 1
+                else:
+                    row[offsets[name] + (ROWS - 1 - rank) * COLS + col] -= 1
+                phase += PHASE_WEIGHTS[name]
+                col += 1
+        phases[index] = min(phase, TOTAL_PHASE) / TOTAL_PHASE
+        results[index] = result
+    return features, phases, results
+
+
+def initial_weights():
+    '''
+    initial_weights
+
+    Returns:
+        ndarray: the scores of the white pieces on every square of Evaluation, material included,
+        the middlegame scores first and then the endgame scores.
+    '''
+    require_numpy()
+    return np.array([values[name] + tables[name][sq]
+                     for values, tables in ((MG_VALUES, MG_TABLES), (EG_VALUES, EG_TABLES))
+                     for name in PIECES for sq in range(ROWS * COLS)], dtype=np.float64)
+
+
+def _product(features, vector):
+    # features @ vector, converted to floats a chunk of rows at a time
+    out = np.empty(len(features), dtype=np.float64)
+    for start in range(0, len(features), CHUNK):
+        out[start:start + CHUNK] = features[start:start + CHUNK].astype(np.float32) @ vector
+    return out
+
+
+def _transposed_product(features, vector):
+    # features.T @ vector, a chunk of rows at a time
+    out = np.zeros(features.shape[1], dtype=np.float64)
+    for start in range(0, len(features), CHUNK):
+        out += vector[start:start + CHUNK].astype(np.float32) @ features[start:start + CHUNK].astype(np.float32)
+    return out
+
+
+def evaluate(features, phases, weights):
+    '''
+    evaluate
+
+    Args:
+        features (ndarray): the features, see extract.
+        phases (ndarray): the share of middlegame of every position, see extract.
+        weights (ndarray): the scores, see initial_weights.
+
+    Returns:
+        ndarray: the evaluation of every position in centipawns, from the side of white.
+    '''
+    mg = _product(features, weights[:FEATURES].astype(np.float32))
+    eg = _product(features, weights[FEATURES:].astype(np.float32))
+    return mg * phases + eg * (1 - phases)
+
+
+def _sigmoid(scores, k):
+    # expected score of white at an evaluation, the logistic curve of Elo with the evaluation scaled by k
+    return 1 / (1 + np.power(10.0, -k * scores / 400))
+
+
+def error(scores, results, k):
+    '''
+    error
+
+    Args:
+        scores (ndarray): the evaluation of every position, see evaluate.
+        results (ndarray): the scores of white.
+        k (float): the scaling of the evaluation.
+
+    Returns:
+        float: the mean squared difference of the results and the results the evaluations predict.
+    '''
+    return float(np.mean((results - _sigmoid(scores, k)) ** 2))
+
+
+def fit_k(scores, results, low=0.01, high=3.0):
+    '''
+    fit_k
+    Finds the scaling of the evaluation that predicts the results best, by golden section search.
+
+    Args:
+        scores (ndarray): the evaluation of every position, see evaluate.
+        results (ndarray): the scores of white.
+        low (float, optional): the smallest scaling to try. Defaults to 0.01.
+        high (float, optional): the largest scaling to try. Defaults to 3.0.
+
+    Returns:
+        float: the scaling.
+    '''
+    ratio = (math.sqrt(5) - 1) / 2
+    a, b = high - ratio * (high - low), low + ratio * (high - low)
+    error_a, error_b = error(scores, results, a), error(scores, results, b)
+    while high - low > 1e-4:
+        if error_a < error_b:
+            high, b, error_b = b, a, error_a
+            a = high - ratio * (high - low)
+            error_a = error(scores, results, a)
+        else:
+            low, a, error_a = a, b, error_b
+            b = low + ratio * (high - low)
+            error_b = error(scores, results, b)
+    return (low + high) / 2
+
+
+def tune(features, phases, results, weights, k, iterations=500, rate=2.0, callback=None):
+    '''
+    tune
+    Lowers the error of the weights by gradient descent, with the step of every weight scaled by the
+    history of its gradient (Adam), so rare pieces and squares learn as fast as common ones.
+
+    Args:
+        features (ndarray): the features, see extract.
+        phases (ndarray): the share of middlegame of every position, see extract.
+        results (ndarray): the scores of white.
+        weights (ndarray): the scores to start from, see initial_weights.
+        k (float): the scaling of the evaluation, see fit_k.
+        iterations (int, optional): the steps to take. Defaults to 500.
+        rate (float, optional): the largest step of a weight in centipawns. Defaults to 2.0.
+        callback (function, optional): called with the iteration and the error before every step. Defaults to None.
+
+    Returns:
+        ndarray: the tuned weights.
+    '''
+    weights = weights.astype(np.float64).copy()
+    mean = np.zeros_like(weights)
+    variance = np.zeros_like(weights)
+    beta1, beta2 = 0.9, 0.999
+    for iteration in range(1, iterations + 1):
+        predicted = _sigmoid(evaluate(features, phases, weights), k)
+        if callback is not None:
+            callback(iteration, float(np.mean((results - predicted) ** 2)))
+        # derivative of the mean squared error by the evaluation of every position
+        slope = -2 * (results - predicted) * predicted * (1 - predicted) * k * math.log(10) / 400 / len(results)
+        gradient = np.concatenate((_transposed_product(features, slope * phases),
+                                   _transposed_product(features, slope * (1 - phases))))
+        mean = beta1 * mean + (1 - beta1) * gradient
+        variance = beta2 * variance + (1 - beta2) * gradient ** 2
+        step = mean / (1 - beta1 ** iteration) / (np.sqrt(variance / (1 - beta2 ** iteration)) + 1e-12)
+        weights -= rate * step
+    return weights
+
+
+def split_weights(weights):
+    '''
+    split_weights
+    Splits the scores into material values and piece-square tables like those of Evaluation.
+    The value of a piece is its mean score over the squares it can stand on, kings are worth 0.
+
+    Args:
+        weights (ndarray): the scores, see initial_weights.
+
+    Returns:
+        dict: the rounded mg_values, eg_values, mg_tables and eg_tables.
+    '''
+    split = {}
+    for phase, part in (('mg', weights[:FEATURES]), ('eg', weights[FEATURES:])):
+        values, tables = {}, {}
+        for i, name in enumerate(PIECES):
+            scores = part[i * ROWS * COLS:(i + 1) * ROWS * COLS]
+            # pawns never stand on the first and last row
+            squares = range(COLS, (ROWS - 1) * COLS) if name == 'pawn' else range(ROWS * COLS)
+            value = 0 if name == 'king' else int(round(sum(scores[sq] for sq in squares) / len(squares)))
+            values[name] = value
+            tables[name] = [int(round(scores[sq])) - value if sq in squares else 0 for sq in range(ROWS * COLS)]
+        split[f'{phase}_values'] = values
+        split[f'{phase}_tables'] = tables
+    return split
+
+
+def write_weights(path, weights):
+    '''
+    write_weights
+
+    Args:
+        path (str): the JSON file to write the values and tables to, see split_weights.
+        weights (ndarray): the scores, see initial_weights.
+    '''
+    with open(path, 'w') as file:
+        json.dump(split_weights(weights), file, indent=2)
+
+
+def python_source(weights):
+    '''
+    python_source
+
+    Args:
+        weights (ndarray): the scores, see initial_weights.
+
+    Returns:
+        str: the values and tables written like in Evaluation.py, to paste over them.
+    '''
+    split = split_weights(weights)
+    lines = []
+    for phase in ('MG', 'EG'):
+        values = split[f'{phase.lower()}_values']
+        lines.append(f'{phase}_VALUES = {{' + ', '.join(f"'{name}': {values[name]}" for name in PIECES) + '}')
+    for phase in ('MG', 'EG'):
+        tables = split[f'{phase.lower()}_tables']
+        lines += ['', f'{phase}_TABLES = {{']
+        for name in PIECES:
+            lines.append(f"    '{name}': (")
+            for row in range(ROWS):
+                lines.append('        ' + ' '.join(f'{score:>4},' for score in tables[name][row * COLS:(row + 1) * COLS]))
+            lines.append('    ),')
+        lines.append('}')
+    return '\n'.join(lines)
+
+
+def split_validation(positions, share, seed=None):
+    '''
+    split_validation
+
+    Args:
+        positions (list): the positions.
+        share (float): the share of the positions to hold back.
+        seed (int, optional): the seed of the shuffle. Defaults to random.
+
+    Returns:
+        tuple: the positions to tune on and the positions held back to check the tuned weights on.
+    '''
+    positions = list(positions)
+    random.Random(seed).shuffle(positions)
+    held = int(len(positions) * share)
+    return positions[held:], positions[:held]
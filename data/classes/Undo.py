@@ -0,0 +1,39 @@
+class Undo:
+    '''
+    Undo class
+    contains everything Game.unmake_move needs to restore the position from before a move.
+    '''
+    __slots__ = ('move', 'piece', 'captured', 'captured_row', 'captured_col', 'moved',
+                 'promoted', 'rook', 'rook_from', 'rook_to', 'rook_moved',
+                 'en_passant', 'last_move', 'castle_rights', 'hash', 'scores')
+
+    def __init__(self, move, piece, captured, captured_row, captured_col, moved, en_passant, last_move):
+        '''
+        __init__
+
+        Args:
+            move (int): the move that was made, see encode.
+            piece (Piece): the piece that was moved.
+            captured (Piece): the captured piece or None.
+            captured_row (int): the row the captured piece stood on (differs from the final square for en passant).
+            captured_col (int): the col the captured piece stood on.
+            moved (bool): the moved flag of the piece before the move.
+            en_passant (tuple): the en passant square of the game before the move.
+            last_move (int): the last move of the game before the move.
+        '''
+        self.move = move
+        self.piece = piece
+        self.captured = captured
+        self.captured_row = captured_row
+        self.captured_col = captured_col
+        self.moved = moved
+        self.promoted = None
+        self.rook = None
+        self.rook_from = None
+        self.rook_to = None
+        self.rook_moved = False
+        self.en_passant = en_passant
+        self.last_move = last_move
+        self.castle_rights = None
+        self.hash = None
+        self.scores = None
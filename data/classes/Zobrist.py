@@ -0,0 +1,76 @@
+'''
+This file contains the random keys for Zobrist hashing of Game positions.
+A position hashes to the XOR of the keys of its pieces, the side to move,
+the castling rights and the en passant file.
+'''
+import random
+
+from classes.Const import ROWS, COLS
+
+# fixed seed so hashes stay the same between runs
+_random = random.Random(2023)
+
+PIECE_KEYS = {
+    (color, name): tuple(_random.getrandbits(64) for _ in range(ROWS * COLS))
+    for color in ('white', 'black')
+    for name in ('pawn', 'knight', 'bishop', 'rook', 'queen', 'king')
+}
+SIDE_KEY = _random.getrandbits(64)
+CASTLING_KEYS = {right: _random.getrandbits(64) for right in 'KQkq'}
+EP_KEYS = tuple(_random.getrandbits(64) for _ in range(COLS))
+
+
+def piece_key(piece, row, col):
+    '''
+    piece_key
+
+    Args:
+        piece (Piece): the piece.
+        row (int): the row the piece stands on.
+        col (int): the col the piece stands on.
+
+    Returns:
+        int: the key of the piece on the square.
+    '''
+    return PIECE_KEYS[piece.color, piece.name][row * COLS + col]
+
+
+def castling_key(rights):
+    '''
+    castling_key
+
+    Args:
+        rights (str): castling rights in FEN notation, like 'KQkq'.
+
+    Returns:
+        int: the key of the castling rights.
+    '''
+    key = 0
+    for right in rights:
+        key ^= CASTLING_KEYS[right]
+    return key
+
+
+def hash_game(game):
+    '''
+    hash_game
+    Computes the hash of a game from scratch. Game.make_move keeps it up to date incrementally.
+
+    Args:
+        game (Game): the game to hash.
+
+    Returns:
+        int: the 64 bit Zobrist hash of the position.
+    '''
+    key = 0
+    for row in range(ROWS):
+        for col in range(COLS):
+            piece = game.squares[row][col].piece
+            if piece is not None:
+                key ^= piece_key(piece, row, col)
+    if game.turn == 'black':
+        key ^= SIDE_KEY
+    key ^= castling_key(game.castling_rights())
+    if game.en_passant is not None:
+        key ^= EP_KEYS[game.en_passant[1]]
+    return key
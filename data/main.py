@@ -1,11 +1,13 @@
+import argparse
 import pygame
 import sys
 
 from classes.Const import *
-from classes.Board import Board
+from classes.Board import Board, AI_MOVE
 from classes.Square import Square
 from classes.Move import Move
 from classes.AI import AI
+from classes.Profiler import PROFILE_ENV, enable_profiler
 
 
 class Main:
@@ -15,7 +17,14 @@ class Main:
      
 
     '''    
-    def __init__(self) -> None:
+    def __init__(self, fps=FPS) -> None:
+        '''
+        __init__
+
+        Args:
+            fps (int, optional): the most frames per second the window draws. Defaults to FPS.
+        '''        
+        self.fps = fps
         pygame.init()
         self.screen = pygame.display.set_mode( (WIDTH, HEIGHT) )
         pygame.display.set_caption('Chess')
@@ -24,7 +33,9 @@ class Main:
         
     def mainloop(self):
         '''
-        
+        mainloop
+        Sleeps until an event arrives and draws at most fps frames per second.
+        While the AI thinks it wakes up every frame, to pick up its move and animate the indicator.
         '''    
           
         screen = self.screen
@@ -32,28 +43,39 @@ class Main:
         game = self.board.game
         dragger = self.board.dragger
         game_mode = board.game_mode
+        clock = pygame.time.Clock()
 
         # to start the AI vs AI game
-        if game_mode == '3':
-            board.dumb_ai_vs_dumb_ai_turn()
-        
+        if game_mode == '3' or game_mode == '5':
+            board.schedule_ai_move()
 
         while True:
-            board.show_bg(screen)
-            board.show_moves(screen)
-            board.show_pieces(screen)
-
-            if dragger.dragging:
-                dragger.update_blit(screen)
-
-            if game_mode == '3':
-                board.dumb_ai_vs_dumb_ai_turn()
-            
-
-            for event in pygame.event.get():
-
-                # clicking on the pieces
-                if event.type == pygame.MOUSEBUTTONDOWN:
+            if board.worker.thinking():
+                first = pygame.event.wait(1000 // self.fps)
+            else:
+                first = pygame.event.wait()
+
+            # play the move of the AI once it has found one
+            board.update()
+
+            for event in [first] + pygame.event.get():
+
+                # the timer of the AI vs AI modes
+                if event.type == AI_MOVE:
+                    if game_mode == '3':
+                        board.dumb_ai_vs_dumb_ai_turn()
+                    elif game_mode == '5':
+                        board.ai_vs_ai_turn()
+
+                # space makes the AI move now, escape cancels its search
+                elif event.type == pygame.KEYDOWN:
+                    if event.key == pygame.K_SPACE:
+                        board.move_now()
+                    elif event.key == pygame.K_ESCAPE:
+                        board.cancel_thinking()
+
+                # clicking on the pieces, not while an AI thinks about the position
+                elif event.type == pygame.MOUSEBUTTONDOWN and not board.worker.thinking():
                     dragger.update_mouse(event.pos)
                     
                     clicked_row = dragger.MouseY // SQSIZE
@@ -68,20 +90,11 @@ class Main:
                             game.calc_moves(piece, clicked_row, clicked_col, bool=True) # noqa
                             dragger.save_initial(event.pos)
                             dragger.drag_piece(piece)
-                            # show methods
-                            board.show_bg(screen)
-                            board.show_moves(screen)
-                            board.show_pieces(screen)
 
                 # mousemotion of the pieces
                 elif event.type == pygame.MOUSEMOTION:
                     if dragger.dragging:
                         dragger.update_mouse(event.pos)
-                        # show methods
-                        board.show_bg(screen)
-                        board.show_moves(screen)
-                        board.show_pieces(screen)
-                        dragger.update_blit(screen)
                 
                 # click release of the pieces
                 elif event.type == pygame.MOUSEBUTTONUP:
@@ -95,18 +108,14 @@ class Main:
                         # create possible move
                         initial = Square(dragger.initial_row, dragger.initial_col)
                         final = Square(released_row, returned_col)
-                        move = Move(initial, final) 
-                        # check if move is valid
-                        if game.valid_move(dragger.piece, move):
+                        # pawns reaching the last row are promoted to a queen
+                        promotion = 'queen' if dragger.piece.name == 'pawn' and released_row in (0, 7) else None
+                        move = Move(initial, final, promotion) 
+                        # check if move is valid, an AI may have started thinking during the drag
+                        if not board.worker.thinking() and game.valid_move(dragger.piece, move):
                             # normal move
                             game.move(dragger.piece, move)
 
-                            game.set_true_en_passant(dragger.piece)
-                            # show methods
-                            board.show_bg(screen)
-                            board.show_moves(screen)
-                            board.show_pieces(screen)
-
                             # next turn
                             if game_mode == '1':
                                 board.player_vs_player_turn()
@@ -114,25 +123,33 @@ class Main:
                                 board.player_vs_dumb_ai_turn()
                             elif game_mode == '4':
                                 board.player_vs_smarter_ai_turn()
-                            elif game_mode == '5':
-                                board.ai_vs_ai_turn()
-                            
 
-                            # check for checkmate
-                            if game.in_check(dragger.piece, move, print_message=True):
-                                if game.checkmate(dragger.piece.color):
-                                    print(f'{dragger.piece.color} is in checkmate.')
-                                    pygame.quit()
-                                    sys.exit()
+
+                            # check for checkmate or stalemate of the next player
+                            board.check_game_over(board.next_player)
 
                     dragger.undrag_piece()
 
+                # the window was uncovered, draw it all again
+                elif event.type == pygame.WINDOWEXPOSED:
+                    board.invalidate()
+
                 # quit application
                 elif event.type == pygame.QUIT:
                     pygame.quit()
                     sys.exit()
-            pygame.display.update()
+
+            # draw and show only the squares that changed
+            pygame.display.update(board.render(screen))
+            clock.tick(self.fps)
 
 
-main = Main()
-main.mainloop()
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Play chess in a window, against a person or the AI.')
+    parser.add_argument('--profile', metavar='DIR',
+                        help=f'write a profile of every search of the AI to DIR, like setting {PROFILE_ENV}')
+    args = parser.parse_args()
+    if args.profile:
+        enable_profiler(args.profile)
+    main = Main()
+    main.mainloop()
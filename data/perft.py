@@ -0,0 +1,66 @@
+'''
+Perft command line: counts move tree leaves to check and time the move generators.
+
+    python data/perft.py                      # the standard positions up to depth 3
+    python data/perft.py --depth 4 --backend bitboard --json perft.json
+    python data/perft.py --fen "<fen>" --depth 3 --divide
+'''
+import argparse
+import json
+import sys
+
+from classes.Game import Game
+from classes.Perft import POSITIONS, BACKENDS, divide, run, run_suite
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Count the leaf nodes of the move tree to a fixed depth.')
+    parser.add_argument('--fen', help='position to count from, instead of the standard positions')
+    parser.add_argument('--position', action='append', choices=list(POSITIONS),
+                        help='standard position to run, can be given more than once (default: all)')
+    parser.add_argument('--depth', type=int, default=3, help='depth to count to (default: 3)')
+    parser.add_argument('--backend', choices=['game'] + list(BACKENDS), default='game',
+                        help='move generator to count with (default: game)')
+    parser.add_argument('--divide', action='store_true', help='print the node count below every root move')
+    parser.add_argument('--json', metavar='PATH', help="write a JSON summary to PATH, '-' for stdout")
+    args = parser.parse_args(argv)
+    backend = None if args.backend == 'game' else args.backend
+
+    if args.divide:
+        fen = args.fen or POSITIONS[(args.position or ['initial'])[0]][0]
+        counts = divide(Game(fen), args.depth, backend)
+        for name in sorted(counts):
+            print(f'{name}: {counts[name]}')
+        print(f'\nmoves: {len(counts)}  nodes: {sum(counts.values())}')
+        results = [{'fen': fen, 'depth': args.depth, 'backend': args.backend, 'nodes': sum(counts.values()),
+                    'divide': counts}]
+    elif args.fen:
+        results = [run(args.fen, args.depth, backend)]
+    else:
+        results = run_suite(args.depth, backend, args.position)
+
+    if not args.divide:
+        for result in results:
+            status = '' if result['expected'] is None else ('ok' if result['ok'] else f"FAIL (expected {result['expected']})")
+            print(f"{result['name'] or result['fen']:<16} depth {result['depth']}  {result['nodes']:>10} nodes  "
+                  f"{result['seconds']:>8.3f} s  {result['nps']:>8} nodes/s  {status}")
+
+    if args.json:
+        summary = {
+            'backend': args.backend,
+            'ok': all(result.get('ok', True) for result in results),
+            'nodes': sum(result['nodes'] for result in results),
+            'seconds': round(sum(result.get('seconds', 0) for result in results), 4),
+            'results': results,
+        }
+        if args.json == '-':
+            print(json.dumps(summary, indent=2))
+        else:
+            with open(args.json, 'w') as file:
+                json.dump(summary, file, indent=2)
+
+    return 0 if all(result.get('ok', True) for result in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,67 @@
+'''
+Tablebase command line: builds endgame tables and looks up positions in them.
+
+    python data/tablebase.py build                    # KQK and KRK into data/tablebases
+    python data/tablebase.py build KQKR KBNK -o data/tablebases
+    python data/tablebase.py probe --fen "8/8/8/4k3/8/8/8/KQ6 w - - 0 1"
+
+Endings of 3 pieces take seconds to build, endings of 4 pieces take minutes.
+The window plays from data/tablebases when it exists, UCI takes a directory with the TablebasePath option.
+'''
+import argparse
+import sys
+import time
+
+from classes.Const import TABLEBASE_DIR
+from classes.Game import Game
+from classes.Tablebase import Tablebase, build_tables, DEFAULT_ENDINGS
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build endgame tables or look up a position in them.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help='build the tables of endings without pawns')
+    build.add_argument('endings', nargs='*', default=list(DEFAULT_ENDINGS),
+                       help=f"endings like KQK or KRKN (default: {' '.join(DEFAULT_ENDINGS)})")
+    build.add_argument('-o', '--output', default=TABLEBASE_DIR, help=f'directory to write the tables to (default: {TABLEBASE_DIR})')
+    probe = commands.add_parser('probe', help='print the result of a position and its best move')
+    probe.add_argument('directory', nargs='?', default=TABLEBASE_DIR, help=f'directory of the tables (default: {TABLEBASE_DIR})')
+    probe.add_argument('--fen', required=True, help='position to look up')
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        start = time.perf_counter()
+
+        def report(name):
+            print(f'building {name} ({time.perf_counter() - start:.1f} s)', flush=True)
+
+        try:
+            built = build_tables(args.endings, args.output, report)
+        except (ValueError, OSError) as error:
+            parser.error(str(error))
+        print(f"{len(built)} tables built in {time.perf_counter() - start:.1f} s: {' '.join(built) or 'none'}")
+        return 0
+
+    try:
+        game = Game(args.fen)
+        tablebase = Tablebase(args.directory)
+    except (ValueError, OSError) as error:
+        parser.error(str(error))
+    result = tablebase.probe(game)
+    move = tablebase.choose(game)
+    tablebase.close()
+    if result is None:
+        print('position not in the tables')
+        return 0
+    outcome, plies = result
+    if outcome == 0:
+        print('draw')
+    else:
+        print(f"{game.turn} {'mates' if outcome > 0 else 'is mated'} in {plies} plies ({(plies + 1) // 2} moves)")
+    if move is not None:
+        print(f'best move: {game.san(move)}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
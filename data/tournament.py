@@ -0,0 +1,103 @@
+'''
+Tournament command line: plays AI settings against each other headless on a process pool.
+
+    python data/tournament.py --first smart:depth=3 --second random --games 100
+    python data/tournament.py --first smart:depth=3 --second smart:depth=2 --games 2000 --jsonl games.jsonl --pgn games.pgn
+    python data/tournament.py --first smart:time=0.2 --second smart:time=0.2,backend=bitboard --openings openings.txt
+    python data/tournament.py --first smart:time=0.2 --second smart:time=0.2,nullmove=0,lmr=0 --games 500
+
+A player is 'random' or 'smart' with options depth, time (seconds per move), backend (the move generator, see AI),
+hash (MB), evasions (0 or 1), book (an opening book file, see book.py), tablebase (a directory of endgame tables,
+see tablebase.py) and pvs, aspiration, nullmove and lmr (0 or 1, the parts of the selective search).
+An openings file has one opening per line: a FEN, or moves from the initial position like 'e2e4 e7e5'.
+'''
+import argparse
+import json
+import sys
+
+from classes.Profiler import PROFILE_ENV, enable_profiler
+from classes.Tournament import Tournament, parse_player, load_openings, make_tasks, MAX_PLIES, RANDOM_PLIES
+
+
+def elo_text(summary):
+    '''
+    elo_text
+
+    Args:
+        summary (dict): a summary of Tournament.
+
+    Returns:
+        str: the Elo difference with its 95% error bars, like '+35.2 +/- 20.1', or '+inf +/- +inf'.
+    '''
+    def number(value, spec):
+        return value if isinstance(value, str) else format(value, spec)
+
+    return f"{number(summary['elo'], '+.1f')} +/- {number(summary['elo_margin'], '.1f')}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Play AI settings against each other headless and measure the Elo difference.')
+    parser.add_argument('--first', required=True, help="the player the score is counted for, like 'smart:depth=3'")
+    parser.add_argument('--second', required=True, help="its opponent, like 'random' or 'smart:depth=2'")
+    parser.add_argument('--games', type=int, default=100, help='games to play, every opening is played with both colors (default: 100)')
+    parser.add_argument('--workers', type=int, help='processes to play on (default: the number of cores)')
+    parser.add_argument('--openings', metavar='PATH', help='file of openings to cycle through (default: random openings)')
+    parser.add_argument('--random-plies', type=int, default=RANDOM_PLIES,
+                        help=f'plies of the random openings (default: {RANDOM_PLIES})')
+    parser.add_argument('--max-plies', type=int, default=MAX_PLIES,
+                        help=f'plies after which a game is a draw (default: {MAX_PLIES})')
+    parser.add_argument('--seed', type=int, help='seed of the random openings and random players (default: random)')
+    parser.add_argument('--jsonl', metavar='PATH', help='append one JSON line per game to PATH')
+    parser.add_argument('--pgn', metavar='PATH', help='append the games in PGN to PATH')
+    parser.add_argument('--json', metavar='PATH', help="write a JSON summary to PATH, '-' for stdout")
+    parser.add_argument('--quiet', action='store_true', help='only print the summary')
+    parser.add_argument('--profile', metavar='DIR',
+                        help=f'write a profile of every search to DIR, like setting {PROFILE_ENV}')
+    args = parser.parse_args(argv)
+    if args.profile:
+        enable_profiler(args.profile)
+
+    try:
+        first, second = parse_player(args.first), parse_player(args.second)
+        openings = load_openings(args.openings) if args.openings else None
+    except (ValueError, OSError) as error:
+        parser.error(str(error))
+    if first['name'] == second['name']:
+        second['name'] += ' (2)'
+
+    tasks = make_tasks(first, second, args.games, openings, args.random_plies, args.max_plies, args.seed)
+    tournament = Tournament(first, second)
+
+    def report(record, tournament):
+        if args.quiet:
+            return
+        summary = tournament.summary()
+        print(f"{summary['games']:>5}/{args.games}  {record['white']} - {record['black']}  {record['result']:<7} "
+              f"{record['reason']:<21}  score {summary['wins'] + summary['draws'] / 2:g}/{summary['games']}  "
+              f"elo {elo_text(summary)}", flush=True)
+
+    jsonl = open(args.jsonl, 'a') if args.jsonl else None
+    pgn = open(args.pgn, 'a') if args.pgn else None
+    try:
+        summary = tournament.run(tasks, args.workers, jsonl, pgn, report)
+    finally:
+        for file in (jsonl, pgn):
+            if file is not None:
+                file.close()
+
+    print(f"\n{summary['first']} vs {summary['second']}: +{summary['wins']} -{summary['losses']} ={summary['draws']}  "
+          f"score {summary['score']:.3f}  elo {elo_text(summary)}")
+    print(', '.join(f'{reason}: {count}' for reason, count in sorted(summary['reasons'].items())))
+    print(f"{summary['games']} games in {summary['seconds']:.1f} s, {summary['games_per_hour']:.0f} games/hour")
+
+    if args.json:
+        if args.json == '-':
+            print(json.dumps(summary, indent=2, allow_nan=False))
+        else:
+            with open(args.json, 'w') as file:
+                json.dump(summary, file, indent=2, allow_nan=False)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
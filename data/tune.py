@@ -0,0 +1,74 @@
+'''
+Tuning command line: fits the material and piece-square scores of the evaluation to game results (Texel tuning).
+Needs NumPy.
+
+    python data/tune.py quiet-labeled.epd --iterations 1000 --output tuned.json
+    python data/tune.py games.pgn --skip-plies 10 --python > tables.py
+
+A positions file has one position per line: a FEN followed by the result of its game, as 1-0, 0-1 or 1/2-1/2,
+or as the score of white in brackets like [0.5]. The positions should be quiet, without captures to make.
+Files ending in .pgn are read as games and every position of a game is labelled with its result.
+'''
+import argparse
+import sys
+import time
+
+from classes.Tuning import (load_positions, extract, initial_weights, evaluate, error, fit_k, tune, write_weights,
+                            python_source, split_validation, require_numpy, SKIP_PLIES)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Fit the evaluation to the results of the games of a set of positions.')
+    parser.add_argument('positions', nargs='+', help='files of labelled positions, or games in PGN')
+    parser.add_argument('--skip-plies', type=int, default=SKIP_PLIES,
+                        help=f'plies at the start of every PGN game to leave out (default: {SKIP_PLIES})')
+    parser.add_argument('--iterations', type=int, default=500, help='steps of gradient descent (default: 500)')
+    parser.add_argument('--rate', type=float, default=2.0, help='largest step of a score in centipawns (default: 2.0)')
+    parser.add_argument('--k', type=float, help='scaling of the evaluation (default: fitted to the positions)')
+    parser.add_argument('--validation', type=float, default=0.1,
+                        help='share of the positions held back to check the tuned scores on (default: 0.1)')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the split into tuning and validation positions (default: 0)')
+    parser.add_argument('--output', metavar='PATH', help='write the tuned values and tables to PATH as JSON')
+    parser.add_argument('--python', action='store_true', help='print the tuned values and tables written like in Evaluation.py')
+    args = parser.parse_args(argv)
+
+    try:
+        require_numpy()
+        positions = load_positions(args.positions, args.skip_plies)
+    except (ImportError, OSError) as error_message:
+        parser.error(str(error_message))
+    if not positions:
+        parser.error('no labelled positions found')
+    # the progress goes to stderr, so --python can be sent to a file
+    log = sys.stderr
+
+    start = time.perf_counter()
+    tuning, validation = split_validation(positions, args.validation, args.seed)
+    features, phases, results = extract(tuning)
+    print(f'{len(tuning)} positions to tune on, {len(validation)} held back, features in {time.perf_counter() - start:.1f} s',
+          file=log)
+
+    weights = initial_weights()
+    k = args.k if args.k is not None else fit_k(evaluate(features, phases, weights), results)
+    print(f'k {k:.4f}  error {error(evaluate(features, phases, weights), results, k):.6f}', file=log)
+
+    def report(iteration, current):
+        if iteration == 1 or iteration % 50 == 0:
+            print(f'iteration {iteration:>5}  error {current:.6f}  {time.perf_counter() - start:.1f} s', file=log, flush=True)
+
+    tuned = tune(features, phases, results, weights, k, args.iterations, args.rate, report)
+    print(f'tuned error {error(evaluate(features, phases, tuned), results, k):.6f}', file=log)
+    if validation:
+        held_features, held_phases, held_results = extract(validation)
+        print(f'validation error {error(evaluate(held_features, held_phases, weights), held_results, k):.6f} before, '
+              f'{error(evaluate(held_features, held_phases, tuned), held_results, k):.6f} after', file=log)
+
+    if args.output:
+        write_weights(args.output, tuned)
+    if args.python:
+        print(python_source(tuned))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,356 @@
+'''
+UCI engine: plays the AI over the Universal Chess Interface on stdin and stdout, without pygame,
+so it runs headless and under any chess GUI or tournament manager.
+
+    cd data && python -m uci
+'''
+import argparse
+import sys
+import threading
+
+from classes.Game import Game
+from classes.AI import AI, MATE_SCORE
+from classes.MoveOrdering import MAX_PLY
+from classes.OpeningBook import OpeningBook
+from classes.Tablebase import Tablebase
+from classes.Profiler import PROFILE_ENV, enable_profiler
+
+NAME = 'IPASS2023-ChessAI'
+AUTHOR = 'mennooud'
+
+# Deepest depth of go infinite, it searches until stop
+INFINITE_DEPTH = 64
+# Moves the remaining clock is spread over when the GUI sends no movestogo
+MOVES_TO_GO = 30
+# Time kept back from the clock for the GUI to receive the move, in seconds
+MOVE_OVERHEAD = 0.05
+# Check options that turn the parts of the selective search on and off, and the AI settings they set
+SEARCH_OPTIONS = {'PVS': 'pvs', 'Aspiration': 'aspiration', 'NullMove': 'null_move', 'LMR': 'lmr'}
+
+
+def score_text(score):
+    '''
+    score_text
+
+    Args:
+        score (int): a search score in centipawns from the side to move.
+
+    Returns:
+        str: the score as UCI sends it, 'cp <centipawns>' or 'mate <moves>'.
+    '''
+    if abs(score) >= MATE_SCORE - MAX_PLY:
+        moves = (MATE_SCORE - abs(score) + 1) // 2
+        return f'mate {moves if score > 0 else -moves}'
+    return f'cp {score}'
+
+
+class UCI:
+    '''
+    UCI class
+    contains the state of the engine between commands: the game, one AI per color so their
+    transposition tables last between moves, and the thread of the running search.
+    '''
+
+    def __init__(self, output=sys.stdout):
+        '''
+        __init__
+
+        Args:
+            output (file, optional): where to send the replies. Defaults to sys.stdout.
+        '''
+        self.output = output
+        self.game = Game()
+        self.ais = {}
+        self.hash_mb = 16
+        self.threads = 1
+        self.book = None
+        self.tablebase = None
+        self.stats_log = None
+        # the parts of the selective search, see AI
+        self.search_options = {'pvs': True, 'aspiration': True, 'null_move': True, 'lmr': True}
+        # time move generation, check tests and evaluation for the info string, off as it slows the search
+        self.timing = False
+        self.search = None
+        self.searching_ai = None
+        # set by stop, the search of go infinite or go ponder waits for it before sending bestmove
+        self.released = threading.Event()
+        # the search thread sends info lines while the main thread answers commands
+        self.output_lock = threading.Lock()
+
+    def send(self, line):
+        '''
+        send
+
+        Args:
+            line (str): the reply to send to the GUI.
+        '''
+        with self.output_lock:
+            print(line, file=self.output, flush=True)
+
+    def get_ai(self, color):
+        '''
+        get_ai
+
+        Args:
+            color (str): the color the AI plays.
+
+        Returns:
+            AI: the AI of the color, playing the current game.
+        '''
+        ai = self.ais.get(color)
+        if ai is None:
+            ai = self.ais[color] = AI(self.game, color, tt_size_mb=self.hash_mb, workers=self.threads, book=self.book,
+                                             tablebase=self.tablebase, stats_log=self.stats_log,
+                                             timing=self.timing or self.stats_log is not None, **self.search_options)
+        ai.game = self.game
+        return ai
+
+    def handle(self, line):
+        '''
+        handle
+
+        Args:
+            line (str): one command from the GUI.
+
+        Returns:
+            bool: False after quit, True otherwise.
+        '''
+        tokens = line.split()
+        if not tokens:
+            return True
+        command, args = tokens[0], tokens[1:]
+
+        if command == 'uci':
+            self.send(f'id name {NAME}')
+            self.send(f'id author {AUTHOR}')
+            self.send(f'option name Hash type spin default {self.hash_mb} min 1 max 1024')
+            self.send(f'option name Threads type spin default {self.threads} min 1 max 256')
+            self.send('option name BookFile type string default <empty>')
+            self.send('option name TablebasePath type string default <empty>')
+            self.send('option name StatsLog type string default <empty>')
+            self.send('option name Timing type check default false')
+            for option in SEARCH_OPTIONS:
+                self.send(f'option name {option} type check default true')
+            self.send('uciok')
+        elif command == 'isready':
+            self.send('readyok')
+        elif command == 'ucinewgame':
+            self.stop()
+            self.game = Game()
+            self.reset_ais()
+        elif command == 'setoption':
+            self.set_option(args)
+        elif command == 'position':
+            self.stop()
+            self.position(args)
+        elif command == 'go':
+            self.stop()
+            self.go(args)
+        elif command in ('stop', 'ponderhit'):
+            # the time spent pondering stands in for the budget of the move, so it is played at once
+            self.stop()
+        elif command == 'quit':
+            self.stop()
+            self.reset_ais()
+            return False
+        else:
+            self.send(f'info string unknown command {command}')
+        return True
+
+    def set_option(self, args):
+        '''
+        set_option
+
+        Args:
+            args (list): the tokens after setoption, 'name <name> value <value>'.
+        '''
+        if 'name' not in args or 'value' not in args:
+            return
+        name = ' '.join(args[args.index('name') + 1:args.index('value')])
+        value = ' '.join(args[args.index('value') + 1:])
+        if name.lower() in ('hash', 'threads') and not value.isdigit():
+            self.send(f'info string {name} needs a whole number, not {value!r}')
+        elif name.lower() == 'hash':
+            self.stop()
+            self.hash_mb = max(1, int(value))
+            # the tables are made again at the new size
+            self.reset_ais()
+        elif name.lower() == 'threads':
+            self.stop()
+            # more than one thread searches the root moves on that many processes
+            self.threads = max(1, int(value))
+            self.reset_ais()
+        elif name.lower() == 'bookfile':
+            self.stop()
+            if self.book is not None:
+                self.book.close()
+                self.book = None
+            if value and value != '<empty>':
+                try:
+                    self.book = OpeningBook(value)
+                except (OSError, ValueError) as error:
+                    self.send(f'info string {error}')
+            self.reset_ais()
+        elif name.lower() == 'tablebasepath':
+            self.stop()
+            if self.tablebase is not None:
+                self.tablebase.close()
+                self.tablebase = None
+            if value and value != '<empty>':
+                try:
+                    self.tablebase = Tablebase(value)
+                except (OSError, ValueError) as error:
+                    self.send(f'info string {error}')
+            self.reset_ais()
+        elif name.lower() == 'statslog':
+            self.stop()
+            # every search appends its statistics to the file as a JSON line
+            self.stats_log = value if value and value != '<empty>' else None
+            self.reset_ais()
+        elif name.lower() == 'timing':
+            self.stop()
+            self.timing = value.lower() == 'true'
+            self.reset_ais()
+        elif name.lower() in (option.lower() for option in SEARCH_OPTIONS):
+            self.stop()
+            setting = next(setting for option, setting in SEARCH_OPTIONS.items() if option.lower() == name.lower())
+            self.search_options[setting] = value.lower() == 'true'
+            self.reset_ais()
+        else:
+            self.send(f'info string unknown option {name}')
+
+    def reset_ais(self):
+        '''
+        reset_ais
+
+        Forgets the AIs, the next search makes new ones with the current options.
+        '''
+        for ai in self.ais.values():
+            ai.close()
+        self.ais = {}
+
+    def position(self, args):
+        '''
+        position
+
+        Args:
+            args (list): the tokens after position, 'startpos' or 'fen <fen>', then optionally 'moves <move>...'.
+        '''
+        end = args.index('moves') if 'moves' in args else len(args)
+        try:
+            if args and args[0] == 'fen':
+                game = Game(' '.join(args[1:end]))
+            else:
+                game = Game()
+        except ValueError as error:
+            self.send(f'info string {error}')
+            return
+
+        for text in args[end + 1:]:
+            found = game.find_move(text)
+            if found is None:
+                self.send(f'info string illegal move {text}')
+                break
+            game.move(*found)
+        self.game = game
+
+    def go(self, args):
+        '''
+        go
+        Starts the search on a thread, it sends bestmove when it is done or stopped.
+        go infinite and go ponder search until stop, or ponderhit, and only then send bestmove,
+        even when the search ends before, as the protocol asks.
+
+        Args:
+            args (list): the tokens after go, like 'depth 6', 'movetime 1000', 'wtime 60000 btime 60000' or 'infinite'.
+        '''
+        options = {}
+        for name, value in zip(args, args[1:]):
+            if name in ('depth', 'movetime', 'wtime', 'btime', 'winc', 'binc', 'movestogo'):
+                try:
+                    options[name] = int(value)
+                except ValueError:
+                    # the search goes on without it, the GUI still waits for a bestmove
+                    self.send(f'info string {name} needs a number, not {value!r}')
+
+        color = self.game.turn
+        depth = options.get('depth')
+        time_limit = None
+        if 'movetime' in options:
+            time_limit = options['movetime'] / 1000
+        elif ('wtime' if color == 'white' else 'btime') in options:
+            remaining = options['wtime' if color == 'white' else 'btime'] / 1000
+            increment = options.get('winc' if color == 'white' else 'binc', 0) / 1000
+            budget = remaining / options.get('movestogo', MOVES_TO_GO) + increment / 2
+            time_limit = max(0.01, min(budget, remaining - MOVE_OVERHEAD))
+        infinite = 'infinite' in args or 'ponder' in args
+        if infinite:
+            depth, time_limit = INFINITE_DEPTH, None
+        elif depth is None and time_limit is None:
+            depth = INFINITE_DEPTH
+
+        self.searching_ai = ai = self.get_ai(color)
+        self.released.clear()
+        self.search = threading.Thread(target=self.think, args=(ai, depth, time_limit, infinite), daemon=True)
+        self.search.start()
+
+    def think(self, ai, depth, time_limit, infinite=False):
+        '''
+        think
+        Runs on the search thread, it sends an info line every time a depth is completed.
+
+        Args:
+            ai (AI): the AI to search with.
+            depth (int): the deepest depth to search, or None.
+            time_limit (float): the time budget in seconds, or None.
+            infinite (bool, optional): hold bestmove back until stop. Defaults to False.
+        '''
+        def on_depth(depth, score, best_move):
+            self.send(ai.stats.info_lines(score_text(score), best_move[1].uci())[0])
+
+        best_move = ai.find_best_move(depth=depth, time_limit=time_limit, on_depth=on_depth)
+        if infinite:
+            self.released.wait()
+        if best_move is None:
+            self.send('bestmove 0000')
+            return
+
+        # the depths were sent as they completed, the counters of the whole search follow
+        if ai.best_score is not None:
+            self.send(ai.stats.info_lines()[1])
+        self.send(f'bestmove {best_move[1].uci()}')
+
+    def stop(self):
+        '''
+        stop
+        Stops the running search, if any, and waits for it to send bestmove.
+        '''
+        if self.search is None:
+            return
+        self.released.set()
+        # the search clears the stopped flag when it starts, so keep setting it until the thread is done
+        while self.search.is_alive():
+            self.searching_ai.stop()
+            self.search.join(0.01)
+        self.search = None
+        self.searching_ai = None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Play the AI over the Universal Chess Interface on stdin and stdout.')
+    parser.add_argument('--profile', metavar='DIR',
+                        help=f'write a profile of every search to DIR, like setting {PROFILE_ENV}')
+    args = parser.parse_args(argv)
+    if args.profile:
+        enable_profiler(args.profile)
+
+    engine = UCI()
+    for line in sys.stdin:
+        if not engine.handle(line.strip()):
+            break
+    engine.stop()
+    engine.reset_ais()
+
+
+if __name__ == '__main__':
+    main()